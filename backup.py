@@ -0,0 +1,341 @@
+"""
+Резервные копии БД через online backup API SQLite.
+Страницы копируются порциями по BACKUP_STEP_PAGES с паузой между шагами: блокировка
+чтения держится только на время шага, и запись из программы продолжается во время
+копирования. Копия читается через подключение потока записи (db.backup_to), поэтому
+записи из очереди попадают в копию без её перезапуска. Копия проверяется
+(PRAGMA quick_check), сжимается в <БД>_backups/<имя>-ГГГГММДД-ЧЧММСС.db.gz;
+хранятся последние backup_keep копий.
+
+Если во время копирования БД изменило другое подключение, SQLite начинает копию
+заново; после MAX_RESTARTS перезапусков копия отменяется (BackupScheduler повторит
+её при следующей проверке) — БД не блокируется на всё время копирования.
+
+BackupScheduler создаёт копию раз в backup_interval часов (от времени последней копии).
+
+Из командной строки (восстановление — при закрытой программе):
+    python backup.py create
+    python backup.py list
+    python backup.py restore chatlist-20240131-120000.db.gz
+"""
+import argparse
+import gzip
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import db
+import maintenance
+import settings
+
+SETTING_INTERVAL = "backup_interval"
+SETTING_KEEP = "backup_keep"
+DEFAULT_INTERVAL = 24  # часов; 0 — фоновые копии выключены
+DEFAULT_KEEP = 7
+BACKUP_STEP_PAGES = 256  # страниц за шаг копирования (1 МБ при странице 4 КБ)
+STEP_PAUSE = 0.01  # секунд между шагами: окно для записи других подключений
+MAX_RESTARTS = 3
+STARTUP_DELAY = 300.0  # секунд от запуска программы до первой проверки
+CHECK_INTERVAL = 600.0
+SNAPSHOT_SUFFIX = ".db.gz"
+
+# callback(copied_pages, total_pages) — после каждого шага копирования
+ProgressCallback = Callable[[int, int], None]
+
+
+class BackupError(Exception):
+    """Ошибка создания или восстановления резервной копии."""
+    pass
+
+
+class _Restart(Exception):
+    pass
+
+
+class _Cancelled(Exception):
+    pass
+
+
+@dataclass
+class SnapshotReport:
+    """Итог создания копии."""
+    path: Path
+    pages: int = 0
+    restarts: int = 0
+    db_bytes: int = 0
+    gz_bytes: int = 0
+    copy_seconds: float = 0.0  # копирование страниц (время, когда БД читается)
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Резервная копия {self.path.name}: {self.pages} страниц, "
+            f"{self.db_bytes / (1024 * 1024):.1f} → {self.gz_bytes / (1024 * 1024):.1f} МБ, "
+            f"копирование {self.copy_seconds:.2f} с, всего {self.seconds:.2f} с"
+            + (f", перезапусков {self.restarts}" if self.restarts else "")
+        )
+
+
+def backup_dir() -> Path:
+    """Папка резервных копий текущей БД."""
+    return db.DB_PATH.parent / f"{db.DB_PATH.stem}_backups"
+
+
+def get_interval() -> int:
+    """Интервал фоновых копий, часы; 0 — выключены."""
+    return settings.get_int(SETTING_INTERVAL, DEFAULT_INTERVAL, 0, 24 * 30)
+
+
+def get_keep() -> int:
+    """Сколько последних копий хранить."""
+    return settings.get_int(SETTING_KEEP, DEFAULT_KEEP, 1, 1000)
+
+
+def list_snapshots() -> list[Path]:
+    """Копии от старых к новым."""
+    d = backup_dir()
+    if not d.is_dir():
+        return []
+    return sorted(d.glob(f"{db.DB_PATH.stem}-*{SNAPSHOT_SUFFIX}"), key=lambda p: p.stat().st_mtime)
+
+
+def _copy(dst: sqlite3.Connection, pages: int,
+          on_progress: Optional[ProgressCallback], should_stop: Optional[Callable[[], bool]]) -> int:
+    """Копирует БД в dst порциями; возвращает число перезапусков копирования."""
+    restarts = 0
+    state = {"remaining": None}
+
+    def progress(status, remaining, total):
+        if should_stop and should_stop():
+            raise _Cancelled()
+        prev = state["remaining"]
+        state["remaining"] = remaining
+        if prev is not None and remaining > prev:
+            raise _Restart()  # источник изменён другим подключением — SQLite начал сначала
+        if on_progress:
+            on_progress(total - remaining, total)
+        if remaining:
+            time.sleep(STEP_PAUSE)
+
+    while True:
+        state["remaining"] = None
+        try:
+            db.backup_to(dst, pages, progress, sleep=STEP_PAUSE)
+            return restarts
+        except _Restart:
+            restarts += 1
+            if restarts >= MAX_RESTARTS:
+                raise BackupError(
+                    f"БД изменялась другим подключением, копия перезапускалась {restarts} раза"
+                ) from None
+
+
+def create_snapshot(
+    label: str = "",
+    pages: int = BACKUP_STEP_PAGES,
+    on_progress: Optional[ProgressCallback] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    prune: bool = True,
+) -> SnapshotReport:
+    """
+    Создаёт сжатую копию БД и (prune) удаляет копии сверх backup_keep. label добавляется
+    к имени файла (напр. «pre-restore»). should_stop() отменяет копирование между шагами.
+    """
+    start = time.perf_counter()
+    d = backup_dir()
+    d.mkdir(parents=True, exist_ok=True)
+    name = f"{db.DB_PATH.stem}-{datetime.now():%Y%m%d-%H%M%S}" + (f"-{label}" if label else "")
+    path = d / (name + SNAPSHOT_SUFFIX)
+    tmp_db = d / (name + ".db.part")
+    tmp_gz = d / (name + SNAPSHOT_SUFFIX + ".part")
+    report = SnapshotReport(path)
+    try:
+        dst = sqlite3.connect(tmp_db)
+        try:
+            copy_start = time.perf_counter()
+            report.restarts = _copy(dst, pages, on_progress, should_stop)
+            report.copy_seconds = time.perf_counter() - copy_start
+            report.pages = dst.execute("PRAGMA page_count").fetchone()[0]
+            check = dst.execute("PRAGMA quick_check").fetchone()[0]
+            if check != "ok":
+                raise BackupError(f"Копия не прошла проверку: {check}")
+        finally:
+            dst.close()
+        report.db_bytes = tmp_db.stat().st_size
+        # Сжатие — после закрытия подключения к БД, блокировки уже не держатся
+        with open(tmp_db, "rb") as f, gzip.open(tmp_gz, "wb", compresslevel=6) as gz:
+            shutil.copyfileobj(f, gz, 1024 * 1024)
+        tmp_gz.replace(path)
+        report.gz_bytes = path.stat().st_size
+    except _Cancelled:
+        raise BackupError("Создание копии отменено") from None
+    finally:
+        tmp_db.unlink(missing_ok=True)
+        tmp_gz.unlink(missing_ok=True)
+    if prune:
+        prune_snapshots(get_keep())
+    report.seconds = time.perf_counter() - start
+    maintenance.log(report.summary())
+    return report
+
+
+def prune_snapshots(keep: int, protect: tuple[Path, ...] = ()) -> list[Path]:
+    """Удаляет самые старые копии сверх keep, кроме protect. Возвращает удалённые."""
+    protected = {p.resolve() for p in protect}
+    candidates = [p for p in list_snapshots() if p.resolve() not in protected]
+    old = candidates[:-keep] if keep > 0 else []
+    for path in old:
+        path.unlink(missing_ok=True)
+    return old
+
+
+def resolve_snapshot(name: str) -> Path:
+    """Путь к копии по имени файла в папке копий или по пути."""
+    path = Path(name)
+    if not path.exists():
+        path = backup_dir() / name
+    if not path.exists():
+        raise BackupError(f"Копия не найдена: {name}")
+    return path
+
+
+def restore_snapshot(snapshot: Path) -> Path:
+    """
+    Восстанавливает БД из копии. Копия распаковывается и проверяется, текущая БД
+    сохраняется копией «pre-restore», затем страницы переносятся в БД через backup API
+    (одной транзакцией). Лишние копии удаляются после восстановления; восстановленная
+    копия при этом не удаляется. Возвращает путь к копии, сделанной перед восстановлением.
+    """
+    snapshot = Path(snapshot)
+    backup_dir().mkdir(parents=True, exist_ok=True)
+    tmp_db = backup_dir() / (snapshot.name + ".restore.part")
+    try:
+        with gzip.open(snapshot, "rb") as gz, open(tmp_db, "wb") as f:
+            shutil.copyfileobj(gz, f, 1024 * 1024)
+    except (OSError, EOFError) as e:
+        tmp_db.unlink(missing_ok=True)
+        raise BackupError(f"Не удалось распаковать {snapshot.name}: {e}") from e
+    try:
+        src = sqlite3.connect(tmp_db)
+        try:
+            try:
+                check = src.execute("PRAGMA quick_check").fetchone()[0]
+            except sqlite3.DatabaseError as e:
+                check = str(e)
+            if check != "ok":
+                raise BackupError(f"Копия {snapshot.name} повреждена: {check}")
+            # Без ротации: она могла бы удалить копию, из которой идёт восстановление
+            safety = create_snapshot(label="pre-restore", prune=False).path
+            db.flush_writes()
+            dst = sqlite3.connect(db.DB_PATH)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+        finally:
+            src.close()
+    finally:
+        tmp_db.unlink(missing_ok=True)
+    settings.reload()
+    prune_snapshots(get_keep(), protect=(snapshot, safety))
+    maintenance.log(f"БД восстановлена из {snapshot.name}; прежняя БД сохранена в {safety.name}")
+    return safety
+
+
+class BackupScheduler(threading.Thread):
+    """
+    Фоновые копии: раз в CHECK_INTERVAL проверяет, прошло ли interval часов
+    с последней копии, и создаёт новую. on_report(report) — из потока планировщика.
+    """
+
+    def __init__(self, interval_hours: float,
+                 on_report: Optional[Callable[[SnapshotReport], None]] = None):
+        super().__init__(name="BackupScheduler", daemon=True)
+        self.interval = interval_hours * 3600
+        self.on_report = on_report
+        self._stop_event = threading.Event()
+
+    def run(self):
+        delay = STARTUP_DELAY
+        while not self._stop_event.wait(delay):
+            delay = CHECK_INTERVAL
+            snapshots = list_snapshots()
+            if snapshots and time.time() - snapshots[-1].stat().st_mtime < self.interval:
+                continue
+            try:
+                report = create_snapshot(should_stop=self._stop_event.is_set)
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    maintenance.log(f"Ошибка резервного копирования: {e}")
+                continue
+            if self.on_report:
+                self.on_report(report)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Останавливает планировщик; текущая копия отменяется после шага."""
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+
+_scheduler: Optional[BackupScheduler] = None
+_lock = threading.Lock()
+
+
+def configure_backups(interval_hours: float) -> None:
+    """Запускает фоновые копии раз в interval_hours часов; 0 — останавливает их."""
+    global _scheduler
+    with _lock:
+        old, _scheduler = _scheduler, None
+        if interval_hours > 0:
+            _scheduler = BackupScheduler(interval_hours)
+            _scheduler.start()
+    if old is not None:
+        old.stop()
+
+
+def stop_backups(timeout: Optional[float] = None) -> None:
+    """Останавливает планировщик и ждёт отмены текущей копии (при выходе)."""
+    global _scheduler
+    with _lock:
+        old, _scheduler = _scheduler, None
+    if old is not None:
+        old.stop(timeout)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Резервные копии БД ChatList")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("create", help="создать копию")
+    sub.add_parser("list", help="показать копии")
+    rp = sub.add_parser("restore", help="восстановить БД из копии (программа должна быть закрыта)")
+    rp.add_argument("snapshot", help="имя файла копии (см. list) или путь к нему")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for path in list_snapshots():
+            print(f"{path.name}\t{path.stat().st_size} байт")
+        return 0
+    try:
+        if args.command == "create":
+            db.init_db()
+            print(create_snapshot().summary())
+        else:
+            safety = restore_snapshot(resolve_snapshot(args.snapshot))
+            print(f"БД восстановлена. Прежняя БД сохранена в {safety.name}")
+    except (BackupError, sqlite3.Error, OSError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.stop_writer()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
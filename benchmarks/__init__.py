@@ -0,0 +1,6 @@
+"""
+Бенчмарки ChatList: db.py (CRUD, поиск, списки) и network.py (рассылка по моделям
+через локальный mock-сервер OpenAI-совместимого API).
+
+Запуск: python -m benchmarks.run --help
+"""
@@ -0,0 +1,115 @@
+"""
+Бенчмарки db.py на синтетических данных: CRUD промтов и результатов,
+поиск и списки при заданном числе строк. Каждый размер — отдельная временная БД.
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import synthetic
+from benchmarks.common import record, timeit
+
+import db
+import importer
+
+SUITE = "db"
+CRUD_OPS = 200  # одиночных операций на замер CRUD
+RESULTS_PER_PROMPT = 3
+
+
+def _seed(size: int) -> dict:
+    """Заполняет БД: size промтов и size результатов. Возвращает метрики заполнения."""
+    model_ids = [db.model_create(**m) for m in synthetic.models(5, "http://127.0.0.1:9/v1/chat/completions")]
+    t0 = time.perf_counter()
+    report = importer.import_rows(importer.TABLE_PROMPTS, synthetic.prompts(size), chunk_size=5000)
+    prompts_sec = time.perf_counter() - t0
+
+    result_count = size * RESULTS_PER_PROMPT
+    t0 = time.perf_counter()
+    conn = db.get_connection()
+    batch: list[tuple] = []
+    for row in synthetic.results(result_count, size, model_ids):
+        batch.append(row)
+        if len(batch) >= 5000:
+            with conn:
+                conn.executemany("INSERT INTO results (prompt_id, model_id, response) VALUES (?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        with conn:
+            conn.executemany("INSERT INTO results (prompt_id, model_id, response) VALUES (?, ?, ?)", batch)
+    conn.close()
+    results_sec = time.perf_counter() - t0
+    return {
+        "model_ids": model_ids,
+        "prompts_rows_per_sec": report.imported / prompts_sec if prompts_sec else 0.0,
+        "results_rows_per_sec": result_count / results_sec if results_sec else 0.0,
+    }
+
+
+def run(sizes: list[int], repeat: int = 5) -> list[dict]:
+    """Запускает бенчмарки БД для каждого размера. Возвращает список записей."""
+    out: list[dict] = []
+    saved_path = db.DB_PATH
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                db.DB_PATH = Path(tmp) / "bench.db"
+                db.init_db()
+                seeded = _seed(size)
+                out.append(record(SUITE, "seed_prompts", seeded["prompts_rows_per_sec"], "rows/s", size=size))
+                out.append(record(SUITE, "seed_results", seeded["results_rows_per_sec"], "rows/s", size=size))
+                model_id = seeded["model_ids"][0]
+                mid_prompt = max(1, size // 2)
+                out.extend(_run_crud(size, model_id, repeat))
+                out.extend(_run_queries(size, mid_prompt, repeat))
+                out.append(record(SUITE, "db_file_size", db.DB_PATH.stat().st_size, "bytes", size=size))
+    finally:
+        db.DB_PATH = saved_path
+    return out
+
+
+def _run_crud(size: int, model_id: int, repeat: int) -> list[dict]:
+    def create_prompts():
+        for i in range(CRUD_OPS):
+            db.prompt_create(f"bench prompt {i}", "bench")
+
+    def create_results():
+        for i in range(CRUD_OPS):
+            db.result_create(1, model_id, f"bench result {i}")
+
+    def get_prompts():
+        for i in range(1, CRUD_OPS + 1):
+            db.prompt_get(i)
+
+    def update_prompts():
+        for i in range(1, CRUD_OPS + 1):
+            db.prompt_update(i, f"updated {i}", "bench")
+
+    out = []
+    for name, fn in (
+        ("prompt_create", create_prompts),
+        ("result_create", create_results),
+        ("prompt_get", get_prompts),
+        ("prompt_update", update_prompts),
+    ):
+        sec = timeit(fn, repeat=max(1, repeat // 2))
+        out.append(record(SUITE, name, CRUD_OPS / sec if sec else 0.0, "ops/s", size=size))
+    return out
+
+
+def _run_queries(size: int, prompt_id: int, repeat: int) -> list[dict]:
+    cases = (
+        ("prompt_list_all", lambda: db.prompt_list()),
+        ("prompt_list_search", lambda: db.prompt_list(search="анализ python")),
+        ("prompt_list_with_counts", lambda: db.prompt_list_with_counts()),
+        ("prompt_ids_by_tag", lambda: db.prompt_ids_by_tag("sql")),
+        ("prompt_list_by_tag", lambda: db.prompt_list(tag="sql")),
+        ("tag_counts", lambda: db.tag_counts()),
+        ("result_list_prompt_full", lambda: db.result_list(prompt_id=prompt_id)),
+        ("result_list_prompt_meta", lambda: db.result_list(prompt_id=prompt_id, fields=db.RESULT_FIELDS_META)),
+        ("result_list_recent_preview", lambda: db.result_list(fields=db.RESULT_FIELDS_PREVIEW, limit=100)),
+        ("result_list_recent_full", lambda: db.result_list(limit=100)),
+        ("result_get_body", lambda: db.result_get_body(prompt_id)),
+        ("result_count", lambda: db.result_count()),
+    )
+    return [record(SUITE, name, timeit(fn, repeat), "s", size=size) for name, fn in cases]
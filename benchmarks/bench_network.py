@@ -0,0 +1,111 @@
+"""
+Бенчмарки network.py против локального mock-сервера: задержка одного запроса
+и время рассылки промта по всем моделям с заданными задержкой и долей ошибок.
+Отдельно измеряется ожидание интерактивного запроса, когда хост загружен
+фоновыми запросами (планировщик network.scheduler).
+Задержки пишутся во временную БД, чтобы не засорять историю моделей приложения.
+"""
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.common import percentile, record
+from benchmarks.mock_openai import MockOpenAIServer
+
+import db
+from models import Model
+import network
+
+SUITE = "network"
+BENCH_KEY_VAR = "CHATLIST_BENCH_KEY"
+
+
+def _models(n: int, url: str) -> list[Model]:
+    return [
+        Model(id=i + 1, name=f"Bench {i}", api_url=url, api_id=BENCH_KEY_VAR, model=f"bench/model-{i}", is_active=1)
+        for i in range(n)
+    ]
+
+
+def run(model_counts: list[int], latency: float = 0.05, error_rate: float = 0.0,
+        jitter: float = 0.0, rounds: int = 5) -> list[dict]:
+    """Запускает сетевые бенчмарки. Возвращает список записей."""
+    os.environ.setdefault(BENCH_KEY_VAR, "bench")
+    saved_path = db.DB_PATH
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_PATH = Path(tmp) / "bench.db"
+            db.init_db()
+            return _run(model_counts, latency, error_rate, jitter, rounds)
+    finally:
+        db.DB_PATH = saved_path
+
+
+def _run(model_counts: list[int], latency: float, error_rate: float,
+         jitter: float, rounds: int) -> list[dict]:
+    out: list[dict] = []
+    with MockOpenAIServer(latency=latency, error_rate=error_rate, jitter=jitter) as srv:
+        params = {"latency": latency, "error_rate": error_rate, "jitter": jitter}
+        single = _models(1, srv.chat_url)[0]
+        samples = []
+        for _ in range(rounds * 4):
+            t0 = time.perf_counter()
+            try:
+                network.send_prompt_to_model(single, "ping")
+            except network.NetworkError:
+                pass
+            samples.append(time.perf_counter() - t0)
+        overhead = [max(0.0, s - latency) for s in samples]
+        out.append(record(SUITE, "single_p50", percentile(samples, 50), "s", **params))
+        out.append(record(SUITE, "single_p95", percentile(samples, 95), "s", **params))
+        out.append(record(SUITE, "single_overhead_p50", percentile(overhead, 50), "s", **params))
+
+        for n in model_counts:
+            models = _models(n, srv.chat_url)
+            walls, errors = [], 0
+            for _ in range(rounds):
+                t0 = time.perf_counter()
+                res = network.send_prompt_to_all_models(models, "bench prompt")
+                walls.append(time.perf_counter() - t0)
+                errors += sum(1 for r in res if (r[2] or "").startswith(("HTTP", "Ошибка", "Таймаут")))
+            out.append(record(SUITE, "fanout_wall_p50", percentile(walls, 50), "s", models=n, **params))
+            out.append(record(SUITE, "fanout_wall_max", max(walls), "s", models=n, **params))
+            out.append(record(SUITE, "fanout_error_ratio", errors / (n * rounds), "ratio", models=n, **params))
+
+        waits = _interactive_under_load(single, rounds)
+        cap = network.scheduler.concurrency
+        out.append(record(SUITE, "interactive_wait_under_load_p50", percentile(waits, 50), "s", concurrency=cap, **params))
+        out.append(record(SUITE, "interactive_wait_under_load_max", max(waits), "s", concurrency=cap, **params))
+    return out
+
+
+def _interactive_under_load(model: Model, rounds: int) -> list[float]:
+    """
+    Время интерактивного запроса (с задержкой сервера), пока хост занят
+    фоновыми запросами (вдвое больше лимита одновременных запросов).
+    """
+    background = network.scheduler.concurrency * 2
+    waits: list[float] = []
+    for _ in range(rounds):
+        threads = [
+            threading.Thread(target=_quiet_send, args=(model, network.PRIORITY_BACKGROUND))
+            for _ in range(background)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.01)
+        t0 = time.perf_counter()
+        _quiet_send(model, network.PRIORITY_INTERACTIVE)
+        waits.append(time.perf_counter() - t0)
+        for t in threads:
+            t.join()
+    return waits
+
+
+def _quiet_send(model: Model, priority: int) -> None:
+    try:
+        network.send_prompt_to_model(model, "ping", priority=priority)
+    except network.NetworkError:
+        pass
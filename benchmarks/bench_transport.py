@@ -0,0 +1,78 @@
+"""
+Сравнение транспортов network.py: HTTP/1.1 (requests) против HTTP/2 (httpx)
+при одновременных запросах к одному хосту. Для HTTP/2 используется локальный
+h2c mock-сервер (mock_h2); без пакетов httpx и h2 замеряется только HTTP/1.1.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.common import percentile, record
+from benchmarks.mock_openai import MockOpenAIServer
+
+import db
+from models import Model
+import network
+import transport
+
+SUITE = "transport"
+BENCH_KEY_VAR = "CHATLIST_BENCH_KEY"
+
+
+def _fanout(model: Model, concurrency: int, rounds: int) -> list[float]:
+    """Время пачки из concurrency одновременных запросов, по раундам."""
+    walls = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            list(pool.map(lambda _: network.send_prompt_to_model(model, "ping", timeout=30), range(concurrency)))
+            walls.append(time.perf_counter() - t0)
+    return walls
+
+
+def _bench(name: str, server, make_transport, concurrency: list[int], rounds: int, latency: float) -> list[dict]:
+    out = []
+    with server as srv:
+        model = Model(id=1, name="Bench", api_url=srv.chat_url, api_id=BENCH_KEY_VAR,
+                      model="bench/model", is_active=1)
+        for n in concurrency:
+            # Свежий транспорт на уровень: connections — все соединения, открытые
+            # этим уровнем, а не только добавленные к пулу прошлого уровня
+            t = make_transport()
+            old = transport.set_transport(t)
+            try:
+                before = srv.connections
+                walls = _fanout(model, n, rounds)
+                out.append(record(SUITE, "fanout_wall_p50", percentile(walls, 50), "s",
+                                  transport=name, concurrency=n, latency=latency))
+                out.append(record(SUITE, "connections", srv.connections - before, "conn",
+                                  transport=name, concurrency=n, latency=latency))
+            finally:
+                t.close()
+                transport.set_transport(old)
+    return out
+
+
+def run(concurrency: list[int], latency: float = 0.05, rounds: int = 5) -> list[dict]:
+    """Запускает сравнение транспортов. Возвращает список записей."""
+    os.environ.setdefault(BENCH_KEY_VAR, "bench")
+    saved_path, saved_cap = db.DB_PATH, network.scheduler.concurrency
+    # Лимит планировщика не должен ограничивать сравнение
+    network.configure_scheduler(max(concurrency) + 1)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_PATH = Path(tmp) / "bench.db"
+            db.init_db()
+            out = _bench("http1", MockOpenAIServer(latency=latency), transport.RequestsTransport,
+                         concurrency, rounds, latency)
+            if transport.http2_available():
+                from benchmarks.mock_h2 import MockH2Server
+                out += _bench("http2", MockH2Server(latency=latency),
+                              lambda: transport.Http2Transport(prior_knowledge=True),
+                              concurrency, rounds, latency)
+            return out
+    finally:
+        db.DB_PATH = saved_path
+        network.configure_scheduler(saved_cap)
@@ -0,0 +1,35 @@
+"""Общие утилиты бенчмарков: замер времени и формат записей."""
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+# Модули приложения лежат в корне репозитория
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def timeit(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Медианное время одного вызова fn, секунды."""
+    times = []
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def percentile(values: list[float], p: float) -> float:
+    """p-й перцентиль (0..100) методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = max(0, min(len(s) - 1, int(round(p / 100.0 * len(s) + 0.5)) - 1))
+    return s[k]
+
+
+def record(suite: str, name: str, value: float, unit: str = "s", **params) -> dict:
+    """Одна машиночитаемая запись результата."""
+    return {"suite": suite, "name": name, "value": value, "unit": unit, "params": params}
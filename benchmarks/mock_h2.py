@@ -0,0 +1,177 @@
+"""
+Локальный mock-сервер OpenAI-совместимого API по HTTP/2 без TLS (h2c, prior knowledge)
+для сравнения транспортов network.py. Ответы те же, что у mock_openai.
+Требует пакет h2.
+"""
+import json
+import socket
+import threading
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+
+
+class _H2Session:
+    """Одно клиентское соединение: чтение кадров и ответы на потоки (streams)."""
+
+    def __init__(self, server: "MockH2Server", sock: socket.socket):
+        self.server = server
+        self.sock = sock
+        self.conn = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.cond = threading.Condition()  # защищает conn и sock
+        self.streams: dict[int, dict] = {}
+
+    def _flush(self) -> None:
+        data = self.conn.data_to_send()
+        if data:
+            self.sock.sendall(data)
+
+    def serve(self) -> None:
+        with self.cond:
+            self.conn.initiate_connection()
+            self._flush()
+        try:
+            while True:
+                data = self.sock.recv(65535)
+                if not data:
+                    break
+                with self.cond:
+                    events = self.conn.receive_data(data)
+                    for ev in events:
+                        self._on_event(ev)
+                    self._flush()
+                    self.cond.notify_all()
+                if any(isinstance(ev, h2.events.ConnectionTerminated) for ev in events):
+                    break
+        except OSError:
+            pass
+        finally:
+            self.sock.close()
+
+    def _on_event(self, ev) -> None:
+        if isinstance(ev, h2.events.RequestReceived):
+            self.streams[ev.stream_id] = {"headers": dict(ev.headers), "body": bytearray()}
+        elif isinstance(ev, h2.events.DataReceived):
+            self.streams[ev.stream_id]["body"] += ev.data
+            self.conn.acknowledge_received_data(ev.flow_controlled_length, ev.stream_id)
+        elif isinstance(ev, h2.events.StreamEnded):
+            req = self.streams.pop(ev.stream_id, None)
+            if req is not None:
+                threading.Thread(target=self._respond, args=(ev.stream_id, req), daemon=True).start()
+
+    def _respond(self, stream_id: int, req: dict) -> None:
+        srv = self.server
+        path = req["headers"].get(":path", "")
+        if req["headers"].get(":method") == "GET":
+            code, payload = (200, {"data": [{"id": "bench/model-0"}]}) if path.rstrip("/").endswith("/models") \
+                else (404, {"error": {"message": "not found"}})
+        else:
+            srv.count_request()
+            if srv.latency > 0:
+                time.sleep(srv.latency)
+            try:
+                body = json.loads(bytes(req["body"]) or b"{}")
+            except json.JSONDecodeError:
+                body = {}
+            n = max(1, int(body.get("n") or 1))
+            code, payload = 200, {
+                "id": "mock",
+                "object": "chat.completion",
+                "model": body.get("model", ""),
+                "choices": [
+                    {"index": i, "message": {"role": "assistant", "content": "x" * srv.response_chars},
+                     "finish_reason": "stop"}
+                    for i in range(n)
+                ],
+            }
+        data = json.dumps(payload).encode("utf-8")
+        try:
+            with self.cond:
+                self.conn.send_headers(stream_id, [
+                    (":status", str(code)),
+                    ("content-type", "application/json"),
+                    ("content-length", str(len(data))),
+                ])
+                # Отправка с учётом окна управления потоком
+                while data:
+                    window = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size)
+                    if window <= 0:
+                        self._flush()
+                        self.cond.wait(0.05)
+                        continue
+                    chunk, data = data[:window], data[window:]
+                    self.conn.send_data(stream_id, chunk, end_stream=not data)
+                self._flush()
+        except (OSError, h2.exceptions.ProtocolError):
+            pass
+
+
+class MockH2Server:
+    """
+    Сервер в фоновом потоке. Использование:
+        with MockH2Server(latency=0.05) as srv:
+            url = srv.chat_url  # http://, клиенту нужен HTTP/2 prior knowledge
+    """
+
+    def __init__(self, latency: float = 0.0, response_chars: int = 500,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.response_chars = response_chars
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(64)
+        self._closed = False
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._sock.getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def _accept_loop(self) -> None:
+        while not self._closed:
+            try:
+                client, _ = self._sock.accept()
+            except OSError:
+                break
+            # Кадры уходят отдельными send(); без TCP_NODELAY ответ ждал бы отложенный ACK
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=_H2Session(self, client).serve, daemon=True).start()
+
+    def start(self) -> "MockH2Server":
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,121 @@
+"""
+Локальный mock-сервер OpenAI-совместимого API для бенчмарков network.py.
+Поддерживает POST /v1/chat/completions и GET /v1/models с настраиваемой
+задержкой и долей ошибок (HTTP 500).
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, как у реальных провайдеров
+    # Заголовки и тело уходят отдельными send(); с алгоритмом Нейгла и отложенным ACK
+    # каждый ответ ждал бы ~40 мс, и замеры показывали бы задержку mock-сервера
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.owner.count_connection()
+
+    def _send_json(self, code: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"data": [{"id": "bench/model-0", "context_length": 8192}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        srv: "MockOpenAIServer" = self.server.owner
+        srv.count_request()
+        delay = srv.latency + (random.uniform(0, srv.jitter) if srv.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if srv.error_rate and random.random() < srv.error_rate:
+            self._send_json(500, {"error": {"message": "mock error"}})
+            return
+        try:
+            req = json.loads(raw or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "bad json"}})
+            return
+        n = max(1, int(req.get("n") or 1))
+        content = "x" * srv.response_chars
+        self._send_json(200, {
+            "id": "mock",
+            "object": "chat.completion",
+            "model": req.get("model", ""),
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                for i in range(n)
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+
+class MockOpenAIServer:
+    """
+    Сервер в фоновом потоке. Использование:
+        with MockOpenAIServer(latency=0.05, error_rate=0.1) as srv:
+            url = srv.chat_url
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, jitter: float = 0.0,
+                 response_chars: int = 500, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.jitter = jitter
+        self.response_chars = response_chars
+        self.requests = 0
+        self.connections = 0  # принятых TCP-соединений
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.owner = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def count_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
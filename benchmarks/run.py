@@ -0,0 +1,110 @@
+"""
+Запуск бенчмарков ChatList и запись машиночитаемого отчёта (JSON).
+
+Примеры:
+    python -m benchmarks.run                                  # db 1k/100k/1M + network
+    python -m benchmarks.run --suite db --sizes 1000,100000
+    python -m benchmarks.run --suite network --latency 0.2 --error-rate 0.1
+    python -m benchmarks.run --suite transport --concurrency 4,16   # HTTP/1.1 против HTTP/2
+    python -m benchmarks.run --out bench-1.1.0.json --compare bench-1.0.0.json
+
+При --compare печатаются записи, изменившиеся хуже порога --threshold;
+код возврата 2, если такие регрессии есть.
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import ROOT
+
+import version
+
+# Метрики, у которых «больше — лучше»; у остальных (секунды, доли ошибок, байты) лучше меньше
+_HIGHER_IS_BETTER = {"rows/s", "ops/s"}
+
+
+def _key(rec: dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(rec.get("params", {}).items()))
+    return f"{rec['suite']}.{rec['name']}[{params}]"
+
+
+def compare(current: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """Возвращает описания регрессий current относительно baseline."""
+    base = {_key(r): r for r in baseline}
+    regressions = []
+    for rec in current:
+        old = base.get(_key(rec))
+        if not old or not old["value"]:
+            continue
+        ratio = rec["value"] / old["value"]
+        worse = ratio < 1 - threshold if rec["unit"] in _HIGHER_IS_BETTER else ratio > 1 + threshold
+        if worse:
+            regressions.append(f"{_key(rec)}: {old['value']:.6g} → {rec['value']:.6g} {rec['unit']} (×{ratio:.2f})")
+    return regressions
+
+
+def _ints(s: str) -> list[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки ChatList (db.py, network.py, transport.py)")
+    parser.add_argument("--suite", choices=("all", "db", "network", "transport"), default="all")
+    parser.add_argument("--sizes", type=_ints, default=[1000, 100000, 1000000],
+                        help="число промтов для бенчмарков БД, через запятую")
+    parser.add_argument("--models", type=_ints, default=[1, 5, 20],
+                        help="число моделей для рассылки, через запятую")
+    parser.add_argument("--concurrency", type=_ints, default=[4, 16],
+                        help="одновременных запросов к хосту для сравнения транспортов, через запятую")
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка mock-сервера, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов HTTP 500")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", type=Path, default=ROOT / "bench_output.json")
+    parser.add_argument("--compare", type=Path, help="предыдущий отчёт для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    records: list[dict] = []
+    if args.suite in ("all", "db"):
+        from benchmarks import bench_db
+        records += bench_db.run(args.sizes, repeat=args.repeat)
+    if args.suite in ("all", "network"):
+        from benchmarks import bench_network
+        records += bench_network.run(
+            args.models, latency=args.latency, error_rate=args.error_rate,
+            jitter=args.jitter, rounds=args.repeat,
+        )
+    if args.suite in ("all", "transport"):
+        from benchmarks import bench_transport
+        records += bench_transport.run(args.concurrency, latency=args.latency, rounds=args.repeat)
+
+    report = {
+        "version": version.__version__,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "records": records,
+    }
+    args.out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    for rec in records:
+        print(f"{_key(rec):70s} {rec['value']:>14.6g} {rec['unit']}")
+    print(f"Отчёт: {args.out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8")).get("records", [])
+        regressions = compare(records, baseline, args.threshold)
+        for line in regressions:
+            print(f"РЕГРЕССИЯ {line}")
+        if regressions:
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Генераторы синтетических данных для бенчмарков.
+Данные детерминированы (фиксированный seed), чтобы прогоны были сравнимы.
+"""
+import random
+from typing import Iterator
+
+_WORDS = (
+    "модель ответ промт запрос сравнение текст анализ python sqlite пример код "
+    "функция данные таблица список поиск результат вопрос задача контекст токен"
+).split()
+_TAGS = ["код", "анализ", "перевод", "тест", "sql", "python", "идеи", "обзор"]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def prompts(n: int, seed: int = 1) -> Iterator[dict]:
+    """n промтов: {text, tags}."""
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "text": f"#{i} " + _text(rng, rng.randint(5, 60)),
+            "tags": ", ".join(rng.sample(_TAGS, rng.randint(0, 3))),
+        }
+
+
+def models(n: int, api_url: str, api_id: str = "CHATLIST_BENCH_KEY") -> Iterator[dict]:
+    """n моделей, указывающих на один api_url."""
+    for i in range(n):
+        yield {
+            "name": f"Bench {i}",
+            "api_url": api_url,
+            "api_id": api_id,
+            "model": f"bench/model-{i}",
+            "is_active": 1,
+        }
+
+
+def results(n: int, prompt_count: int, model_ids: list[int], seed: int = 2, body_words: int = 300) -> Iterator[tuple]:
+    """n результатов (prompt_id, model_id, response), распределённых по prompt_count промтам."""
+    rng = random.Random(seed)
+    body = _text(rng, body_words)
+    for i in range(n):
+        yield (rng.randint(1, prompt_count), rng.choice(model_ids), f"{i}: {body}")
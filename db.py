@@ -1,15 +1,34 @@
 """
 Модуль работы с SQLite для ChatList.
 Инкапсулирует доступ к базе данных.
+Частые записи из интерфейса и сетевых потоков можно отдать в очередь записи
+(submit_write и функции *_async): один фоновый поток-писатель объединяет
+накопившиеся операции в общую транзакцию (group commit).
 """
+import queue
 import sqlite3
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Optional
 
 # Путь к файлу БД рядом с основным скриптом
 DB_PATH = Path(__file__).parent / "chatlist.db"
 
+# Проекции для списков результатов: без тела ответа, с префиксом ответа, с полным текстом
+RESULT_FIELDS_META = "meta"
+RESULT_FIELDS_PREVIEW = "preview"
+RESULT_FIELDS_FULL = "full"
+DEFAULT_PREVIEW_LEN = 200
+
+# Колонки models, возвращаемые model_get/model_list
+_MODEL_COLUMNS = (
+    "id, name, api_url, api_id, model, is_active, context_length, "
+    "max_tokens, temperature, stop, extra_params, timeout, fallbacks"
+)
+
 
 def get_connection() -> sqlite3.Connection:
     """Возвращает подключение к БД."""
@@ -18,10 +37,33 @@ def get_connection() -> sqlite3.Connection:
     return conn
 
 
+def iter_rows(sql: str, params: tuple | list = (), batch_size: int = 500) -> Iterator[dict]:
+    """
+    Потоково выполняет SELECT и отдаёт строки по одной (dict).
+    Строки читаются из курсора порциями batch_size, в памяти держится только порция.
+    Подключение закрывается по окончании итерации или при закрытии генератора.
+    """
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for r in rows:
+                yield dict(r)
+    finally:
+        conn.close()
+
+
 def init_db() -> None:
     """Создаёт БД и таблицы при первом запуске."""
     conn = get_connection()
     cur = conn.cursor()
+    # Новая БД создаётся с инкрементальным auto_vacuum: место после удалений
+    # возвращается порциями (maintenance.py). В существующей БД режим включает VACUUM.
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
 
     cur.execute("""
         CREATE TABLE IF NOT EXISTS prompts (
@@ -32,7 +74,29 @@ def init_db() -> None:
         )
     """)
     cur.execute("CREATE INDEX IF NOT EXISTS idx_prompts_created ON prompts(created)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_prompts_tags ON prompts(tags)")
+    # Индекс по строке тегов не помогал поиску LIKE '%тег%' — теги индексируются в prompt_tags
+    cur.execute("DROP INDEX IF EXISTS idx_prompts_tags")
+
+    # Нормализованные теги: prompts.tags остаётся исходной строкой, prompt_tags — индекс по ней
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS prompt_tags (
+            prompt_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            PRIMARY KEY (prompt_id, tag_id)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_prompt_tags_tag ON prompt_tags(tag_id, prompt_id)")
+    # Первый запуск с таблицами тегов: заполнить их из prompts.tags
+    cur.execute("SELECT 1 FROM prompt_tags LIMIT 1")
+    if cur.fetchone() is None:
+        cur.execute("SELECT id, tags FROM prompts WHERE tags IS NOT NULL AND tags != ''")
+        sync_prompt_tags(cur, cur.fetchall())
 
     cur.execute("""
         CREATE TABLE IF NOT EXISTS models (
@@ -72,6 +136,25 @@ def init_db() -> None:
     except sqlite3.OperationalError:
         pass
 
+    # Миграции: контекст модели в токенах (0 — неизвестен, берётся из каталога OpenRouter)
+    # и параметры генерации (max_tokens 0 / temperature NULL — по умолчанию провайдера,
+    # stop — JSON-список, extra_params — JSON-объект дополнительных полей запроса)
+    for ddl in (
+        "ALTER TABLE models ADD COLUMN context_length INTEGER DEFAULT 0",
+        "ALTER TABLE models ADD COLUMN max_tokens INTEGER DEFAULT 0",
+        "ALTER TABLE models ADD COLUMN temperature REAL",
+        "ALTER TABLE models ADD COLUMN stop TEXT DEFAULT ''",
+        "ALTER TABLE models ADD COLUMN extra_params TEXT DEFAULT ''",
+        # Ручной таймаут запроса, секунды; 0 — вычисляется по истории задержек
+        "ALTER TABLE models ADD COLUMN timeout REAL DEFAULT 0",
+        # Цепочка резервных моделей: JSON-список models.id в порядке попыток
+        "ALTER TABLE models ADD COLUMN fallbacks TEXT DEFAULT ''",
+    ):
+        try:
+            cur.execute(ddl)
+        except sqlite3.OperationalError:
+            pass
+
     cur.execute("""
         CREATE TABLE IF NOT EXISTS results (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -86,6 +169,23 @@ def init_db() -> None:
     cur.execute("CREATE INDEX IF NOT EXISTS idx_results_prompt_id ON results(prompt_id)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_results_model_id ON results(model_id)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_results_created ON results(created)")
+    # Покрывающий индекс для списков без текста ответа: метаданные читаются из индекса,
+    # не затрагивая страницы с телами ответов
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_results_meta ON results(prompt_id, created, model_id)"
+    )
+
+    # Задержки успешных запросов к моделям (скользящее окно на модель)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS model_latency (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            model_id INTEGER NOT NULL,
+            seconds REAL NOT NULL,
+            created DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (model_id) REFERENCES models(id) ON DELETE CASCADE
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_model_latency_model ON model_latency(model_id, id)")
 
     cur.execute("""
         CREATE TABLE IF NOT EXISTS settings (
@@ -113,16 +213,98 @@ def init_db() -> None:
     conn.close()
 
 
+# --- Теги промтов ---
+
+def split_tags(tags: str) -> list[str]:
+    """Теги из строки через запятую: без пробелов по краям, пустых и повторов."""
+    out: list[str] = []
+    seen: set[str] = set()
+    for t in str(tags or "").split(","):
+        t = t.strip()
+        if t and t.casefold() not in seen:
+            seen.add(t.casefold())
+            out.append(t)
+    return out
+
+
+def sync_prompt_tags(cur: sqlite3.Cursor, rows) -> None:
+    """
+    Перестраивает prompt_tags для промтов rows = [(prompt_id, строка тегов), ...].
+    Выполняется курсором вызывающего, в его транзакции.
+    """
+    rows = [(r[0], r[1]) for r in rows]
+    if not rows:
+        return
+    cur.executemany("DELETE FROM prompt_tags WHERE prompt_id = ?", [(pid,) for pid, _ in rows])
+    pairs = [(pid, name) for pid, tags in rows for name in split_tags(tags)]
+    if not pairs:
+        return
+    cur.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(name,) for _, name in pairs])
+    cur.executemany(
+        "INSERT OR IGNORE INTO prompt_tags (prompt_id, tag_id) SELECT ?, id FROM tags WHERE name = ?",
+        pairs,
+    )
+
+
+def tag_counts(limit: Optional[int] = None) -> list[dict]:
+    """Теги с числом промтов (name, count), по убыванию числа."""
+    sql = (
+        "SELECT t.name, c.n as count FROM "
+        "(SELECT tag_id, COUNT(*) as n FROM prompt_tags GROUP BY tag_id) c "
+        "JOIN tags t ON t.id = c.tag_id "
+        "ORDER BY c.n DESC, t.name"
+    )
+    params: list = []
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def prompt_ids_by_tag(tag: str) -> list[int]:
+    """id промтов с тегом tag (поиск по индексу, без учёта регистра латиницы)."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT pt.prompt_id FROM tags t JOIN prompt_tags pt ON pt.tag_id = t.id "
+        "WHERE t.name = ? ORDER BY pt.prompt_id",
+        (tag.strip(),),
+    )
+    ids = [r[0] for r in cur.fetchall()]
+    conn.close()
+    return ids
+
+
+# Условие «у промта p есть тег ?» через индекс prompt_tags(tag_id, prompt_id)
+_TAG_FILTER = "p.id IN (SELECT pt.prompt_id FROM prompt_tags pt JOIN tags t ON t.id = pt.tag_id WHERE t.name = ?)"
+
+
 # --- CRUD: prompts ---
 
 def prompt_create(text: str, tags: str = "") -> int:
     """Создаёт промт. Возвращает id."""
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("INSERT INTO prompts (text, tags) VALUES (?, ?)", (text, tags))
-    pid = cur.lastrowid
+    pid = _insert_prompt(cur, text, tags)
     conn.commit()
     conn.close()
+    return pid
+
+
+def prompt_create_async(text: str, tags: str = "") -> Future:
+    """Создаёт промт через очередь записи. Future с id."""
+    return submit_write(_insert_prompt, text, tags)
+
+
+def _insert_prompt(cur: sqlite3.Cursor, text: str, tags: str = "") -> int:
+    cur.execute("INSERT INTO prompts (text, tags) VALUES (?, ?)", (text, tags))
+    pid = cur.lastrowid
+    sync_prompt_tags(cur, [(pid, tags)])
     return pid or 0
 
 
@@ -136,30 +318,80 @@ def prompt_get(pid: int) -> Optional[dict]:
     return dict(row) if row else None
 
 
-def prompt_list(order_by: str = "created", desc: bool = True, search: str = "") -> list[dict]:
-    """Список промтов. order_by: created|text, search — поиск по тексту и тегам."""
+def prompt_list(order_by: str = "created", desc: bool = True, search: str = "", tag: str = "") -> list[dict]:
+    """
+    Список промтов. order_by: created|text, search — поиск по тексту и тегам,
+    tag — только промты с этим тегом (по индексу prompt_tags).
+    """
     col = "created" if order_by == "created" else "text"
     dir_ = "DESC" if desc else "ASC"
+    where: list[str] = []
+    params: list = []
+    if search:
+        where.append("(p.text LIKE ? OR p.tags LIKE ?)")
+        params += [f"%{search}%", f"%{search}%"]
+    if tag:
+        where.append(_TAG_FILTER)
+        params.append(tag.strip())
+    sql = "SELECT p.id, p.created, p.text, p.tags FROM prompts p"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY p.{col} {dir_}"
     conn = get_connection()
     cur = conn.cursor()
-    if search:
-        cur.execute(
-            f"SELECT id, created, text, tags FROM prompts WHERE text LIKE ? OR tags LIKE ? ORDER BY {col} {dir_}",
-            (f"%{search}%", f"%{search}%"),
-        )
-    else:
-        cur.execute(f"SELECT id, created, text, tags FROM prompts ORDER BY {col} {dir_}")
+    cur.execute(sql, params)
     rows = cur.fetchall()
     conn.close()
     return [dict(r) for r in rows]
 
 
+def prompt_list_with_counts(
+    search: str = "", desc: bool = True, text_len: int = DEFAULT_PREVIEW_LEN, tag: str = ""
+) -> list[dict]:
+    """
+    Список промтов с количеством результатов одним сгруппированным запросом.
+    Текст промта усечён до text_len символов (поле text), число ответов — result_count.
+    tag — только промты с этим тегом.
+    """
+    dir_ = "DESC" if desc else "ASC"
+    sql = (
+        "SELECT p.id, p.created, substr(p.text, 1, ?) as text, p.tags, "
+        "COALESCE(c.n, 0) as result_count "
+        "FROM prompts p "
+        "LEFT JOIN (SELECT prompt_id, COUNT(*) as n FROM results GROUP BY prompt_id) c "
+        "ON c.prompt_id = p.id"
+    )
+    params: list = [max(0, int(text_len))]
+    where: list[str] = []
+    if search:
+        where.append("(p.text LIKE ? OR p.tags LIKE ?)")
+        params += [f"%{search}%", f"%{search}%"]
+    if tag:
+        where.append(_TAG_FILTER)
+        params.append(tag.strip())
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY p.created {dir_}, p.id {dir_}"
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+    archived = archived_counts()
+    if archived:
+        for r in rows:
+            r["result_count"] += archived.get(r["id"], 0)
+    return rows
+
+
 def prompt_update(pid: int, text: str, tags: str = "") -> bool:
     """Обновляет промт. Возвращает True при успехе."""
     conn = get_connection()
     cur = conn.cursor()
     cur.execute("UPDATE prompts SET text = ?, tags = ? WHERE id = ?", (text, tags, pid))
     ok = cur.rowcount > 0
+    if ok:
+        sync_prompt_tags(cur, [(pid, tags)])
     conn.commit()
     conn.close()
     return ok
@@ -171,6 +403,7 @@ def prompt_delete(pid: int) -> bool:
     cur = conn.cursor()
     cur.execute("DELETE FROM prompts WHERE id = ?", (pid,))
     ok = cur.rowcount > 0
+    cur.execute("DELETE FROM prompt_tags WHERE prompt_id = ?", (pid,))
     conn.commit()
     conn.close()
     return ok
@@ -178,13 +411,31 @@ def prompt_delete(pid: int) -> bool:
 
 # --- CRUD: models ---
 
-def model_create(name: str, api_url: str, api_id: str, model: str = "gpt-3.5-turbo", is_active: int = 1) -> int:
-    """Создаёт модель. Возвращает id."""
+def model_create(
+    name: str,
+    api_url: str,
+    api_id: str,
+    model: str = "gpt-3.5-turbo",
+    is_active: int = 1,
+    context_length: int = 0,
+    max_tokens: int = 0,
+    temperature: Optional[float] = None,
+    stop: str = "",
+    extra_params: str = "",
+    timeout: float = 0,
+    fallbacks: str = "",
+) -> int:
+    """Создаёт модель. Возвращает id. stop, extra_params и fallbacks — JSON-строки."""
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
-        "INSERT INTO models (name, api_url, api_id, model, is_active) VALUES (?, ?, ?, ?, ?)",
-        (name, api_url, api_id, model, is_active),
+        "INSERT INTO models (name, api_url, api_id, model, is_active, context_length, "
+        "max_tokens, temperature, stop, extra_params, timeout, fallbacks) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            name, api_url, api_id, model, is_active, context_length,
+            max_tokens, temperature, stop, extra_params, timeout, fallbacks,
+        ),
     )
     mid = cur.lastrowid
     conn.commit()
@@ -196,9 +447,7 @@ def model_get(mid: int) -> Optional[dict]:
     """Возвращает модель по id или None."""
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute(
-        "SELECT id, name, api_url, api_id, model, is_active FROM models WHERE id = ?", (mid,)
-    )
+    cur.execute(f"SELECT {_MODEL_COLUMNS} FROM models WHERE id = ?", (mid,))
     row = cur.fetchone()
     conn.close()
     return dict(row) if row else None
@@ -211,33 +460,49 @@ def model_list(active_only: bool = False, search: str = "") -> list[dict]:
     if active_only:
         if search:
             cur.execute(
-                "SELECT id, name, api_url, api_id, model, is_active FROM models WHERE is_active = 1 AND (name LIKE ? OR api_id LIKE ?)",
+                f"SELECT {_MODEL_COLUMNS} FROM models WHERE is_active = 1 AND (name LIKE ? OR api_id LIKE ?)",
                 (f"%{search}%", f"%{search}%"),
             )
         else:
-            cur.execute(
-                "SELECT id, name, api_url, api_id, model, is_active FROM models WHERE is_active = 1"
-            )
+            cur.execute(f"SELECT {_MODEL_COLUMNS} FROM models WHERE is_active = 1")
     else:
         if search:
             cur.execute(
-                "SELECT id, name, api_url, api_id, model, is_active FROM models WHERE name LIKE ? OR api_id LIKE ?",
+                f"SELECT {_MODEL_COLUMNS} FROM models WHERE name LIKE ? OR api_id LIKE ?",
                 (f"%{search}%", f"%{search}%"),
             )
         else:
-            cur.execute("SELECT id, name, api_url, api_id, model, is_active FROM models")
+            cur.execute(f"SELECT {_MODEL_COLUMNS} FROM models")
     rows = cur.fetchall()
     conn.close()
     return [dict(r) for r in rows]
 
 
-def model_update(mid: int, name: str, api_url: str, api_id: str, model: str, is_active: int) -> bool:
+def model_update(
+    mid: int,
+    name: str,
+    api_url: str,
+    api_id: str,
+    model: str,
+    is_active: int,
+    context_length: int = 0,
+    max_tokens: int = 0,
+    temperature: Optional[float] = None,
+    stop: str = "",
+    extra_params: str = "",
+    timeout: float = 0,
+    fallbacks: str = "",
+) -> bool:
     """Обновляет модель."""
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
-        "UPDATE models SET name = ?, api_url = ?, api_id = ?, model = ?, is_active = ? WHERE id = ?",
-        (name, api_url, api_id, model, is_active, mid),
+        "UPDATE models SET name = ?, api_url = ?, api_id = ?, model = ?, is_active = ?, context_length = ?, "
+        "max_tokens = ?, temperature = ?, stop = ?, extra_params = ?, timeout = ?, fallbacks = ? WHERE id = ?",
+        (
+            name, api_url, api_id, model, is_active, context_length,
+            max_tokens, temperature, stop, extra_params, timeout, fallbacks, mid,
+        ),
     )
     ok = cur.rowcount > 0
     conn.commit()
@@ -251,6 +516,7 @@ def model_delete(mid: int) -> bool:
     cur = conn.cursor()
     cur.execute("DELETE FROM models WHERE id = ?", (mid,))
     ok = cur.rowcount > 0
+    cur.execute("DELETE FROM model_latency WHERE model_id = ?", (mid,))
     conn.commit()
     conn.close()
     return ok
@@ -262,38 +528,535 @@ def result_create(prompt_id: int, model_id: int, response: str) -> int:
     """Создаёт результат. Возвращает id."""
     conn = get_connection()
     cur = conn.cursor()
+    rid = _insert_result(cur, prompt_id, model_id, response)
+    conn.commit()
+    conn.close()
+    return rid
+
+
+def _insert_result(cur: sqlite3.Cursor, prompt_id: int, model_id: int, response: str) -> int:
     cur.execute(
         "INSERT INTO results (prompt_id, model_id, response) VALUES (?, ?, ?)",
         (prompt_id, model_id, response),
     )
-    rid = cur.lastrowid
-    conn.commit()
-    conn.close()
-    return rid or 0
+    return cur.lastrowid or 0
+
+
+def results_save_async(prompt_id: Optional[int], prompt_text: str, responses: list[tuple[int, str]]) -> Future:
+    """
+    Сохраняет ответы [(model_id, response)] к промту через очередь записи одной операцией;
+    при prompt_id=None сначала создаёт промт с текстом prompt_text. Future с id промта.
+    """
+    return submit_write(_save_results, prompt_id, prompt_text, list(responses))
+
+
+def _save_results(cur: sqlite3.Cursor, prompt_id: Optional[int], prompt_text: str,
+                  responses: list[tuple[int, str]]) -> int:
+    if prompt_id is None:
+        prompt_id = _insert_prompt(cur, prompt_text)
+    cur.executemany(
+        "INSERT INTO results (prompt_id, model_id, response) VALUES (?, ?, ?)",
+        [(prompt_id, mid, response) for mid, response in responses],
+    )
+    return prompt_id
+
+
+_RESULT_META_COLUMNS = "r.id, r.prompt_id, r.model_id, r.created, m.name as model_name"
+
+
+def _result_columns(fields: str) -> tuple[str, bool]:
+    """Возвращает (список колонок SELECT, нужен ли параметр длины превью)."""
+    if fields == RESULT_FIELDS_META:
+        return _RESULT_META_COLUMNS, False
+    if fields == RESULT_FIELDS_PREVIEW:
+        return f"{_RESULT_META_COLUMNS}, substr(r.response, 1, ?) as preview", True
+    if fields == RESULT_FIELDS_FULL:
+        return f"{_RESULT_META_COLUMNS}, r.response", False
+    raise ValueError(f"Неизвестная проекция результатов: {fields}")
+
 
+def result_list(
+    prompt_id: Optional[int] = None,
+    order_by: str = "created",
+    desc: bool = True,
+    fields: str = RESULT_FIELDS_FULL,
+    preview_len: int = DEFAULT_PREVIEW_LEN,
+    limit: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> list[dict]:
+    """
+    Список результатов. prompt_id — фильтр по промту.
 
-def result_list(prompt_id: Optional[int] = None, order_by: str = "created", desc: bool = True) -> list[dict]:
-    """Список результатов. prompt_id — фильтр по промту."""
+    fields — проекция: meta (без текста ответа), preview (первые preview_len
+    символов в поле preview) или full (полный response). Для просмотра истории
+    достаточно meta/preview, полный текст берётся через result_get_body.
+
+    since / until — диапазон created [since, until) («ГГГГ-ММ-ДД[ ЧЧ:ММ:СС]», UTC).
+    Архивы старых результатов (archive_results) подключаются, только если
+    их месяцы попадают в диапазон; без since — все архивы.
+    """
     col = "created" if order_by == "created" else "id"
     dir_ = "DESC" if desc else "ASC"
+    columns, with_preview = _result_columns(fields)
+    params: list = [max(0, int(preview_len))] if with_preview else []
+    where, where_params = _result_where(prompt_id, since, until)
+    archives = _archives_for(since, until)
+    if not archives:
+        sql = f"SELECT {columns} FROM results r JOIN models m ON r.model_id = m.id"
+        if where:
+            sql += " WHERE " + where
+        sql += f" ORDER BY r.{col} {dir_}"
+        live_params = params + where_params
+        if limit is not None:
+            sql += " LIMIT ?"
+            live_params.append(int(limit))
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(sql, live_params)
+        rows = cur.fetchall()
+        conn.close()
+        return [dict(r) for r in rows]
+
+    # Живая БД и архивы: UNION ALL по группам подключённых архивов, затем слияние групп
+    arm_columns = "id, prompt_id, model_id, created"
+    if fields == RESULT_FIELDS_PREVIEW:
+        arm_columns += ", substr(response, 1, ?) as preview"
+    elif fields == RESULT_FIELDS_FULL:
+        arm_columns += ", response"
+    out: list[dict] = []
+    conn = get_connection()
+    try:
+        groups = [archives[i:i + ARCHIVE_ATTACH_MAX] for i in range(0, len(archives), ARCHIVE_ATTACH_MAX)]
+        for n, group in enumerate(groups):
+            with _attached(conn, group) as schemas:
+                if n == 0:
+                    schemas = ["main"] + schemas
+                arms = [f"SELECT {arm_columns} FROM {s}.results" + (f" WHERE {where}" if where else "")
+                        for s in schemas]
+                arm_params = (params + where_params) * len(arms)
+                sql = (
+                    f"SELECT r.*, m.name as model_name FROM ({' UNION ALL '.join(arms)}) r "
+                    f"JOIN main.models m ON r.model_id = m.id ORDER BY r.{col} {dir_}"
+                )
+                if limit is not None:
+                    sql += " LIMIT ?"
+                    arm_params.append(int(limit))
+                cur = conn.cursor()
+                cur.execute(sql, arm_params)
+                out.extend(dict(r) for r in cur.fetchall())
+    finally:
+        conn.close()
+    if len(groups) > 1:
+        out.sort(key=lambda r: (r[col], r["id"]), reverse=desc)
+    return out[:limit] if limit is not None else out
+
+
+def _result_where(prompt_id: Optional[int], since: Optional[str], until: Optional[str]) -> tuple[str, list]:
+    where, params = [], []
+    if prompt_id is not None:
+        where.append("prompt_id = ?")
+        params.append(prompt_id)
+    if since:
+        where.append("created >= ?")
+        params.append(since)
+    if until:
+        where.append("created < ?")
+        params.append(until)
+    return " AND ".join(where), params
+
+
+def result_get_body(rid: int) -> Optional[str]:
+    """Возвращает полный текст ответа по id результата или None (ищется и в архивах)."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT response FROM results WHERE id = ?", (rid,))
+    row = cur.fetchone()
+    conn.close()
+    if row:
+        return row["response"]
+    for _, path in reversed(archive_months()):
+        with _archive_connection(path) as arc:
+            row = arc.execute("SELECT response FROM results WHERE id = ?", (rid,)).fetchone()
+        if row:
+            return row[0]
+    return None
+
+
+def result_count(prompt_id: Optional[int] = None) -> int:
+    """Количество результатов (всего или по промту, с архивами) без чтения текстов ответов."""
     conn = get_connection()
     cur = conn.cursor()
     if prompt_id is not None:
-        cur.execute(
-            f"SELECT r.id, r.prompt_id, r.model_id, r.response, r.created, m.name as model_name "
-            f"FROM results r JOIN models m ON r.model_id = m.id "
-            f"WHERE r.prompt_id = ? ORDER BY r.{col} {dir_}",
-            (prompt_id,),
-        )
+        cur.execute("SELECT COUNT(*) FROM results WHERE prompt_id = ?", (prompt_id,))
     else:
-        cur.execute(
-            f"SELECT r.id, r.prompt_id, r.model_id, r.response, r.created, m.name as model_name "
-            f"FROM results r JOIN models m ON r.model_id = m.id "
-            f"ORDER BY r.{col} {dir_}"
-        )
-    rows = cur.fetchall()
+        cur.execute("SELECT COUNT(*) FROM results")
+    n = cur.fetchone()[0]
     conn.close()
-    return [dict(r) for r in rows]
+    for _, path in archive_months():
+        counts = _archive_counts(path)
+        n += counts.get(prompt_id, 0) if prompt_id is not None else sum(counts.values())
+    return n
+
+
+# --- Архив результатов ---
+# Результаты старше N дней переносятся в помесячные файлы SQLite рядом с БД
+# (chatlist_archive/results-ГГГГ-ММ.db) с той же схемой results и теми же id.
+# Живая БД остаётся маленькой; архивы подключаются (ATTACH) только запросами,
+# диапазон которых их затрагивает.
+
+ARCHIVE_PREFIX = "results-"
+ARCHIVE_ATTACH_MAX = 8  # архивов в одном запросе (SQLite подключает не более 10 БД)
+ARCHIVE_CHUNK = 5000  # строк на транзакцию переноса: блокировки держатся недолго
+
+_archive_counts_cache: dict[Path, tuple[float, dict]] = {}
+_archive_counts_lock = threading.Lock()
+
+
+def archive_dir() -> Path:
+    """Папка архивов текущей БД."""
+    return DB_PATH.parent / f"{DB_PATH.stem}_archive"
+
+
+def archive_months() -> list[tuple[str, Path]]:
+    """Архивы [(«ГГГГ-ММ», путь)] по возрастанию месяца."""
+    d = archive_dir()
+    if not d.is_dir():
+        return []
+    out = []
+    for path in d.glob(f"{ARCHIVE_PREFIX}*.db"):
+        month = path.stem[len(ARCHIVE_PREFIX):]
+        if len(month) == 7 and month[4] == "-":
+            out.append((month, path))
+    return sorted(out)
+
+
+def _month_range(month: str) -> tuple[str, str]:
+    """Границы месяца «ГГГГ-ММ» в формате created: [начало, начало следующего)."""
+    y, m = int(month[:4]), int(month[5:])
+    ny, nm = (y + 1, 1) if m == 12 else (y, m + 1)
+    return f"{y:04d}-{m:02d}-01", f"{ny:04d}-{nm:02d}-01"
+
+
+def _archives_for(since: Optional[str], until: Optional[str]) -> list[Path]:
+    """Архивы, месяцы которых пересекаются с диапазоном [since, until)."""
+    out = []
+    for month, path in archive_months():
+        start, end = _month_range(month)
+        if (since and end <= since) or (until and start >= until):
+            continue
+        out.append(path)
+    return out
+
+
+@contextmanager
+def _attached(conn: sqlite3.Connection, paths: list[Path]):
+    """Подключает архивы к соединению как a0, a1, … и отключает после запроса."""
+    schemas = []
+    try:
+        for i, path in enumerate(paths):
+            conn.execute(f"ATTACH DATABASE ? AS a{i}", (str(path),))
+            schemas.append(f"a{i}")
+        yield list(schemas)
+    finally:
+        for s in schemas:
+            conn.execute(f"DETACH DATABASE {s}")
+
+
+@contextmanager
+def _archive_connection(path: Path):
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _archive_counts(path: Path) -> dict:
+    """{prompt_id: число ответов} архива; кэшируется до изменения файла."""
+    mtime = path.stat().st_mtime
+    with _archive_counts_lock:
+        cached = _archive_counts_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with _archive_connection(path) as arc:
+        counts = dict(arc.execute("SELECT prompt_id, COUNT(*) FROM results GROUP BY prompt_id").fetchall())
+    with _archive_counts_lock:
+        _archive_counts_cache[path] = (mtime, counts)
+    return counts
+
+
+def archived_result_exists(prompt_id: int, model_id: int, response: str, since: Optional[str] = None) -> bool:
+    """Есть ли такой ответ в архивах месяцев, не раньше since (UTC, формат created)."""
+    for path in _archives_for(since, None):
+        with _archive_connection(path) as arc:
+            if arc.execute(
+                "SELECT 1 FROM results WHERE prompt_id = ? AND model_id = ? AND response = ? LIMIT 1",
+                (prompt_id, model_id, response),
+            ).fetchone():
+                return True
+    return False
+
+
+def archived_counts() -> dict:
+    """{prompt_id: число ответов} по всем архивам."""
+    total: dict = {}
+    for _, path in archive_months():
+        for pid, n in _archive_counts(path).items():
+            total[pid] = total.get(pid, 0) + n
+    return total
+
+
+def _create_archive(path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY,
+            prompt_id INTEGER NOT NULL,
+            model_id INTEGER NOT NULL,
+            response TEXT NOT NULL,
+            created DATETIME
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_prompt_id ON results(prompt_id);
+        CREATE INDEX IF NOT EXISTS idx_results_created ON results(created);
+        CREATE INDEX IF NOT EXISTS idx_results_meta ON results(prompt_id, created, model_id);
+    """)
+    conn.close()
+
+
+def archive_results(older_than_days: int) -> dict[str, int]:
+    """
+    Переносит результаты старше older_than_days дней в помесячные архивы.
+    Перенос идёт порциями по ARCHIVE_CHUNK строк, каждая — одна транзакция
+    на живую БД и архив. Возвращает {«ГГГГ-ММ»: перенесено строк}.
+    """
+    cutoff = (datetime.utcnow() - timedelta(days=max(0, int(older_than_days)))).strftime("%Y-%m-%d %H:%M:%S")
+    flush_writes()
+    moved: dict[str, int] = {}
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT substr(created, 1, 7) FROM results WHERE created < ?", (cutoff,))
+        months = sorted(r[0] for r in cur.fetchall() if r[0] and len(r[0]) == 7)
+        for month in months:
+            start, end = _month_range(month)
+            end = min(end, cutoff)
+            path = archive_dir() / f"{ARCHIVE_PREFIX}{month}.db"
+            _create_archive(path)
+            conn.execute("ATTACH DATABASE ? AS arc", (str(path),))
+            try:
+                while True:
+                    with conn:
+                        cur.execute(
+                            "CREATE TEMP TABLE IF NOT EXISTS archive_ids (id INTEGER PRIMARY KEY)"
+                        )
+                        cur.execute("DELETE FROM archive_ids")
+                        cur.execute(
+                            "INSERT INTO archive_ids SELECT id FROM main.results "
+                            "WHERE created >= ? AND created < ? LIMIT ?",
+                            (start, end, ARCHIVE_CHUNK),
+                        )
+                        n = cur.rowcount
+                        if n <= 0:
+                            break
+                        cur.execute(
+                            "INSERT OR REPLACE INTO arc.results (id, prompt_id, model_id, response, created) "
+                            "SELECT id, prompt_id, model_id, response, created FROM main.results "
+                            "WHERE id IN (SELECT id FROM archive_ids)"
+                        )
+                        cur.execute("DELETE FROM main.results WHERE id IN (SELECT id FROM archive_ids)")
+                    moved[month] = moved.get(month, 0) + n
+            finally:
+                conn.execute("DETACH DATABASE arc")
+    finally:
+        conn.close()
+    return moved
+
+
+# --- Обслуживание ---
+# Очистка по сроку хранения, освобождение страниц и статистика планировщика запросов.
+# Удаления идут порциями через очередь записи: блокировка записи держится
+# на время одной порции, записи интерфейса ждут не дольше неё.
+
+PRUNE_TABLES = ("results", "model_latency")  # таблицы со сроком хранения (id + created)
+PRUNE_CHUNK = 2000  # строк на порцию удаления
+VACUUM_STEP_PAGES = 512  # страниц на шаг PRAGMA incremental_vacuum
+ANALYSIS_LIMIT = 1000  # строк индекса, просматриваемых ANALYZE (приблизительная статистика)
+
+
+def _delete_chunk(cur: sqlite3.Cursor, table: str, where: str, params: tuple,
+                  limit: int) -> tuple[int, Optional[str]]:
+    cur.execute(
+        f"SELECT MAX(created) FROM (SELECT created FROM {table} WHERE {where} ORDER BY id LIMIT ?)",
+        (*params, limit),
+    )
+    newest = cur.fetchone()[0]
+    cur.execute(
+        f"DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE {where} ORDER BY id LIMIT ?)",
+        (*params, limit),
+    )
+    return cur.rowcount, newest
+
+
+def prune_rows(
+    table: str,
+    before: Optional[str] = None,
+    keep: Optional[int] = None,
+    chunk: int = PRUNE_CHUNK,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> tuple[int, Optional[str]]:
+    """
+    Удаляет строки table из PRUNE_TABLES: созданные раньше before (UTC, формат
+    created) и/или все, кроме keep последних. Порции по chunk строк — отдельные
+    операции очереди записи; should_stop() прерывает удаление между порциями.
+    Возвращает (число удалённых строк, наибольший created среди удалённых или None).
+    """
+    if table not in PRUNE_TABLES:
+        raise ValueError(f"Очистка таблицы {table} не поддерживается")
+    conds, params = [], []
+    if before:
+        conds.append("created < ?")
+        params.append(before)
+    if keep is not None:
+        conn = get_connection()
+        try:
+            row = conn.execute(
+                f"SELECT id FROM {table} ORDER BY id DESC LIMIT 1 OFFSET ?", (max(0, int(keep)),)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None and not before:
+            return 0, None
+        if row is not None:
+            # Граница вычисляется один раз: новые строки во время очистки не удаляются
+            conds.append("id <= ?")
+            params.append(row[0])
+    if not conds:
+        return 0, None
+    where = " OR ".join(conds)
+    deleted, newest = 0, None
+    while not (should_stop and should_stop()):
+        n, chunk_newest = submit_write(_delete_chunk, table, where, tuple(params), chunk).result()
+        deleted += n
+        if chunk_newest and (newest is None or chunk_newest > newest):
+            newest = chunk_newest
+        if n < chunk:
+            break
+    return deleted, newest
+
+
+def prune_archives(before: str) -> dict[str, int]:
+    """
+    Удаляет архивы результатов, месяцы которых целиком раньше before.
+    Возвращает {«ГГГГ-ММ»: размер удалённого файла в байтах}.
+    """
+    removed: dict[str, int] = {}
+    for month, path in archive_months():
+        if _month_range(month)[1] > before:
+            continue
+        size = path.stat().st_size
+        path.unlink()
+        with _archive_counts_lock:
+            _archive_counts_cache.pop(path, None)
+        removed[month] = size
+    return removed
+
+
+def db_space() -> dict:
+    """Размер БД: page_size, page_count, freelist_count (свободные страницы), auto_vacuum (0/1/2)."""
+    conn = get_connection()
+    try:
+        return {
+            name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+            for name in ("page_size", "page_count", "freelist_count", "auto_vacuum")
+        }
+    finally:
+        conn.close()
+
+
+def _incremental_vacuum(cur: sqlite3.Cursor, pages: int) -> int:
+    free = cur.execute("PRAGMA freelist_count").fetchone()[0]
+    # Прагма освобождает по странице на шаг выполнения, а sqlite3 делает один шаг
+    # для запроса без колонок — поэтому execute повторяется на каждую страницу
+    for _ in range(min(free, int(pages))):
+        cur.execute("PRAGMA incremental_vacuum")
+    return free - cur.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def incremental_vacuum(pages: int = VACUUM_STEP_PAGES) -> int:
+    """
+    Возвращает файловой системе до pages свободных страниц (при auto_vacuum=INCREMENTAL)
+    одной операцией очереди записи. Возвращает число освобождённых страниц.
+    """
+    return submit_write(_incremental_vacuum, pages).result()
+
+
+def _analyze(cur: sqlite3.Cursor, full: bool) -> None:
+    cur.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    cur.execute("ANALYZE" if full else "PRAGMA optimize")
+    cur.fetchall()
+
+
+def analyze(full: bool = False) -> None:
+    """
+    Обновляет статистику планировщика: full — ANALYZE всех индексов,
+    иначе PRAGMA optimize (анализ только таблиц, где статистика устарела).
+    """
+    submit_write(_analyze, full).result()
+
+
+def vacuum() -> None:
+    """
+    Полный VACUUM: пересобирает файл и включает auto_vacuum=INCREMENTAL в БД,
+    созданной до его появления. Блокирует БД на всё время — только для небольших
+    файлов или по явной команде.
+    """
+    flush_writes()
+    conn = sqlite3.connect(DB_PATH, isolation_level=None, timeout=1.0)
+    try:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+# --- Задержки моделей ---
+
+def latency_add(model_id: int, seconds: float, keep: int) -> None:
+    """Добавляет задержку запроса и оставляет для модели только keep последних."""
+    conn = get_connection()
+    _add_latency(conn.cursor(), model_id, seconds, keep)
+    conn.commit()
+    conn.close()
+
+
+def latency_add_async(model_id: int, seconds: float, keep: int) -> Future:
+    """latency_add через очередь записи."""
+    return submit_write(_add_latency, model_id, seconds, keep)
+
+
+def _add_latency(cur: sqlite3.Cursor, model_id: int, seconds: float, keep: int) -> None:
+    cur.execute("INSERT INTO model_latency (model_id, seconds) VALUES (?, ?)", (model_id, seconds))
+    cur.execute(
+        "DELETE FROM model_latency WHERE model_id = ? AND id <= "
+        "(SELECT id FROM model_latency WHERE model_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+        (model_id, model_id, keep),
+    )
+
+
+def latency_list(model_id: int, limit: int) -> list[float]:
+    """Последние limit задержек модели (секунды), от старых к новым."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT seconds FROM model_latency WHERE model_id = ? ORDER BY id DESC LIMIT ?",
+        (model_id, limit),
+    )
+    rows = [r[0] for r in cur.fetchall()]
+    conn.close()
+    rows.reverse()
+    return rows
 
 
 # --- CRUD: settings ---
@@ -318,3 +1081,189 @@ def setting_set(key: str, value: str) -> None:
     )
     conn.commit()
     conn.close()
+
+
+def setting_all() -> dict[str, str]:
+    """Все настройки {ключ: значение}."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT key, value FROM settings")
+    rows = {r["key"]: r["value"] for r in cur.fetchall()}
+    conn.close()
+    return rows
+
+
+def setting_set_many(values: dict[str, str]) -> None:
+    """Устанавливает несколько настроек одной транзакцией."""
+    conn = get_connection()
+    _upsert_settings(conn.cursor(), values)
+    conn.commit()
+    conn.close()
+
+
+def setting_set_many_async(values: dict[str, str]) -> Future:
+    """setting_set_many через очередь записи."""
+    return submit_write(_upsert_settings, dict(values))
+
+
+def _upsert_settings(cur: sqlite3.Cursor, values: dict[str, str]) -> None:
+    cur.executemany(
+        "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        list(values.items()),
+    )
+
+
+# --- Очередь записи ---
+
+WRITE_QUEUE_SIZE = 1000  # операций; при заполнении submit_write ждёт
+WRITE_BATCH_MAX = 200  # операций в одной транзакции
+
+
+class DbWriter(threading.Thread):
+    """
+    Единственный поток записи. Операция — функция op(cur, *args), её результат
+    (напр. id новой строки) возвращается через Future после COMMIT. Всё, что
+    накопилось в очереди, выполняется одной транзакцией; каждая операция — в своей
+    точке сохранения, так что ошибка одной не отменяет остальные.
+    """
+
+    def __init__(self):
+        super().__init__(name="db-writer", daemon=True)
+        self._queue: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_path: Optional[Path] = None
+
+    def submit(self, op: Optional[Callable], *args) -> Future:
+        fut: Future = Future()
+        self._queue.put((op, args, fut))
+        return fut
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт, пока будут записаны все операции, поставленные до вызова."""
+        try:
+            self.submit(_noop).result(timeout)
+            return True
+        except FutureTimeoutError:
+            return False
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Записывает очередь и останавливает поток."""
+        self.submit(None)
+        self.join(timeout)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._conn_path != DB_PATH:
+            if self._conn is not None:
+                self._conn.close()
+            # Транзакциями управляет сам писатель (BEGIN / SAVEPOINT / COMMIT);
+            # из другого потока подключение читает только backup_to
+            self._conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn_path = DB_PATH
+        return self._conn
+
+    def run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH_MAX:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(op is None for op, _, _ in batch)
+            self._commit([item for item in batch if item[0] is not None])
+            for op, _, fut in batch:
+                if op is None:
+                    fut.set_result(None)
+            if stop:
+                if self._conn is not None:
+                    self._conn.close()
+                return
+
+    def _commit(self, batch: list) -> None:
+        if not batch:
+            return
+        done: list[tuple[Future, object, Optional[BaseException]]] = []
+        try:
+            conn = self._connection()
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            for op, args, fut in batch:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                cur.execute("SAVEPOINT op")
+                try:
+                    result = op(cur, *args)
+                except Exception as e:
+                    cur.execute("ROLLBACK TO op")
+                    cur.execute("RELEASE op")
+                    done.append((fut, None, e))
+                else:
+                    cur.execute("RELEASE op")
+                    done.append((fut, result, None))
+            cur.execute("COMMIT")
+        except sqlite3.Error as e:
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for fut, result, err in done:
+            if err is not None:
+                fut.set_exception(err)
+            else:
+                fut.set_result(result)
+
+
+def _noop(cur: sqlite3.Cursor) -> None:
+    return None
+
+
+def _writer_connection(cur: sqlite3.Cursor) -> sqlite3.Connection:
+    return cur.connection
+
+
+_writer: Optional[DbWriter] = None
+_writer_lock = threading.Lock()
+
+
+def submit_write(op: Callable, *args) -> Future:
+    """Ставит операцию op(cur, *args) в очередь записи. Future с её результатом."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = DbWriter()
+            _writer.start()
+        writer = _writer
+    return writer.submit(op, *args)
+
+
+def flush_writes(timeout: Optional[float] = None) -> bool:
+    """Барьер: ждёт записи всех операций, поставленных в очередь до вызова."""
+    with _writer_lock:
+        writer = _writer
+    if writer is None or not writer.is_alive():
+        return True
+    return writer.flush(timeout)
+
+
+def backup_to(dst: sqlite3.Connection, pages: int, progress: Optional[Callable] = None,
+              sleep: float = 0.25) -> None:
+    """
+    Копирует БД в dst через online backup API на подключении потока записи. Изменения,
+    которые записывает очередь во время копирования, SQLite переносит в копию сам, без
+    перезапуска копии; перезапуск вызывают только записи других подключений. Копия
+    включает все операции, поставленные в очередь до вызова.
+    """
+    conn = submit_write(_writer_connection).result()
+    conn.backup(dst, pages=pages, progress=progress, sleep=sleep)
+
+
+def stop_writer(timeout: Optional[float] = None) -> None:
+    """Записывает очередь и останавливает поток записи (при выходе из программы)."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None and writer.is_alive():
+        writer.stop(timeout)
@@ -0,0 +1,205 @@
+"""
+Потоковый экспорт данных ChatList в файлы.
+Строки читаются из курсора SQLite по одной (db.iter_rows) и сразу пишутся
+в файл, поэтому расход памяти не зависит от размера выборки.
+
+Форматы:
+- jsonl — одна JSON-запись на строку;
+- csv — с заголовком, UTF-8 с BOM (открывается в Excel);
+- col — компактный колоночный формат ChatList (см. write_columnar / read_columnar).
+"""
+import csv
+import json
+import struct
+import zlib
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+import db
+
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+FORMAT_COLUMNAR = "col"
+FORMATS = (FORMAT_JSONL, FORMAT_CSV, FORMAT_COLUMNAR)
+
+# Колоночный формат: сигнатура, JSON-заголовок со списком колонок,
+# затем блоки строк (row groups), каждый — zlib-сжатый JSON {колонка: [значения]}
+COLUMNAR_MAGIC = b"CHATLISTCOL1\n"
+COLUMNAR_ROW_GROUP = 1000
+
+# Готовые выборки для экспорта
+EXPORT_QUERIES = {
+    "results": (
+        "SELECT r.id, r.created, r.prompt_id, p.text as prompt, r.model_id, "
+        "m.name as model_name, m.model as model, r.response "
+        "FROM results r "
+        "JOIN prompts p ON r.prompt_id = p.id "
+        "JOIN models m ON r.model_id = m.id "
+        "ORDER BY r.id"
+    ),
+    "prompts": "SELECT id, created, text, tags FROM prompts ORDER BY id",
+    "models": (
+        "SELECT id, name, api_url, api_id, model, is_active, context_length, "
+        "max_tokens, temperature, stop, extra_params, timeout, fallbacks FROM models ORDER BY id"
+    ),
+}
+
+# callback(rows_written) — вызывается каждые PROGRESS_EVERY строк
+ProgressCallback = Callable[[int], None]
+PROGRESS_EVERY = 1000
+
+
+class ExportError(Exception):
+    """Ошибка экспорта."""
+    pass
+
+
+def format_from_path(path: Path) -> str:
+    """Определяет формат по расширению файла."""
+    ext = Path(path).suffix.lower().lstrip(".")
+    if ext in FORMATS:
+        return ext
+    raise ExportError(f"Неизвестный формат экспорта: .{ext}. Поддерживаются: {', '.join(FORMATS)}")
+
+
+def _tick(n: int, on_progress: Optional[ProgressCallback]) -> None:
+    if on_progress and n % PROGRESS_EVERY == 0:
+        on_progress(n)
+
+
+def write_jsonl(rows: Iterable[dict], path: Path, on_progress: Optional[ProgressCallback] = None) -> int:
+    """Пишет строки в JSONL. Возвращает число строк."""
+    n = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+            n += 1
+            _tick(n, on_progress)
+    return n
+
+
+def write_csv(rows: Iterable[dict], path: Path, on_progress: Optional[ProgressCallback] = None) -> int:
+    """Пишет строки в CSV (заголовок — по колонкам первой строки). Возвращает число строк."""
+    n = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow(row)
+            n += 1
+            _tick(n, on_progress)
+    return n
+
+
+def _write_block(f, payload: dict) -> None:
+    data = zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    f.write(struct.pack("<I", len(data)))
+    f.write(data)
+
+
+def write_columnar(
+    rows: Iterable[dict],
+    path: Path,
+    on_progress: Optional[ProgressCallback] = None,
+    row_group: int = COLUMNAR_ROW_GROUP,
+) -> int:
+    """
+    Пишет строки в колоночный формат ChatList. Возвращает число строк.
+    В памяти держится только текущая группа из row_group строк.
+    """
+    n = 0
+    columns: list[str] = []
+    group: dict[str, list] = {}
+    in_group = 0
+    with open(path, "wb") as f:
+        f.write(COLUMNAR_MAGIC)
+        for row in rows:
+            if not columns:
+                columns = list(row.keys())
+                header = json.dumps({"columns": columns}, ensure_ascii=False).encode("utf-8")
+                f.write(struct.pack("<I", len(header)))
+                f.write(header)
+                group = {c: [] for c in columns}
+            for c in columns:
+                group[c].append(row.get(c))
+            in_group += 1
+            n += 1
+            if in_group >= row_group:
+                _write_block(f, group)
+                group = {c: [] for c in columns}
+                in_group = 0
+            _tick(n, on_progress)
+        if not columns:
+            f.write(struct.pack("<I", 2))
+            f.write(b"{}")
+        elif in_group:
+            _write_block(f, group)
+    return n
+
+
+def read_columnar(path: Path) -> Iterator[dict]:
+    """Читает файл колоночного формата построчно (по одной группе в памяти)."""
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ExportError(f"{path}: не файл колоночного формата ChatList")
+        (size,) = struct.unpack("<I", f.read(4))
+        columns = json.loads(f.read(size).decode("utf-8")).get("columns", [])
+        while True:
+            head = f.read(4)
+            if len(head) < 4:
+                break
+            (size,) = struct.unpack("<I", head)
+            group = json.loads(zlib.decompress(f.read(size)).decode("utf-8"))
+            for values in zip(*(group[c] for c in columns)):
+                yield dict(zip(columns, values))
+
+
+_WRITERS = {
+    FORMAT_JSONL: write_jsonl,
+    FORMAT_CSV: write_csv,
+    FORMAT_COLUMNAR: write_columnar,
+}
+
+
+def export_query(
+    sql: str,
+    path: Path,
+    params: tuple | list = (),
+    fmt: Optional[str] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> int:
+    """
+    Экспортирует результат произвольного SELECT в файл.
+    fmt — jsonl|csv|col, по умолчанию по расширению path. Возвращает число строк.
+    Запись идёт во временный файл, который заменяет path только после успеха.
+    """
+    path = Path(path)
+    fmt = fmt or format_from_path(path)
+    writer = _WRITERS.get(fmt)
+    if writer is None:
+        raise ExportError(f"Неизвестный формат экспорта: {fmt}")
+    tmp = path.with_name(path.name + ".part")
+    db.flush_writes()  # в выгрузку попадают и записи из очереди
+    try:
+        n = writer(db.iter_rows(sql, params), tmp, on_progress)
+        tmp.replace(path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return n
+
+
+def export_table(
+    source: str,
+    path: Path,
+    fmt: Optional[str] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> int:
+    """Экспортирует готовую выборку: results | prompts | models."""
+    sql = EXPORT_QUERIES.get(source)
+    if sql is None:
+        raise ExportError(f"Неизвестный источник экспорта: {source}")
+    return export_query(sql, path, fmt=fmt, on_progress=on_progress)
@@ -0,0 +1,144 @@
+"""
+Проверка доступности моделей (health probes).
+Проба — дешёвый запрос к эндпоинту модели: GET списка моделей провайдера, а если
+он недоступен — chat/completions с max_tokens=1. Пробы идут через общий транспорт
+(transport.py) и заодно держат его соединения с провайдерами «тёплыми».
+Фоновый HealthProber периодически проверяет активные модели.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import network
+import transport
+from models import Model, get_active_models
+
+PROBE_TIMEOUT = 10.0
+MAX_PROBE_WORKERS = 8
+DEFAULT_PROBE_INTERVAL = 0  # минут; 0 — фоновые пробы выключены
+MIN_PROBE_INTERVAL = 10.0  # секунд
+
+
+@dataclass
+class ProbeResult:
+    """Итог пробы одной модели."""
+    model_id: int
+    ok: bool
+    seconds: float  # время ответа эндпоинта
+    error: str = ""
+    checked_at: float = 0.0  # time.time() проверки
+
+    def status_text(self) -> str:
+        if self.ok:
+            return f"OK, {self.seconds * 1000:.0f} мс"
+        return f"Ошибка: {self.error}"
+
+
+_results: dict[int, ProbeResult] = {}
+_lock = threading.Lock()
+
+
+def models_url(api_url: str) -> Optional[str]:
+    """URL списка моделей провайдера по URL chat/completions или None."""
+    base = api_url.rstrip("/")
+    if base.endswith("/chat/completions"):
+        return base[: -len("/chat/completions")] + "/models"
+    return None
+
+
+def _probe_request(model: Model, timeout: float) -> transport.Response:
+    # Пробы — фоновая работа: ждут, пока интерактивные запросы к хосту не получат слоты
+    with network.scheduler.slot(network.host_of(model.api_url), network.PRIORITY_BACKGROUND, timeout):
+        return _probe_request_now(model, timeout)
+
+
+def _probe_request_now(model: Model, timeout: float) -> transport.Response:
+    t = transport.get_transport()
+    headers = network._headers(model)
+    url = models_url(model.api_url)
+    if url:
+        resp = t.request("GET", url, headers=headers, timeout=timeout)
+        if resp.status_code not in (404, 405):
+            return resp
+    # Списка моделей нет — самый дешёвый запрос генерации
+    payload = network.build_payload(model, [{"role": "user", "content": "ping"}], max_tokens=1)
+    return t.request("POST", model.api_url, headers=headers, timeout=timeout, json=payload)
+
+
+def probe_model(model: Model, timeout: float = PROBE_TIMEOUT) -> ProbeResult:
+    """Проверяет одну модель и запоминает результат (см. last_result)."""
+    start = time.perf_counter()
+    try:
+        resp = _probe_request(model, timeout)
+        if resp.status_code >= 400:
+            raise network.NetworkError(f"HTTP {resp.status_code}")
+        result = ProbeResult(model.id, True, time.perf_counter() - start)
+    except network.NetworkError as e:
+        result = ProbeResult(model.id, False, time.perf_counter() - start, str(e))
+    except transport.TransportTimeout:
+        result = ProbeResult(model.id, False, time.perf_counter() - start, "таймаут")
+    except transport.TransportError as e:
+        result = ProbeResult(model.id, False, time.perf_counter() - start, str(e))
+    result.checked_at = time.time()
+    with _lock:
+        _results[model.id] = result
+    return result
+
+
+def probe_all(models: list[Model], timeout: float = PROBE_TIMEOUT,
+              max_workers: int = MAX_PROBE_WORKERS) -> dict[int, ProbeResult]:
+    """Проверяет модели параллельно. Возвращает {model_id: ProbeResult}."""
+    if not models:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(models), max_workers)) as pool:
+        results = list(pool.map(lambda m: probe_model(m, timeout), models))
+    return {r.model_id: r for r in results}
+
+
+def last_result(model_id: int) -> Optional[ProbeResult]:
+    """Результат последней пробы модели или None."""
+    with _lock:
+        return _results.get(model_id)
+
+
+class HealthProber(threading.Thread):
+    """
+    Фоновые пробы активных моделей раз в interval секунд.
+    on_result(results) вызывается из потока пробера после каждого круга.
+    """
+
+    def __init__(self, interval: float,
+                 on_result: Optional[Callable[[dict[int, ProbeResult]], None]] = None):
+        super().__init__(name="HealthProber", daemon=True)
+        self.interval = max(MIN_PROBE_INTERVAL, float(interval))
+        self.on_result = on_result
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                results = probe_all(get_active_models())
+            except Exception:
+                continue  # пробы не должны ронять приложение
+            if self.on_result:
+                self.on_result(results)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_prober: Optional[HealthProber] = None
+
+
+def configure_prober(interval: float) -> None:
+    """Запускает фоновые пробы раз в interval секунд; 0 — останавливает их."""
+    global _prober
+    with _lock:
+        old, _prober = _prober, None
+        if interval > 0:
+            _prober = HealthProber(interval)
+            _prober.start()
+    if old is not None:
+        old.stop()
@@ -0,0 +1,255 @@
+"""
+Диалог «История»: промты с числом сохранённых результатов.
+Результаты промта подгружаются при раскрытии узла дерева.
+"""
+from PyQt5.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+    QPushButton,
+    QLineEdit,
+    QLabel,
+    QMessageBox,
+    QTreeView,
+    QHeaderView,
+    QAbstractItemView,
+)
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex, QTimer
+
+import db
+
+# Сколько промтов добавлять в дерево за одну подгрузку при прокрутке
+PROMPTS_BATCH = 500
+
+
+def _one_line(text: str, limit: int = 200) -> str:
+    """Первая строка текста без управляющих символов, усечённая до limit."""
+    s = str(text or "").replace("\x00", "").strip()
+    s = s.split("\n", 1)[0]
+    return s[:limit] + "…" if len(s) > limit else s
+
+
+class _PromptNode:
+    """Узел промта: метаданные и лениво загружаемые результаты."""
+    __slots__ = ("row", "data", "results", "loaded")
+
+    def __init__(self, row: int, data: dict):
+        self.row = row
+        self.data = data
+        self.results: list["_ResultNode"] = []
+        self.loaded = False
+
+
+class _ResultNode:
+    """Узел результата (без полного текста ответа)."""
+    __slots__ = ("row", "parent", "data")
+
+    def __init__(self, row: int, parent: _PromptNode, data: dict):
+        self.row = row
+        self.parent = parent
+        self.data = data
+
+
+class HistoryTreeModel(QAbstractItemModel):
+    """
+    Модель дерева «промт → результаты».
+    Промты выдаются представлению порциями, результаты читаются из БД
+    (по idx_results_prompt_id) только при раскрытии промта.
+    """
+
+    HEADERS = ["Промт / модель", "Дата", "Ответы"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._all: list[dict] = []
+        self._nodes: list[_PromptNode] = []
+
+    def load(self, search: str = "") -> None:
+        """Перечитывает список промтов с количеством результатов."""
+        self.beginResetModel()
+        self._all = db.prompt_list_with_counts(search=search)
+        self._nodes = []
+        self.endResetModel()
+        if self._all:
+            self.fetchMore(QModelIndex())
+
+    def total_prompts(self) -> int:
+        return len(self._all)
+
+    def result_id(self, index: QModelIndex) -> int | None:
+        """id результата для индекса результата или None."""
+        node = index.internalPointer() if index.isValid() else None
+        return node.data["id"] if isinstance(node, _ResultNode) else None
+
+    def result_title(self, index: QModelIndex) -> str:
+        node = index.internalPointer() if index.isValid() else None
+        if isinstance(node, _ResultNode):
+            return f"Ответ: {node.data.get('model_name', 'Модель')}"
+        return "Ответ"
+
+    # --- QAbstractItemModel ---
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, self._nodes[row])
+        node = parent.internalPointer()
+        if isinstance(node, _PromptNode) and row < len(node.results):
+            return self.createIndex(row, column, node.results[row])
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer()
+        if isinstance(node, _ResultNode):
+            return self.createIndex(node.parent.row, 0, node.parent)
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        if not parent.isValid():
+            return len(self._nodes)
+        node = parent.internalPointer()
+        if isinstance(node, _PromptNode):
+            return len(node.results)
+        return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self._all)
+        node = parent.internalPointer()
+        return isinstance(node, _PromptNode) and node.data.get("result_count", 0) > 0
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return len(self._nodes) < len(self._all)
+        node = parent.internalPointer()
+        return isinstance(node, _PromptNode) and not node.loaded and node.data.get("result_count", 0) > 0
+
+    def fetchMore(self, parent):
+        if not parent.isValid():
+            start = len(self._nodes)
+            end = min(start + PROMPTS_BATCH, len(self._all))
+            if end <= start:
+                return
+            self.beginInsertRows(QModelIndex(), start, end - 1)
+            self._nodes.extend(_PromptNode(i, self._all[i]) for i in range(start, end))
+            self.endInsertRows()
+            return
+        node = parent.internalPointer()
+        if not isinstance(node, _PromptNode) or node.loaded:
+            return
+        node.loaded = True
+        rows = db.result_list(prompt_id=node.data["id"], fields=db.RESULT_FIELDS_PREVIEW)
+        if not rows:
+            return
+        self.beginInsertRows(parent, 0, len(rows) - 1)
+        node.results = [_ResultNode(i, node, r) for i, r in enumerate(rows)]
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        col = index.column()
+        if role == Qt.DisplayRole:
+            d = node.data
+            if col == 1:
+                return str(d.get("created", "") or "")[:19]
+            if isinstance(node, _PromptNode):
+                if col == 0:
+                    return _one_line(d.get("text", ""))
+                return str(d.get("result_count", 0))
+            if col == 0:
+                return str(d.get("model_name", "") or "")
+            return _one_line(d.get("preview", ""))
+        if role == Qt.ToolTipRole and isinstance(node, _PromptNode) and col == 0:
+            return str(node.data.get("tags", "") or "") or None
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+
+class HistoryDialog(QDialog):
+    """Диалог просмотра сохранённых результатов по промтам."""
+
+    def __init__(self, parent=None, on_open=None):
+        super().__init__(parent)
+        self.on_open = on_open  # callback(title, text) для просмотра ответа
+        self.setWindowTitle("История")
+        self.setMinimumSize(700, 450)
+        self.resize(900, 600)
+        self._setup_ui()
+        self._refresh()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        search_row = QHBoxLayout()
+        search_row.addWidget(QLabel("Поиск:"))
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("текст или теги промта")
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(300)
+        self._search_timer.timeout.connect(self._refresh)
+        self.search_edit.textChanged.connect(lambda _: self._search_timer.start())
+        search_row.addWidget(self.search_edit, 1)
+        layout.addLayout(search_row)
+
+        self.model = HistoryTreeModel(self)
+        self.tree = QTreeView()
+        self.tree.setModel(self.model)
+        self.tree.setUniformRowHeights(True)  # виртуализация: высота строк не пересчитывается
+        self.tree.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tree.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tree.header().setStretchLastSection(False)
+        self.tree.setColumnWidth(1, 140)
+        self.tree.setColumnWidth(2, 260)
+        # Двойной клик по промту раскрывает его (штатно), по ответу — открывает просмотр
+        self.tree.doubleClicked.connect(
+            lambda idx: self._on_open(idx) if idx.parent().isValid() else None
+        )
+        layout.addWidget(self.tree)
+
+        btn_layout = QHBoxLayout()
+        self.status_label = QLabel()
+        btn_layout.addWidget(self.status_label, 1)
+        open_btn = QPushButton("Открыть")
+        open_btn.setToolTip("Открыть выбранный ответ в отдельном окне")
+        open_btn.clicked.connect(lambda: self._on_open(self.tree.currentIndex()))
+        btn_layout.addWidget(open_btn)
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+    def _refresh(self):
+        try:
+            self.model.load(self.search_edit.text().strip())
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить историю: {e}")
+            return
+        self.status_label.setText(f"Промтов: {self.model.total_prompts()}")
+
+    def _on_open(self, index: QModelIndex):
+        rid = self.model.result_id(index)
+        if rid is None:
+            QMessageBox.information(self, "Выбор", "Раскройте промт и выберите ответ для просмотра.")
+            return
+        text = db.result_get_body(rid)
+        if text is None:
+            QMessageBox.warning(self, "Ошибка", "Результат не найден.")
+            return
+        if self.on_open:
+            self.on_open(self.model.result_title(index), text)
@@ -0,0 +1,292 @@
+"""
+Пакетный импорт промтов и моделей из файлов.
+Файл читается потоково (JSONL, CSV или колоночный формат export.py), строки
+проверяются и вставляются порциями через executemany — по транзакции на порцию.
+
+Режимы:
+- insert — все корректные строки добавляются как новые записи (id из файла игнорируется);
+- upsert — строки с id обновляют существующую запись с тем же id или вставляются с ним,
+  строки без id добавляются как новые.
+
+Запуск из командной строки:
+    python importer.py prompts prompts.jsonl --upsert
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import db
+import export
+from models import invalidate_models, parse_extra_params, parse_fallbacks, parse_stop
+
+TABLE_PROMPTS = "prompts"
+TABLE_MODELS = "models"
+MODE_INSERT = "insert"
+MODE_UPSERT = "upsert"
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportDataError(Exception):
+    """Ошибка импорта (неверный файл или параметры)."""
+    pass
+
+
+@dataclass
+class ImportReport:
+    """Итог импорта."""
+    table: str
+    total: int = 0  # прочитано строк
+    imported: int = 0  # вставлено или обновлено
+    invalid: int = 0  # отклонено валидацией
+    seconds: float = 0.0
+    errors: list[str] = field(default_factory=list)  # первые MAX_REPORTED_ERRORS ошибок
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.imported / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.table}: импортировано {self.imported} из {self.total} строк "
+            f"(отклонено {self.invalid}) за {self.seconds:.2f} с, {self.rows_per_sec:,.0f} строк/с"
+        )
+
+
+# callback(report) — вызывается после каждой порции
+ProgressCallback = Callable[[ImportReport], None]
+
+
+def read_rows(path: Path) -> Iterator[dict]:
+    """Потоково читает строки файла: .jsonl, .csv или .col."""
+    path = Path(path)
+    ext = path.suffix.lower()
+    if ext == ".jsonl":
+        with open(path, "r", encoding="utf-8-sig") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    row = {"__error__": f"неверный JSON: {e}"}
+                yield row if isinstance(row, dict) else {"__error__": "ожидался JSON-объект"}
+    elif ext == ".csv":
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            yield from csv.DictReader(f)
+    elif ext == ".col":
+        yield from export.read_columnar(path)
+    else:
+        raise ImportDataError(f"Неизвестный формат импорта: {ext or path.name}. Поддерживаются: .jsonl, .csv, .col")
+
+
+def _opt_id(row: dict) -> Optional[int]:
+    v = row.get("id")
+    if v is None or v == "":
+        return None
+    n = int(v)
+    if n <= 0:
+        raise ValueError("id должен быть положительным")
+    return n
+
+
+def _validate_prompt(row: dict) -> dict:
+    text = str(row.get("text") or "").strip()
+    if not text:
+        raise ValueError("пустое поле text")
+    tags = row.get("tags") or ""
+    if isinstance(tags, list):
+        tags = ", ".join(str(t).strip() for t in tags if str(t).strip())
+    created = str(row.get("created") or "").strip() or None
+    return {"id": _opt_id(row), "text": text, "tags": str(tags).strip(), "created": created}
+
+
+def _validate_model(row: dict) -> dict:
+    out = {"id": _opt_id(row)}
+    for key in ("name", "api_url", "api_id"):
+        v = str(row.get(key) or "").strip()
+        if not v:
+            raise ValueError(f"пустое поле {key}")
+        out[key] = v
+    if not out["api_url"].lower().startswith(("http://", "https://")):
+        raise ValueError("api_url должен начинаться с http:// или https://")
+    out["model"] = str(row.get("model") or "").strip() or "gpt-3.5-turbo"
+    active = row.get("is_active", 1)
+    if isinstance(active, str):
+        active = active.strip().lower() not in ("0", "false", "нет", "no", "")
+    out["is_active"] = 1 if active else 0
+    ctx = row.get("context_length")
+    out["context_length"] = int(ctx) if ctx not in (None, "") else 0
+    if out["context_length"] < 0:
+        raise ValueError("context_length не может быть отрицательным")
+    max_tokens = row.get("max_tokens")
+    out["max_tokens"] = int(max_tokens) if max_tokens not in (None, "") else 0
+    temperature = row.get("temperature")
+    out["temperature"] = float(temperature) if temperature not in (None, "") else None
+    stop = parse_stop(row.get("stop") or "")
+    out["stop"] = json.dumps(stop, ensure_ascii=False) if stop else ""
+    extra = parse_extra_params(row.get("extra_params") or "")
+    out["extra_params"] = json.dumps(extra, ensure_ascii=False) if extra else ""
+    timeout = row.get("timeout")
+    out["timeout"] = float(timeout) if timeout not in (None, "") else 0.0
+    if out["timeout"] < 0:
+        raise ValueError("timeout не может быть отрицательным")
+    fallbacks = parse_fallbacks(row.get("fallbacks") or "")
+    out["fallbacks"] = json.dumps(fallbacks) if fallbacks else ""
+    return out
+
+
+def _sync_prompts(cur, first_new_id: int, upserts: list[dict]) -> None:
+    """Обновляет индекс тегов (prompt_tags) для вставленных и обновлённых промтов."""
+    cur.execute("SELECT id, tags FROM prompts WHERE id >= ?", (first_new_id,))
+    db.sync_prompt_tags(cur, cur.fetchall())
+    db.sync_prompt_tags(cur, [(r["id"], r["tags"]) for r in upserts])
+
+
+# Для каждой таблицы: валидатор, SQL (insert, upsert-с-id) с именованными параметрами
+# и обработчик порции после вставки (или None)
+_TABLES = {
+    TABLE_PROMPTS: (
+        _validate_prompt,
+        "INSERT INTO prompts (text, tags, created) "
+        "VALUES (:text, :tags, COALESCE(:created, CURRENT_TIMESTAMP))",
+        "INSERT INTO prompts (id, text, tags, created) "
+        "VALUES (:id, :text, :tags, COALESCE(:created, CURRENT_TIMESTAMP)) "
+        "ON CONFLICT(id) DO UPDATE SET text = excluded.text, tags = excluded.tags, "
+        "created = COALESCE(:created, prompts.created)",
+        _sync_prompts,
+    ),
+    TABLE_MODELS: (
+        _validate_model,
+        "INSERT INTO models (name, api_url, api_id, model, is_active, context_length, "
+        "max_tokens, temperature, stop, extra_params, timeout, fallbacks) "
+        "VALUES (:name, :api_url, :api_id, :model, :is_active, :context_length, "
+        ":max_tokens, :temperature, :stop, :extra_params, :timeout, :fallbacks)",
+        "INSERT INTO models (id, name, api_url, api_id, model, is_active, context_length, "
+        "max_tokens, temperature, stop, extra_params, timeout, fallbacks) "
+        "VALUES (:id, :name, :api_url, :api_id, :model, :is_active, :context_length, "
+        ":max_tokens, :temperature, :stop, :extra_params, :timeout, :fallbacks) "
+        "ON CONFLICT(id) DO UPDATE SET name = excluded.name, api_url = excluded.api_url, "
+        "api_id = excluded.api_id, model = excluded.model, is_active = excluded.is_active, "
+        "context_length = excluded.context_length, max_tokens = excluded.max_tokens, "
+        "temperature = excluded.temperature, stop = excluded.stop, extra_params = excluded.extra_params, "
+        "timeout = excluded.timeout, fallbacks = excluded.fallbacks",
+        None,
+    ),
+}
+
+
+def import_rows(
+    table: str,
+    rows: Iterator[dict],
+    mode: str = MODE_INSERT,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[ProgressCallback] = None,
+) -> ImportReport:
+    """
+    Импортирует строки в prompts или models. Некорректные строки пропускаются
+    и попадают в report.errors; каждая порция — отдельная транзакция.
+    """
+    if table not in _TABLES:
+        raise ImportDataError(f"Импорт в таблицу {table} не поддерживается")
+    if mode not in (MODE_INSERT, MODE_UPSERT):
+        raise ImportDataError(f"Неизвестный режим импорта: {mode}")
+    validate, insert_sql, upsert_sql, after_chunk = _TABLES[table]
+    report = ImportReport(table=table)
+    start = time.perf_counter()
+    inserts: list[dict] = []
+    upserts: list[dict] = []
+
+    conn = db.get_connection()
+
+    def flush():
+        if not inserts and not upserts:
+            return
+        with conn:
+            cur = conn.cursor()
+            # Новые строки получают id больше текущего максимума (AUTOINCREMENT)
+            cur.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+            first_new_id = cur.fetchone()[0]
+            if inserts:
+                cur.executemany(insert_sql, inserts)
+            if upserts:
+                cur.executemany(upsert_sql, upserts)
+            if after_chunk:
+                after_chunk(cur, first_new_id, upserts)
+        report.imported += len(inserts) + len(upserts)
+        inserts.clear()
+        upserts.clear()
+        report.seconds = time.perf_counter() - start
+        if on_progress:
+            on_progress(report)
+
+    try:
+        for line_no, row in enumerate(rows, 1):
+            report.total += 1
+            try:
+                if "__error__" in row:
+                    raise ValueError(row["__error__"])
+                clean = validate(row)
+            except (ValueError, TypeError) as e:
+                report.invalid += 1
+                if len(report.errors) < MAX_REPORTED_ERRORS:
+                    report.errors.append(f"строка {line_no}: {e}")
+                continue
+            if mode == MODE_UPSERT and clean["id"] is not None:
+                upserts.append(clean)
+            else:
+                inserts.append(clean)
+            if len(inserts) + len(upserts) >= chunk_size:
+                flush()
+        flush()
+    finally:
+        conn.close()
+        if table == TABLE_MODELS:
+            invalidate_models()
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def import_file(
+    table: str,
+    path: Path,
+    mode: str = MODE_INSERT,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_progress: Optional[ProgressCallback] = None,
+) -> ImportReport:
+    """Импортирует файл .jsonl/.csv/.col в prompts или models."""
+    return import_rows(table, read_rows(Path(path)), mode, chunk_size, on_progress)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Импорт промтов и моделей ChatList из JSONL/CSV")
+    parser.add_argument("table", choices=sorted(_TABLES))
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--upsert", action="store_true", help="обновлять записи с совпадающим id")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    db.init_db()
+    try:
+        report = import_file(
+            args.table, args.path,
+            mode=MODE_UPSERT if args.upsert else MODE_INSERT,
+            chunk_size=max(1, args.chunk_size),
+        )
+    except (ImportDataError, OSError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    for err in report.errors:
+        print(err, file=sys.stderr)
+    print(report.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Журнал полученных ответов (только дозапись).
+Каждый ответ модели записывается в журнал сразу по получении, ещё до сохранения
+в БД, поэтому падение программы или «Новый запрос» не теряют оплаченные ответы.
+
+Журнал — сегменты JSONL в папке journal/: запись в памяти добавляется в буфер,
+фоновый поток пишет буфер в текущий сегмент и делает fsync не чаще раза
+в FSYNC_INTERVAL секунд. Заполненный сегмент (SEGMENT_MAX_BYTES) закрывается
+и сжимается в .jsonl.gz; хранятся последние KEEP_SEGMENTS сегментов.
+
+Восстановление ответов в таблицу results:
+    python journal.py replay [--since 2024-01-31] [--with-errors]
+"""
+import argparse
+import atexit
+import gzip
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+import db
+import maintenance
+import settings
+
+JOURNAL_DIR = Path(__file__).parent / "journal"
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+FSYNC_INTERVAL = 1.0  # секунды: не больше стольких последних ответов может потеряться при сбое питания
+KEEP_SEGMENTS = 200
+SEGMENT_PREFIX = "responses-"
+# Несжатый сегмент старше этого считается брошенным (программа упала) и сжимается;
+# более свежий может принадлежать другому запущенному экземпляру
+STALE_SEGMENT_SECONDS = 24 * 3600
+
+
+class JournalWriter(threading.Thread):
+    """Фоновая запись буфера журнала в сегменты с пакетным fsync."""
+
+    def __init__(self, directory: Path):
+        super().__init__(name="journal-writer", daemon=True)
+        self.directory = Path(directory)
+        self._buffer: list[str] = []
+        self._cond = threading.Condition()  # защищает буфер
+        self._io_lock = threading.Lock()  # защищает файл сегмента
+        self._closed = False
+        self._file = None
+        self._path: Optional[Path] = None
+        self._seq = 0
+        self._last_sync = 0.0  # time.monotonic() последней записи с fsync
+
+    def append(self, line: str) -> None:
+        with self._cond:
+            self._buffer.append(line)
+            if len(self._buffer) == 1:  # поток ждёт только перехода из пустого буфера
+                self._cond.notify()
+
+    def flush(self) -> None:
+        """Записывает буфер и делает fsync (в вызывающем потоке)."""
+        with self._io_lock:
+            with self._cond:
+                lines, self._buffer = self._buffer, []
+            self._write(lines)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.join()
+
+    def run(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Незакрытые сегменты прошлых запусков (напр. после падения) сжимаются
+        now = time.time()
+        for path in sorted(self.directory.glob(f"{SEGMENT_PREFIX}*.jsonl")):
+            try:
+                if now - path.stat().st_mtime > STALE_SEGMENT_SECONDS:
+                    _compress(path)
+            except OSError:
+                pass
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                # Копим записи до FSYNC_INTERVAL от прошлого fsync: один fsync на пачку
+                deadline = self._last_sync + FSYNC_INTERVAL
+                while not self._closed:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                lines, self._buffer = self._buffer, []
+                closed = self._closed
+            # Запись и fsync — вне блокировки буфера: record() не ждёт диска
+            with self._io_lock:
+                self._write(lines)
+                self._last_sync = time.monotonic()
+                if closed:
+                    self._close_segment(compress=False)
+            if closed:
+                return
+
+    def _write(self, lines: list[str]) -> None:
+        if not lines:
+            return
+        f = self._segment()
+        f.write("".join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+        if f.tell() >= SEGMENT_MAX_BYTES:
+            self._close_segment(compress=True)
+
+    def _segment(self):
+        if self._file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._seq += 1
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            self._path = self.directory / f"{SEGMENT_PREFIX}{stamp}-{os.getpid()}-{self._seq:04d}.jsonl"
+            self._file = open(self._path, "a", encoding="utf-8", newline="\n")
+        return self._file
+
+    def _close_segment(self, compress: bool) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if compress:
+            _compress(self._path)
+            _prune(self.directory)
+
+
+def _compress(path: Path) -> None:
+    """Сжимает сегмент в .jsonl.gz и удаляет исходный файл."""
+    gz = path.with_name(path.name + ".gz")
+    tmp = gz.with_name(gz.name + ".part")
+    with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    tmp.replace(gz)
+    path.unlink()
+
+
+def _prune(directory: Path) -> None:
+    """Удаляет самые старые сжатые сегменты сверх KEEP_SEGMENTS."""
+    old = sorted(directory.glob(f"{SEGMENT_PREFIX}*.jsonl.gz"))
+    for path in old[:-KEEP_SEGMENTS] if len(old) > KEEP_SEGMENTS else []:
+        path.unlink()
+
+
+_writer: Optional[JournalWriter] = None
+_lock = threading.Lock()
+
+
+def _get_writer() -> JournalWriter:
+    global _writer
+    with _lock:
+        if _writer is None:
+            _writer = JournalWriter(JOURNAL_DIR)
+            _writer.start()
+            atexit.register(close)
+        return _writer
+
+
+def record(prompt: str, model_id: int, model_name: str, response: Optional[str], error: bool = False) -> None:
+    """Добавляет ответ модели в журнал (буферизованно, без ожидания диска)."""
+    entry = {
+        "ts": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),  # UTC, как CURRENT_TIMESTAMP
+        "prompt": prompt,
+        "model_id": model_id,
+        "model_name": model_name,
+        "response": response or "",
+        "error": bool(error),
+    }
+    _get_writer().append(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def flush() -> None:
+    """Записывает буфер журнала на диск (fsync)."""
+    with _lock:
+        writer = _writer
+    if writer is not None:
+        writer.flush()
+
+
+def close() -> None:
+    """Записывает буфер и закрывает журнал (при выходе из программы)."""
+    global _writer
+    with _lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+# --- Восстановление ---
+
+def segments(directory: Path = JOURNAL_DIR) -> list[Path]:
+    """Сегменты журнала от старых к новым (сжатые и текущие)."""
+    paths = list(Path(directory).glob(f"{SEGMENT_PREFIX}*.jsonl")) + \
+        list(Path(directory).glob(f"{SEGMENT_PREFIX}*.jsonl.gz"))
+    return sorted(paths, key=lambda p: p.name.replace(".gz", ""))
+
+
+def read_entries(directory: Path = JOURNAL_DIR) -> Iterator[dict]:
+    """Потоково читает записи журнала; оборванные при сбое строки пропускаются."""
+    for path in segments(directory):
+        opener = gzip.open if path.suffix == ".gz" else open
+        try:
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(entry, dict):
+                        yield entry
+        except (OSError, EOFError):
+            continue  # повреждённый хвост сжатого сегмента
+
+
+@dataclass
+class ReplayReport:
+    """Итог восстановления из журнала."""
+    total: int = 0  # прочитано записей
+    imported: int = 0  # добавлено в results
+    skipped: int = 0  # уже есть в results, ошибки или модель удалена
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Журнал: прочитано {self.total}, восстановлено {self.imported}, "
+            f"пропущено {self.skipped} за {self.seconds:.2f} с"
+        )
+
+
+def replay(since: Optional[str] = None, with_errors: bool = False,
+           directory: Path = JOURNAL_DIR) -> ReplayReport:
+    """
+    Загружает записи журнала в results. Промт ищется по тексту (или создаётся);
+    ответ, уже сохранённый к этому промту от той же модели — в БД или в архиве
+    результатов, — повторно не добавляется. Записи не новее результатов, удалённых
+    по сроку хранения (maintenance.py), не восстанавливаются.
+    since — только записи не раньше этого времени UTC («2024-01-31» или
+    «2024-01-31 12:00:00»), with_errors — и ответы-ошибки.
+    """
+    report = ReplayReport()
+    start = time.perf_counter()
+    flush()
+    db.flush_writes()
+    pruned_before = settings.get(maintenance.SETTING_RESULTS_PRUNED_BEFORE) or ""
+    has_archives = bool(db.archive_months())
+    conn = db.get_connection()
+    try:
+        with conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id FROM models")
+            model_ids = {r[0] for r in cur.fetchall()}
+            prompt_ids: dict[str, int] = {}
+            for entry in read_entries(directory):
+                report.total += 1
+                text = str(entry.get("prompt") or "").strip()
+                response = entry.get("response") or ""
+                if (not text or not response or entry.get("model_id") not in model_ids
+                        or (entry.get("error") and not with_errors)
+                        or (since and str(entry.get("ts", "")) < since)
+                        or (pruned_before and str(entry.get("ts", "")) <= pruned_before)):
+                    report.skipped += 1
+                    continue
+                pid = prompt_ids.get(text)
+                if pid is None:
+                    cur.execute("SELECT id FROM prompts WHERE text = ? ORDER BY id LIMIT 1", (text,))
+                    row = cur.fetchone()
+                    if row:
+                        pid = row[0]
+                    else:
+                        cur.execute("INSERT INTO prompts (text, tags) VALUES (?, '')", (text,))
+                        pid = cur.lastrowid
+                    prompt_ids[text] = pid
+                cur.execute(
+                    "SELECT 1 FROM results WHERE prompt_id = ? AND model_id = ? AND response = ? LIMIT 1",
+                    (pid, entry["model_id"], response),
+                )
+                # Ответ сохраняется после записи в журнал: архивы раньше её месяца не проверяются
+                if cur.fetchone() or (has_archives and db.archived_result_exists(
+                        pid, entry["model_id"], response, str(entry.get("ts") or "") or None)):
+                    report.skipped += 1
+                    continue
+                cur.execute(
+                    "INSERT INTO results (prompt_id, model_id, response, created) "
+                    "VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+                    (pid, entry["model_id"], response, entry.get("ts")),
+                )
+                report.imported += 1
+    finally:
+        conn.close()
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Журнал ответов ChatList")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rp = sub.add_parser("replay", help="восстановить ответы из журнала в results")
+    rp.add_argument("--since", help="только записи не раньше даты UTC (напр. 2024-01-31)")
+    rp.add_argument("--with-errors", action="store_true", help="восстанавливать и ответы-ошибки")
+    sub.add_parser("list", help="показать сегменты журнала")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for path in segments():
+            print(f"{path.name}\t{path.stat().st_size} байт")
+        return 0
+    db.init_db()
+    report = replay(since=args.since, with_errors=args.with_errors)
+    print(report.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
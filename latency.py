@@ -0,0 +1,95 @@
+"""
+История задержек моделей и адаптивные таймауты.
+Для каждой модели хранится скользящее окно задержек успешных запросов
+(таблица model_latency), таймаут вычисляется из высокого перцентиля с запасом
+и ограничивается снизу и сверху. Ручной таймаут модели имеет приоритет.
+"""
+import sqlite3
+import threading
+from collections import deque
+
+import db
+from models import Model
+
+DEFAULT_TIMEOUT = 60.0  # пока истории мало
+LATENCY_WINDOW = 50  # задержек на модель
+MIN_SAMPLES = 5
+TIMEOUT_PERCENTILE = 95
+TIMEOUT_MARGIN = 0.5  # +50% к перцентилю
+TIMEOUT_PAD = 2.0  # и ещё секунды на колебания сети
+DEFAULT_TIMEOUT_MIN = 5.0
+DEFAULT_TIMEOUT_MAX = 300.0
+
+_windows: dict[int, deque] = {}
+_lock = threading.Lock()
+_timeout_min = DEFAULT_TIMEOUT_MIN
+_timeout_max = DEFAULT_TIMEOUT_MAX
+
+
+def configure_bounds(timeout_min: float, timeout_max: float) -> None:
+    """Задаёт границы вычисляемого таймаута, секунды."""
+    global _timeout_min, _timeout_max
+    lo = max(0.1, float(timeout_min))
+    _timeout_min, _timeout_max = lo, max(lo, float(timeout_max))
+
+
+def _window(model_id: int) -> deque:
+    """Окно задержек модели; при первом обращении загружается из БД."""
+    with _lock:
+        w = _windows.get(model_id)
+    if w is not None:
+        return w
+    try:
+        loaded = db.latency_list(model_id, LATENCY_WINDOW)
+    except sqlite3.Error:
+        loaded = []
+    with _lock:
+        return _windows.setdefault(model_id, deque(loaded, maxlen=LATENCY_WINDOW))
+
+
+def record(model_id: int, seconds: float) -> None:
+    """Запоминает задержку успешного запроса (в памяти и в БД)."""
+    if not model_id:
+        return
+    w = _window(model_id)
+    with _lock:
+        w.append(seconds)
+    # В БД — через очередь записи: история задержек не должна задерживать отправку
+    db.latency_add_async(model_id, seconds, LATENCY_WINDOW)
+
+
+def percentile(model_id: int, p: float = TIMEOUT_PERCENTILE) -> float | None:
+    """p-й перцентиль задержек модели или None, если истории недостаточно."""
+    w = _window(model_id)
+    with _lock:
+        values = sorted(w)
+    if len(values) < MIN_SAMPLES:
+        return None
+    k = min(len(values) - 1, max(0, int(round(p / 100.0 * len(values) + 0.5)) - 1))
+    return values[k]
+
+
+def sample_count(model_id: int) -> int:
+    return len(_window(model_id))
+
+
+def auto_timeout(model_id: int) -> float:
+    """Таймаут по истории задержек модели, иначе DEFAULT_TIMEOUT."""
+    p = percentile(model_id) if model_id else None
+    if p is None:
+        return DEFAULT_TIMEOUT
+    return min(_timeout_max, max(_timeout_min, p * (1 + TIMEOUT_MARGIN) + TIMEOUT_PAD))
+
+
+def timeout_for(model: Model) -> float:
+    """Таймаут запроса к модели: ручной (models.timeout), иначе auto_timeout."""
+    manual = getattr(model, "timeout", 0)
+    if manual:
+        return float(manual)
+    return auto_timeout(model.id)
+
+
+def forget(model_id: int) -> None:
+    """Сбрасывает окно модели в памяти (напр. после удаления модели)."""
+    with _lock:
+        _windows.pop(model_id, None)
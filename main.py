@@ -24,23 +24,37 @@ from PyQt5.QtWidgets import (
     QProgressBar,
     QDialog,
     QCheckBox,
+    QFileDialog,
+    QSpinBox,
+    QInputDialog,
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QIcon
 
+import backup
 import db
+import export
+import importer
+import journal
+import maintenance
+import settings
+import tokens
 import version
-from models import get_active_models
-from network import send_prompt_to_all_models
+from models import get_active_models, get_model
+from network import send_prompt_to_all_models, circuit_status, PRIORITY_INTERACTIVE
 from models_dialog import ModelsSettingsDialog
 from prompts_dialog import PromptsDialog
+from history_dialog import HistoryDialog
 from prompt_assistant_dialog import PromptImproveDialog
 from settings_dialog import (
     SettingsDialog,
+    apply_background_settings,
     get_theme,
     get_font_size,
     DARK_STYLESHEET,
     THEME_DARK,
+    SETTING_THEME,
+    SETTING_FONT_SIZE,
 )
 
 
@@ -78,18 +92,159 @@ class MarkdownViewerDialog(QDialog):
         layout.addWidget(close_btn)
 
 
+class ExportThread(QThread):
+    """Поток потокового экспорта выборки в файл."""
+    progress = pyqtSignal(int)  # строк записано
+    finished = pyqtSignal(int, str)  # (всего строк, путь)
+    error = pyqtSignal(str)
+
+    def __init__(self, source: str, path: str, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.path = path
+
+    def run(self):
+        try:
+            n = export.export_table(self.source, Path(self.path), on_progress=self.progress.emit)
+            self.finished.emit(n, self.path)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class ImportThread(QThread):
+    """Поток пакетного импорта промтов или моделей из файла."""
+    progress = pyqtSignal(int)  # строк импортировано
+    finished = pyqtSignal(str, list)  # (сводка, ошибки)
+    error = pyqtSignal(str)
+
+    def __init__(self, table: str, path: str, mode: str, parent=None):
+        super().__init__(parent)
+        self.table = table
+        self.path = path
+        self.mode = mode
+
+    def run(self):
+        try:
+            report = importer.import_file(
+                self.table, Path(self.path), self.mode,
+                on_progress=lambda r: self.progress.emit(r.imported),
+            )
+            self.finished.emit(report.summary(), report.errors)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class SendThread(QThread):
+    """Поток отправки промта во все модели (модели опрашиваются параллельно)."""
+    finished = pyqtSignal(list)  # строки для таблицы результатов
+    error = pyqtSignal(str)
+
+    def __init__(self, models: list, prompt: str, max_tokens, samples: int, parent=None):
+        super().__init__(parent)
+        self.models = models
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.samples = samples
+
+    def run(self):
+        prompt = self.prompt
+        try:
+            # Интерактивный приоритет: запросы идут раньше фоновых (пробы, пакетные прогоны)
+            results = send_prompt_to_all_models(
+                self.models, prompt, max_tokens=self.max_tokens, samples=self.samples,
+                priority=PRIORITY_INTERACTIVE,
+                # Каждый ответ сразу попадает в журнал: не теряется до нажатия «Сохранить»
+                on_result=lambda mid, name, text, is_error: journal.record(prompt, mid, name, text, is_error),
+            )
+            # Состояние автомата защиты провайдера после отправки — для колонки «Провайдер»
+            # (для ответов резервных моделей — провайдера ответившей модели)
+            by_id = {m.id: m for m in self.models}
+            status_by_id = {}
+            for r in results:
+                if r[0] not in status_by_id:
+                    m = by_id.get(r[0]) or get_model(r[0])
+                    status_by_id[r[0]] = circuit_status(m) if m else ""
+            self.finished.emit([
+                {
+                    "model_id": r[0], "model_name": r[1], "response": r[2] or "",
+                    "selected": False, "provider_status": status_by_id.get(r[0], ""),
+                }
+                for r in results
+            ])
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class ArchiveThread(QThread):
+    """Поток переноса старых результатов в помесячные архивы."""
+    finished = pyqtSignal(dict)  # {«ГГГГ-ММ»: перенесено строк}
+    error = pyqtSignal(str)
+
+    def __init__(self, days: int, parent=None):
+        super().__init__(parent)
+        self.days = days
+
+    def run(self):
+        try:
+            self.finished.emit(db.archive_results(self.days))
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class MaintenanceThread(QThread):
+    """Поток обслуживания БД по запросу пользователя."""
+    finished = pyqtSignal(str)  # итог (MaintenanceReport.summary)
+    error = pyqtSignal(str)
+
+    def run(self):
+        try:
+            self.finished.emit(maintenance.run_maintenance().summary())
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class BackupThread(QThread):
+    """Поток создания резервной копии БД."""
+    progress = pyqtSignal(int)  # процент скопированных страниц
+    finished = pyqtSignal(str)  # итог (SnapshotReport.summary)
+    error = pyqtSignal(str)
+
+    def run(self):
+        try:
+            report = backup.create_snapshot(
+                on_progress=lambda done, total: self.progress.emit(done * 100 // max(1, total)),
+            )
+            self.finished.emit(report.summary())
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+SETTING_ARCHIVE_DAYS = "archive_after_days"
+DEFAULT_ARCHIVE_DAYS = 180
+
+IMPORT_FILTERS = "JSON Lines, CSV, колоночный (*.jsonl *.csv *.col);;Все файлы (*)"
+EXPORT_FILTERS = "JSON Lines (*.jsonl);;CSV (*.csv);;Колоночный ChatList (*.col)"
+EXPORT_SOURCES = {"results": "Результаты", "prompts": "Промты", "models": "Модели"}
+
+
 class ChatListWindow(QMainWindow):
     """Главное окно ChatList."""
 
+    # Сохранение ответов завершено в потоке записи БД: (id промта, ошибка, статус, сообщение)
+    saved = pyqtSignal(object, str, str, str)
+
     def __init__(self):
         super().__init__()
         db.init_db()
         self._temp_results: list[dict] = []
         self._current_prompt_id: int | None = None
+        self._saving_prompt_text: str | None = None  # текст нового промта, сохраняемого сейчас
         self._setup_ui()
         self._connect_signals()
         self._load_prompts_combo()
         self._apply_app_theme_and_font()  # тема и шрифт из БД
+        settings.subscribe(self._on_appearance_changed, (SETTING_THEME, SETTING_FONT_SIZE))
+        apply_background_settings()
 
     def _setup_ui(self):
         self.setWindowTitle(f"ChatList {version.__version__}")
@@ -131,6 +286,23 @@ class ChatListWindow(QMainWindow):
         btn_layout.addWidget(self.btn_save)
         btn_layout.addWidget(self.btn_new)
         btn_layout.addStretch()
+        btn_layout.addWidget(QLabel("Макс. токенов ответа:"))
+        self.max_tokens_spin = QSpinBox()
+        self.max_tokens_spin.setRange(0, 1_000_000)
+        self.max_tokens_spin.setSingleStep(256)
+        self.max_tokens_spin.setSpecialValueText("по моделям")
+        self.max_tokens_spin.setToolTip(
+            "Ограничение длины ответа для этой отправки; «по моделям» — из настроек каждой модели"
+        )
+        btn_layout.addWidget(self.max_tokens_spin)
+        btn_layout.addWidget(QLabel("Ответов на модель:"))
+        self.samples_spin = QSpinBox()
+        self.samples_spin.setRange(1, 10)
+        self.samples_spin.setToolTip(
+            "Несколько вариантов ответа каждой модели для оценки разброса "
+            "(параметр n, если провайдер его поддерживает)"
+        )
+        btn_layout.addWidget(self.samples_spin)
         layout.addLayout(btn_layout)
 
         # --- Индикатор загрузки ---
@@ -142,10 +314,11 @@ class ChatListWindow(QMainWindow):
         # --- Зона таблицы результатов ---
         results_label = QLabel("Результаты:")
         layout.addWidget(results_label)
-        self.results_table = QTableWidget(0, 3)
-        self.results_table.setHorizontalHeaderLabels(["Выбрать", "Модель", "Ответ"])
+        self.results_table = QTableWidget(0, 4)
+        self.results_table.setHorizontalHeaderLabels(["Выбрать", "Модель", "Провайдер", "Ответ"])
         self.results_table.setColumnWidth(0, 80)  # узкая колонка для чекбоксов
-        self.results_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.results_table.setColumnWidth(2, 130)
+        self.results_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
         self.results_table.setWordWrap(True)  # многострочный текст в ячейках
         self.results_table.cellDoubleClicked.connect(lambda r, c: self._on_open_response())
         self.results_table.horizontalHeader().sectionResized.connect(
@@ -175,10 +348,22 @@ class ChatListWindow(QMainWindow):
         # --- Меню ---
         menubar = self.menuBar()
         file_menu = menubar.addMenu("Файл")
+        export_menu = file_menu.addMenu("Экспорт")
+        for source, title in EXPORT_SOURCES.items():
+            export_menu.addAction(f"{title}...", lambda s=source: self._on_export(s))
+        import_menu = file_menu.addMenu("Импорт")
+        import_menu.addAction("Промты...", lambda: self._on_import(importer.TABLE_PROMPTS))
+        import_menu.addAction("Модели...", lambda: self._on_import(importer.TABLE_MODELS))
+        file_menu.addSeparator()
         file_menu.addAction("Выход", self.close)
 
         data_menu = menubar.addMenu("Данные")
         data_menu.addAction("Промты...", self._on_prompts_dialog)
+        data_menu.addAction("История...", self._on_history_dialog)
+        data_menu.addSeparator()
+        data_menu.addAction("Архивировать старые результаты...", self._on_archive)
+        data_menu.addAction("Обслуживание БД", self._on_maintenance)
+        data_menu.addAction("Создать резервную копию", self._on_backup)
 
         settings_menu = menubar.addMenu("Настройки")
         settings_menu.addAction("Параметры...", self._on_settings_dialog)
@@ -192,6 +377,7 @@ class ChatListWindow(QMainWindow):
     def _connect_signals(self):
         self.btn_send.clicked.connect(self._on_send)
         self.btn_save.clicked.connect(self._on_save)
+        self.saved.connect(self._on_saved)
         self.btn_new.clicked.connect(self._on_new)
 
     def _load_prompts_combo(self):
@@ -243,42 +429,101 @@ class ChatListWindow(QMainWindow):
             )
             return
 
+        # Предварительная проверка длины: модели, в контекст которых промт не помещается,
+        # не опрашиваются, а сразу получают строку с предупреждением
+        max_tokens = self.max_tokens_spin.value() or None
+        models, overflow = tokens.preflight(models, prompt, max_tokens=max_tokens)
+        skipped = [
+            {"model_id": i.model.id, "model_name": i.model.name, "response": f"Ошибка: {i.message()}", "selected": False}
+            for i in overflow
+        ]
+        if not models:
+            self._on_send_finished(skipped)
+            self.statusBar().showMessage("Промт не помещается в контекст ни одной активной модели")
+            return
+
         self._temp_results.clear()
         self._refresh_results_table()
         self.btn_send.setEnabled(False)
         self.progress_bar.setVisible(True)
         self.statusBar().showMessage("Отправка запросов…")
-        QApplication.processEvents()
 
-        # Выполняем в главном потоке
-        try:
-            results = send_prompt_to_all_models(models, prompt)
-            data = [
-                {"model_id": r[0], "model_name": r[1], "response": r[2] or "", "selected": False}
-                for r in results
-            ]
-            # Откладываем обновление UI (снижает риск крэша Qt)
-            QTimer.singleShot(0, lambda: self._on_send_finished(data))
-        except Exception as e:
-            QTimer.singleShot(0, lambda: self._on_send_finished([
-                {"model_id": 0, "model_name": "Ошибка", "response": str(e), "selected": False}
-            ]))
-
-    def _save_results_to_file(self, data: list) -> Path | None:
-        """Сохраняет результаты в файл. Возвращает путь к файлу или None."""
-        if not data:
-            return None
+        # Запросы выполняются в фоновом потоке, модели — параллельно; таблица
+        # обновляется по сигналу в главном потоке
+        self._send_thread = SendThread(models, prompt, max_tokens, self.samples_spin.value(), self)
+        self._send_thread.finished.connect(lambda data: self._on_send_finished(data + skipped))
+        self._send_thread.error.connect(lambda msg: self._on_send_finished([
+            {"model_id": 0, "model_name": "Ошибка", "response": msg, "selected": False}
+        ]))
+        self._send_thread.start()
+
+    def _on_export(self, source: str):
+        """Экспорт таблицы в JSONL/CSV/колоночный файл в фоновом потоке."""
+        if getattr(self, "_export_thread", None) and self._export_thread.isRunning():
+            QMessageBox.information(self, "Экспорт", "Экспорт уже выполняется.")
+            return
         stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        out_dir = Path(__file__).parent / "results"
-        out_dir.mkdir(exist_ok=True)
-        path = out_dir / f"chatlist_{stamp}.txt"
-        lines = []
-        for row in data:
-            name = row.get("model_name", "?")
-            resp = row.get("response", "")
-            lines.append(f"{'='*60}\nМодель: {name}\n{'='*60}\n{resp}\n")
-        path.write_text("\n".join(lines), encoding="utf-8")
-        return path
+        path, _ = QFileDialog.getSaveFileName(
+            self, f"Экспорт: {EXPORT_SOURCES[source]}",
+            f"chatlist_{source}_{stamp}.jsonl", EXPORT_FILTERS,
+        )
+        if not path:
+            return
+        try:
+            export.format_from_path(Path(path))
+        except export.ExportError as e:
+            QMessageBox.warning(self, "Экспорт", str(e))
+            return
+        self.statusBar().showMessage("Экспорт…")
+        self._export_thread = ExportThread(source, path, self)
+        self._export_thread.progress.connect(
+            lambda n: self.statusBar().showMessage(f"Экспорт… записано строк: {n}")
+        )
+        self._export_thread.finished.connect(
+            lambda n, p: self.statusBar().showMessage(f"Экспортировано строк: {n} → {p}")
+        )
+        self._export_thread.error.connect(self._on_export_error)
+        self._export_thread.start()
+
+    def _on_import(self, table: str):
+        """Импорт промтов/моделей из JSONL/CSV в фоновом потоке."""
+        if getattr(self, "_import_thread", None) and self._import_thread.isRunning():
+            QMessageBox.information(self, "Импорт", "Импорт уже выполняется.")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт из файла", "", IMPORT_FILTERS)
+        if not path:
+            return
+        upsert = QMessageBox.question(
+            self, "Импорт",
+            "Обновлять существующие записи с совпадающим id?\n"
+            "«Нет» — все строки будут добавлены как новые.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No,
+        ) == QMessageBox.Yes
+        mode = importer.MODE_UPSERT if upsert else importer.MODE_INSERT
+        self.statusBar().showMessage("Импорт…")
+        self._import_thread = ImportThread(table, path, mode, self)
+        self._import_thread.progress.connect(
+            lambda n: self.statusBar().showMessage(f"Импорт… строк: {n}")
+        )
+        self._import_thread.finished.connect(self._on_import_finished)
+        self._import_thread.error.connect(
+            lambda msg: QMessageBox.critical(self, "Ошибка", f"Не удалось выполнить импорт:\n{msg}")
+        )
+        self._import_thread.start()
+
+    def _on_import_finished(self, summary: str, errors: list):
+        self.statusBar().showMessage(summary)
+        self._load_prompts_combo()
+        text = summary
+        if errors:
+            text += "\n\nОшибки:\n" + "\n".join(errors[:20])
+            if len(errors) > 20:
+                text += f"\n… и ещё {len(errors) - 20}"
+        QMessageBox.information(self, "Импорт", text)
+
+    def _on_export_error(self, msg: str):
+        self.statusBar().showMessage("Ошибка экспорта")
+        QMessageBox.critical(self, "Ошибка", f"Не удалось выполнить экспорт:\n{msg}")
 
     def _on_send_finished(self, data: list):
         try:
@@ -314,16 +559,8 @@ class ChatListWindow(QMainWindow):
         if not prompt_text:
             QMessageBox.warning(self, "Внимание", "Введите промт перед сохранением.")
             return
-        try:
-            if self._current_prompt_id is None:
-                self._current_prompt_id = db.prompt_create(prompt_text)
-                self._load_prompts_combo()
-            for r in selected:
-                db.result_create(self._current_prompt_id, r["model_id"], r["response"])
-            self.statusBar().showMessage(f"Сохранено: {len(selected)} выбранных ответов")
-            QMessageBox.information(self, "Сохранено", f"Сохранено ответов: {len(selected)}.")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить: {e}")
+        n = len(selected)
+        self._save_results(prompt_text, selected, f"Сохранено: {n} выбранных ответов", f"Сохранено ответов: {n}.")
 
     def _on_save(self):
         """Сохраняет текущий промт и все результаты в БД."""
@@ -334,16 +571,40 @@ class ChatListWindow(QMainWindow):
         if not self._temp_results:
             QMessageBox.information(self, "Сохранение", "Сначала отправьте запрос и получите результаты.")
             return
-        try:
-            if self._current_prompt_id is None:
-                self._current_prompt_id = db.prompt_create(prompt_text)
-                self._load_prompts_combo()
-            for r in self._temp_results:
-                db.result_create(self._current_prompt_id, r["model_id"], r["response"])
-            self.statusBar().showMessage(f"Сохранено: промт + {len(self._temp_results)} результатов")
-            QMessageBox.information(self, "Сохранено", f"Сохранено результатов: {len(self._temp_results)}.")
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить: {e}")
+        n = len(self._temp_results)
+        self._save_results(
+            prompt_text, self._temp_results, f"Сохранено: промт + {n} результатов", f"Сохранено результатов: {n}."
+        )
+
+    def _save_results(self, prompt_text: str, rows: list[dict], status: str, message: str):
+        """Сохраняет промт (если он новый) и ответы через очередь записи БД, не дожидаясь диска."""
+        self.btn_save.setEnabled(False)
+        self.btn_save_selected.setEnabled(False)
+        self.statusBar().showMessage("Сохранение...")
+        self._saving_prompt_text = prompt_text if self._current_prompt_id is None else None
+        fut = db.results_save_async(
+            self._current_prompt_id, prompt_text, [(r["model_id"], r["response"]) for r in rows]
+        )
+
+        def done(f):
+            err = f.exception()
+            self.saved.emit(None if err else f.result(), str(err) if err else "", status, message)
+        fut.add_done_callback(done)
+
+    def _on_saved(self, prompt_id, error: str, status: str, message: str):
+        self.btn_save.setEnabled(True)
+        self.btn_save_selected.setEnabled(True)
+        if error:
+            self.statusBar().clearMessage()
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить: {error}")
+            return
+        if self._saving_prompt_text is not None:
+            # Создан новый промт: он становится текущим, если за время записи его не сменили («Новый»)
+            if self._current_prompt_id is None and self.prompt_edit.toPlainText().strip() == self._saving_prompt_text:
+                self._current_prompt_id = prompt_id
+            self._load_prompts_combo()
+        self.statusBar().showMessage(status)
+        QMessageBox.information(self, "Сохранено", message)
 
     def _on_new(self):
         self._temp_results.clear()
@@ -401,10 +662,11 @@ class ChatListWindow(QMainWindow):
                 name = str(row.get("model_name", ""))[:80]
                 resp = self._sanitize_for_display(str(row.get("response", "")))
                 self.results_table.setItem(i, 1, QTableWidgetItem(name))
-                self.results_table.setItem(i, 2, QTableWidgetItem(resp))
+                self.results_table.setItem(i, 2, QTableWidgetItem(str(row.get("provider_status", ""))))
+                self.results_table.setItem(i, 3, QTableWidgetItem(resp))
             except Exception:
                 self.results_table.setItem(i, 1, QTableWidgetItem("?"))
-                self.results_table.setItem(i, 2, QTableWidgetItem("(ошибка отображения)"))
+                self.results_table.setItem(i, 3, QTableWidgetItem("(ошибка отображения)"))
         self.results_table.resizeRowsToContents()  # высота строк по содержимому
 
     def _on_selection_changed(self, row_idx: int, state):
@@ -422,16 +684,101 @@ class ChatListWindow(QMainWindow):
                 f"Не удалось открыть «Промты»:\n{e}",
             )
 
+    def _on_archive(self):
+        """Перенос результатов старше N дней в архивы (в фоновом потоке)."""
+        if getattr(self, "_archive_thread", None) and self._archive_thread.isRunning():
+            QMessageBox.information(self, "Архив", "Архивирование уже выполняется.")
+            return
+        days, ok = QInputDialog.getInt(
+            self, "Архивировать результаты",
+            "Перенести в архив результаты старше (дней):",
+            settings.get_int(SETTING_ARCHIVE_DAYS, DEFAULT_ARCHIVE_DAYS, 1, 36500), 1, 36500,
+        )
+        if not ok:
+            return
+        settings.set_value(SETTING_ARCHIVE_DAYS, days)
+        self.statusBar().showMessage("Архивирование…")
+        self._archive_thread = ArchiveThread(days, self)
+        self._archive_thread.finished.connect(self._on_archive_finished)
+        self._archive_thread.error.connect(
+            lambda msg: QMessageBox.critical(self, "Ошибка", f"Не удалось архивировать результаты:\n{msg}")
+        )
+        self._archive_thread.start()
+
+    def _on_archive_finished(self, moved: dict):
+        total = sum(moved.values())
+        self.statusBar().showMessage(f"В архив перенесено результатов: {total}")
+        text = f"Перенесено результатов: {total}."
+        if moved:
+            text += "\n\n" + "\n".join(f"{month}: {n}" for month, n in sorted(moved.items()))
+        QMessageBox.information(self, "Архив", text)
+
+    def _on_maintenance(self):
+        """Очистка по срокам хранения, освобождение места и статистика (в фоновом потоке)."""
+        if getattr(self, "_maintenance_thread", None) and self._maintenance_thread.isRunning():
+            QMessageBox.information(self, "Обслуживание БД", "Обслуживание уже выполняется.")
+            return
+        self.statusBar().showMessage("Обслуживание БД…")
+        self._maintenance_thread = MaintenanceThread(self)
+        self._maintenance_thread.finished.connect(self._on_maintenance_finished)
+        self._maintenance_thread.error.connect(
+            lambda msg: QMessageBox.critical(self, "Ошибка", f"Не удалось выполнить обслуживание БД:\n{msg}")
+        )
+        self._maintenance_thread.start()
+
+    def _on_maintenance_finished(self, summary: str):
+        self.statusBar().showMessage(summary)
+        QMessageBox.information(self, "Обслуживание БД", summary)
+
+    def _on_backup(self):
+        """Резервная копия БД через backup API (в фоновом потоке, запись не блокируется)."""
+        if getattr(self, "_backup_thread", None) and self._backup_thread.isRunning():
+            QMessageBox.information(self, "Резервная копия", "Копия уже создаётся.")
+            return
+        self.statusBar().showMessage("Резервная копия…")
+        self._backup_thread = BackupThread(self)
+        self._backup_thread.progress.connect(
+            lambda pct: self.statusBar().showMessage(f"Резервная копия: {pct}%")
+        )
+        self._backup_thread.finished.connect(self._on_backup_finished)
+        self._backup_thread.error.connect(
+            lambda msg: QMessageBox.critical(self, "Ошибка", f"Не удалось создать резервную копию:\n{msg}")
+        )
+        self._backup_thread.start()
+
+    def _on_backup_finished(self, summary: str):
+        self.statusBar().showMessage(summary)
+        QMessageBox.information(
+            self, "Резервная копия",
+            f"{summary}\n\nПапка: {backup.backup_dir()}\n"
+            "Восстановление (при закрытой программе): python backup.py restore <файл>",
+        )
+
+    def _on_history_dialog(self):
+        def on_open(title: str, text: str):
+            MarkdownViewerDialog(self, title=title, text=text).exec_()
+        try:
+            db.flush_writes()  # история должна включать только что сохранённые ответы
+            d = HistoryDialog(self, on_open=on_open)
+            d.exec_()
+        except Exception as e:
+            QMessageBox.critical(
+                self, "Ошибка",
+                f"Не удалось открыть «Историю»:\n{e}",
+            )
+
     def _on_settings_dialog(self):
         d = SettingsDialog(self)
-        if d.exec_() == QDialog.Accepted:
-            self._apply_app_theme_and_font()
+        d.exec_()
 
     def _on_models_settings(self):
         d = ModelsSettingsDialog(self)
         d.exec_()
         self._load_prompts_combo()
 
+    def _on_appearance_changed(self, changed: dict):
+        self._apply_app_theme_and_font()
+
     def _apply_app_theme_and_font(self):
         """Применяет тему и размер шрифта из БД ко всему приложению."""
         app = QApplication.instance()
@@ -461,6 +808,7 @@ class ChatListWindow(QMainWindow):
             "<li>Выбор и сохранение промтов</li>"
             "<li>Улучшение промтов с помощью ИИ</li>"
             "<li>Сохранение выбранных ответов в базу</li>"
+            "<li>История сохранённых ответов по промтам</li>"
             "<li>Настройки темы и шрифта</li>"
             "</ul>"
             "<p>Python, PyQt5, SQLite, OpenRouter API.</p>",
@@ -493,7 +841,12 @@ def main():
     if icon_path.exists():
         window.setWindowIcon(QIcon(str(icon_path)))
     window.show()
-    sys.exit(app.exec_())
+    code = app.exec_()
+    maintenance.stop_maintenance(timeout=10)  # прервать обслуживание до остановки очереди записи
+    backup.stop_backups(timeout=10)
+    db.stop_writer()  # дописать очередь записи БД перед выходом
+    journal.close()
+    sys.exit(code)
 
 
 if __name__ == "__main__":
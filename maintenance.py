@@ -0,0 +1,294 @@
+"""
+Фоновое обслуживание БД.
+- Срок хранения: для каждой таблицы из db.PRUNE_TABLES настройки retention_<таблица>_days
+  (удалять строки старше N дней) и retention_<таблица>_rows (хранить N последних строк);
+  0 — без ограничения. Срок в днях для results удаляет и архивы (db.archive_results)
+  за месяцы, целиком вышедшие за срок. Удаление идёт порциями через очередь записи.
+- Место: свободные страницы возвращаются PRAGMA incremental_vacuum порциями.
+  БД, созданная до включения auto_vacuum, переводится в режим INCREMENTAL полным
+  VACUUM, если файл не больше VACUUM_CONVERT_MAX_BYTES (больший — вручную командой vacuum).
+- Статистика: PRAGMA optimize при каждом запуске, полный ANALYZE раз в ANALYZE_INTERVAL_DAYS.
+
+MaintenanceScheduler запускает обслуживание раз в maintenance_interval часов
+(время прошлого запуска хранится в settings); итог дописывается в maintenance.log.
+
+Запуск вручную:
+    python maintenance.py run [--analyze]
+    python maintenance.py vacuum
+"""
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+
+import db
+import settings
+
+SETTING_INTERVAL = "maintenance_interval"
+SETTING_LAST_RUN = "maintenance_last_run"
+SETTING_LAST_ANALYZE = "maintenance_last_analyze"
+# Наибольший created удалённых по сроку хранения результатов (UTC): journal.replay
+# не восстанавливает более старые записи журнала
+SETTING_RESULTS_PRUNED_BEFORE = "results_pruned_before"
+# {таблица: (ключ срока в днях, ключ числа строк)}
+RETENTION_SETTINGS = {t: (f"retention_{t}_days", f"retention_{t}_rows") for t in db.PRUNE_TABLES}
+DEFAULT_INTERVAL = 24  # часов; 0 — фоновое обслуживание выключено
+STARTUP_DELAY = 120.0  # секунд от запуска программы до первой проверки
+CHECK_INTERVAL = 600.0  # секунд между проверками, не пора ли обслуживать
+ANALYZE_INTERVAL_DAYS = 7
+VACUUM_CONVERT_MAX_BYTES = 64 * 1024 * 1024
+LOG_PATH = Path(__file__).parent / "maintenance.log"
+LOG_MAX_BYTES = 1024 * 1024  # больший журнал переименовывается в maintenance.log.1
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"  # UTC, как created в таблицах
+
+
+@dataclass
+class RetentionPolicy:
+    """Срок хранения строк таблицы; 0 — без ограничения."""
+    table: str
+    max_age_days: int = 0
+    max_rows: int = 0
+
+
+@dataclass
+class MaintenanceReport:
+    """Итог обслуживания."""
+    deleted: dict[str, int] = field(default_factory=dict)  # {таблица: удалено строк}
+    archives_removed: dict[str, int] = field(default_factory=dict)  # {«ГГГГ-ММ»: байт}
+    pages_freed: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    vacuumed: bool = False  # выполнен полный VACUUM (перевод в auto_vacuum=INCREMENTAL)
+    analyzed: str = ""  # "ANALYZE", "PRAGMA optimize" или "" (прервано)
+    interrupted: bool = False
+    seconds: float = 0.0
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return max(0, self.bytes_before - self.bytes_after) + sum(self.archives_removed.values())
+
+    def summary(self) -> str:
+        deleted = ", ".join(f"{t} {n}" for t, n in self.deleted.items()) or "нет"
+        text = (
+            f"Обслуживание БД: удалено строк — {deleted}; "
+            f"освобождено {_mb(self.reclaimed_bytes)} "
+            f"(БД {_mb(self.bytes_before)} → {_mb(self.bytes_after)}"
+        )
+        if self.archives_removed:
+            text += f", архивов удалено {len(self.archives_removed)}"
+        text += ")"
+        if self.vacuumed:
+            text += "; VACUUM"
+        if self.analyzed:
+            text += f"; {self.analyzed}"
+        if self.interrupted:
+            text += "; прервано"
+        return text + f"; {self.seconds:.2f} с"
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.1f} МБ"
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.strptime(value or "", _TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def get_interval() -> int:
+    """Интервал фонового обслуживания, часы; 0 — выключено."""
+    return settings.get_int(SETTING_INTERVAL, DEFAULT_INTERVAL, 0, 24 * 30)
+
+
+def retention_policies() -> list[RetentionPolicy]:
+    """Сроки хранения из настроек."""
+    return [
+        RetentionPolicy(
+            table,
+            settings.get_int(days_key, 0, 0, 36500),
+            settings.get_int(rows_key, 0, 0, 10 ** 9),
+        )
+        for table, (days_key, rows_key) in RETENTION_SETTINGS.items()
+    ]
+
+
+def log(line: str) -> None:
+    """Дописывает строку в maintenance.log."""
+    try:
+        if LOG_PATH.exists() and LOG_PATH.stat().st_size > LOG_MAX_BYTES:
+            LOG_PATH.replace(LOG_PATH.with_name(LOG_PATH.name + ".1"))
+        with open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(f"{datetime.now():%Y-%m-%d %H:%M:%S}\t{line}\n")
+    except OSError:
+        pass
+
+
+def _db_bytes(space: dict) -> int:
+    return space["page_size"] * space["page_count"]
+
+
+_run_lock = threading.Lock()  # ручной запуск и планировщик не обслуживают БД одновременно
+
+
+def run_maintenance(
+    policies: Optional[list[RetentionPolicy]] = None,
+    full_analyze: Optional[bool] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> MaintenanceReport:
+    """
+    Очистка по срокам хранения (policies — по умолчанию из настроек), освобождение
+    места и обновление статистики. full_analyze — полный ANALYZE (None — если прошло
+    ANALYZE_INTERVAL_DAYS). should_stop() прерывает работу между порциями.
+    """
+    stop = should_stop or (lambda: False)
+    with _run_lock:
+        report = MaintenanceReport()
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        space = db.db_space()
+        report.bytes_before = _db_bytes(space)
+
+        for p in policies if policies is not None else retention_policies():
+            if stop():
+                break
+            before = (now - timedelta(days=p.max_age_days)).strftime(_TIME_FORMAT) if p.max_age_days > 0 else None
+            report.deleted[p.table], newest = db.prune_rows(
+                p.table, before=before, keep=p.max_rows or None, should_stop=stop,
+            )
+            if p.table == "results" and before:
+                report.archives_removed.update(db.prune_archives(before))
+                newest = max(newest or "", before)
+            pruned_before = settings.get(SETTING_RESULTS_PRUNED_BEFORE) or ""
+            if p.table == "results" and newest and newest > pruned_before:
+                settings.set_value(SETTING_RESULTS_PRUNED_BEFORE, newest)
+
+        space = db.db_space()
+        if space["auto_vacuum"] == 2:  # INCREMENTAL
+            while not stop():
+                freed = db.incremental_vacuum()
+                report.pages_freed += freed
+                if freed < db.VACUUM_STEP_PAGES:
+                    break
+        elif space["auto_vacuum"] == 0 and _db_bytes(space) <= VACUUM_CONVERT_MAX_BYTES and not stop():
+            try:
+                db.vacuum()
+                report.vacuumed = True
+                report.pages_freed += space["freelist_count"]
+            except sqlite3.OperationalError as e:
+                log(f"VACUUM пропущен: {e}")  # БД занята другим подключением — в следующий раз
+
+        if not stop():
+            if full_analyze is None:
+                last = _parse_time(settings.get(SETTING_LAST_ANALYZE))
+                full_analyze = last is None or now - last >= timedelta(days=ANALYZE_INTERVAL_DAYS)
+            db.analyze(full=full_analyze)
+            report.analyzed = "ANALYZE" if full_analyze else "PRAGMA optimize"
+            if full_analyze:
+                settings.set_value(SETTING_LAST_ANALYZE, now.strftime(_TIME_FORMAT))
+
+        report.bytes_after = _db_bytes(db.db_space())
+        report.interrupted = stop()
+        report.seconds = time.perf_counter() - start
+        settings.set_value(SETTING_LAST_RUN, now.strftime(_TIME_FORMAT))
+    log(report.summary())
+    return report
+
+
+class MaintenanceScheduler(threading.Thread):
+    """
+    Фоновое обслуживание: раз в CHECK_INTERVAL проверяет, прошло ли interval часов
+    с прошлого запуска (в том числе в прошлом сеансе программы), и запускает его.
+    on_report(report) вызывается из потока планировщика.
+    """
+
+    def __init__(self, interval_hours: float,
+                 on_report: Optional[Callable[[MaintenanceReport], None]] = None):
+        super().__init__(name="MaintenanceScheduler", daemon=True)
+        self.interval = timedelta(hours=interval_hours)
+        self.on_report = on_report
+        self._stop_event = threading.Event()
+
+    def run(self):
+        delay = STARTUP_DELAY
+        while not self._stop_event.wait(delay):
+            delay = CHECK_INTERVAL
+            last = _parse_time(settings.get(SETTING_LAST_RUN))
+            if last is not None and datetime.utcnow() - last < self.interval:
+                continue
+            try:
+                report = run_maintenance(should_stop=self._stop_event.is_set)
+            except Exception as e:
+                log(f"Ошибка обслуживания: {e}")  # обслуживание не должно ронять приложение
+                continue
+            if self.on_report:
+                self.on_report(report)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Останавливает планировщик; текущее обслуживание прерывается после порции."""
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+
+_scheduler: Optional[MaintenanceScheduler] = None
+_lock = threading.Lock()
+
+
+def configure_maintenance(interval_hours: float) -> None:
+    """Запускает фоновое обслуживание раз в interval_hours часов; 0 — останавливает его."""
+    global _scheduler
+    with _lock:
+        old, _scheduler = _scheduler, None
+        if interval_hours > 0:
+            _scheduler = MaintenanceScheduler(interval_hours)
+            _scheduler.start()
+    if old is not None:
+        old.stop()
+
+
+def stop_maintenance(timeout: Optional[float] = None) -> None:
+    """Останавливает планировщик и ждёт прерывания текущего обслуживания (при выходе)."""
+    global _scheduler
+    with _lock:
+        old, _scheduler = _scheduler, None
+    if old is not None:
+        old.stop(timeout)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Обслуживание БД ChatList")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rp = sub.add_parser("run", help="очистка по срокам хранения, освобождение места, статистика")
+    rp.add_argument("--analyze", action="store_true", help="полный ANALYZE вместо PRAGMA optimize")
+    sub.add_parser("vacuum", help="полный VACUUM и перевод БД в auto_vacuum=INCREMENTAL")
+    args = parser.parse_args(argv)
+
+    db.init_db()
+    try:
+        if args.command == "vacuum":
+            before = _db_bytes(db.db_space())
+            start = time.perf_counter()
+            db.vacuum()
+            line = (f"VACUUM: БД {_mb(before)} → {_mb(_db_bytes(db.db_space()))}; "
+                    f"{time.perf_counter() - start:.2f} с")
+            log(line)
+            print(line)
+        else:
+            print(run_maintenance(full_analyze=True if args.analyze else None).summary())
+    except sqlite3.Error as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.stop_writer()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
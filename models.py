@@ -1,8 +1,13 @@
 """
 Логика работы с моделями нейросетей.
+Модели читаются из БД один раз в реестр в памяти (с заранее найденными API-ключами
+и собранными заголовками запросов); add_model, update_model и delete_model
+сбрасывают реестр. Записи реестра общие — их нельзя изменять.
 """
+import json
 import os
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional
 
@@ -17,7 +22,7 @@ if env_local.exists():
     load_dotenv(env_local, override=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class Model:
     """Структура данных модели нейросети."""
     id: int
@@ -26,9 +31,100 @@ class Model:
     api_id: str
     model: str  # ID модели для API (напр. openai/gpt-3.5-turbo для OpenRouter)
     is_active: int
+    context_length: int = 0  # контекст в токенах; 0 — неизвестен (см. tokens.context_length_for)
+    # Параметры генерации; 0 / None / пусто — значение по умолчанию провайдера
+    max_tokens: int = 0
+    temperature: Optional[float] = None
+    stop: list[str] = field(default_factory=list)
+    extra_params: dict = field(default_factory=dict)  # доп. поля тела запроса (provider-specific)
+    timeout: float = 0  # ручной таймаут, с; 0 — по истории задержек (latency.timeout_for)
+    fallbacks: list[int] = field(default_factory=list)  # id резервных моделей по порядку
+    # Заголовки запроса с API-ключом, собранные реестром; None — собираются при отправке
+    headers: Optional[dict] = field(default=None, compare=False, repr=False)
+
+
+def parse_stop(raw) -> list[str]:
+    """stop-последовательности из JSON-списка или списка строк."""
+    if isinstance(raw, str):
+        raw = raw.strip()
+        if not raw:
+            return []
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            raise ValueError("stop должен быть JSON-списком строк")
+    if not isinstance(raw, list) or not all(isinstance(x, str) for x in raw):
+        raise ValueError("stop должен быть списком строк")
+    return [x for x in raw if x]
+
+
+def parse_extra_params(raw) -> dict:
+    """Дополнительные параметры запроса из JSON-объекта или dict."""
+    if isinstance(raw, str):
+        raw = raw.strip()
+        if not raw:
+            return {}
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"доп. параметры: неверный JSON ({e})")
+    if not isinstance(raw, dict):
+        raise ValueError("доп. параметры должны быть JSON-объектом")
+    return raw
+
+
+def parse_fallbacks(raw) -> list[int]:
+    """Цепочка резервных моделей из JSON-списка id или списка чисел."""
+    if isinstance(raw, str):
+        raw = raw.strip()
+        if not raw:
+            return []
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            raise ValueError("fallbacks должен быть JSON-списком id моделей")
+    if not isinstance(raw, list):
+        raise ValueError("fallbacks должен быть списком id моделей")
+    out: list[int] = []
+    for x in raw:
+        try:
+            mid = int(x)
+        except (TypeError, ValueError):
+            raise ValueError(f"fallbacks: неверный id модели {x!r}")
+        if mid > 0 and mid not in out:
+            out.append(mid)
+    return out
+
+
+def _dump_stop(stop: list[str] | None) -> str:
+    return json.dumps(list(stop), ensure_ascii=False) if stop else ""
+
+
+def _dump_extra(extra: dict | None) -> str:
+    return json.dumps(extra, ensure_ascii=False) if extra else ""
+
+
+def _dump_fallbacks(fallbacks: list[int] | None) -> str:
+    return json.dumps([int(x) for x in fallbacks]) if fallbacks else ""
+
+
+def _safe(parse, raw, default):
+    try:
+        return parse(raw)
+    except ValueError:
+        return default
+
+
+def api_headers(api_key: str) -> dict:
+    """Заголовки запроса chat/completions с API-ключом."""
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
 
 
 def _row_to_model(row: dict) -> Model:
+    api_key = str(get_api_key(row["api_id"]) or "").strip()
     return Model(
         id=row["id"],
         name=row["name"],
@@ -36,25 +132,59 @@ def _row_to_model(row: dict) -> Model:
         api_id=row["api_id"],
         model=row.get("model", "gpt-3.5-turbo") or "gpt-3.5-turbo",
         is_active=row["is_active"],
+        context_length=row.get("context_length") or 0,
+        max_tokens=row.get("max_tokens") or 0,
+        temperature=row.get("temperature"),
+        stop=_safe(parse_stop, row.get("stop") or "", []),
+        extra_params=_safe(parse_extra_params, row.get("extra_params") or "", {}),
+        timeout=row.get("timeout") or 0,
+        fallbacks=_safe(parse_fallbacks, row.get("fallbacks") or "", []),
+        headers=api_headers(api_key) if api_key else None,
     )
 
 
+_registry: Optional[dict[int, Model]] = None  # id -> модель, в порядке таблицы
+_registry_path: Optional[Path] = None  # db.DB_PATH, из которой загружен реестр
+_registry_lock = threading.Lock()
+
+
+def _models() -> dict[int, Model]:
+    """Реестр моделей; загружается при первом обращении и при смене файла БД."""
+    global _registry, _registry_path
+    with _registry_lock:
+        if _registry is not None and _registry_path == db.DB_PATH:
+            return _registry
+    loaded = {r["id"]: _row_to_model(r) for r in db.model_list(active_only=False)}
+    with _registry_lock:
+        if _registry is None or _registry_path != db.DB_PATH:
+            _registry, _registry_path = loaded, db.DB_PATH
+        return _registry
+
+
+def invalidate_models() -> None:
+    """Сбрасывает реестр моделей (после изменения таблицы models в обход этого модуля)."""
+    global _registry
+    with _registry_lock:
+        _registry = None
+
+
 def get_active_models() -> list[Model]:
-    """Возвращает список активных моделей из БД."""
-    rows = db.model_list(active_only=True)
-    return [_row_to_model(r) for r in rows]
+    """Возвращает список активных моделей."""
+    return [m for m in _models().values() if m.is_active]
 
 
 def get_all_models(search: str = "") -> list[Model]:
-    """Возвращает все модели (с опциональным поиском)."""
-    rows = db.model_list(active_only=False, search=search)
-    return [_row_to_model(r) for r in rows]
+    """Возвращает все модели (с опциональным поиском по названию и api_id)."""
+    models = list(_models().values())
+    search = search.strip().lower()
+    if search:
+        models = [m for m in models if search in m.name.lower() or search in m.api_id.lower()]
+    return models
 
 
 def get_model(model_id: int) -> Optional[Model]:
     """Возвращает модель по id или None."""
-    row = db.model_get(model_id)
-    return _row_to_model(row) if row else None
+    return _models().get(model_id)
 
 
 def get_api_key(api_id: str) -> Optional[str]:
@@ -62,18 +192,57 @@ def get_api_key(api_id: str) -> Optional[str]:
     return os.getenv(api_id)
 
 
-def add_model(name: str, api_url: str, api_id: str, model: str = "gpt-3.5-turbo", is_active: int = 1) -> int:
+def add_model(
+    name: str,
+    api_url: str,
+    api_id: str,
+    model: str = "gpt-3.5-turbo",
+    is_active: int = 1,
+    context_length: int = 0,
+    max_tokens: int = 0,
+    temperature: Optional[float] = None,
+    stop: list[str] | None = None,
+    extra_params: dict | None = None,
+    timeout: float = 0,
+    fallbacks: list[int] | None = None,
+) -> int:
     """Добавляет модель. Возвращает id."""
-    return db.model_create(name, api_url, api_id, model, is_active)
+    model_id = db.model_create(
+        name, api_url, api_id, model, is_active, context_length,
+        max_tokens, temperature, _dump_stop(stop), _dump_extra(extra_params), timeout,
+        _dump_fallbacks(fallbacks),
+    )
+    invalidate_models()
+    return model_id
 
 
 def update_model(
-    model_id: int, name: str, api_url: str, api_id: str, model: str, is_active: int
+    model_id: int,
+    name: str,
+    api_url: str,
+    api_id: str,
+    model: str,
+    is_active: int,
+    context_length: int = 0,
+    max_tokens: int = 0,
+    temperature: Optional[float] = None,
+    stop: list[str] | None = None,
+    extra_params: dict | None = None,
+    timeout: float = 0,
+    fallbacks: list[int] | None = None,
 ) -> bool:
-    """Обновляет модель."""
-    return db.model_update(model_id, name, api_url, api_id, model, is_active)
+    """Обновляет модель. Сама модель в цепочку резервных не попадает."""
+    ok = db.model_update(
+        model_id, name, api_url, api_id, model, is_active, context_length,
+        max_tokens, temperature, _dump_stop(stop), _dump_extra(extra_params), timeout,
+        _dump_fallbacks([x for x in fallbacks or [] if x != model_id]),
+    )
+    invalidate_models()
+    return ok
 
 
 def delete_model(model_id: int) -> bool:
     """Удаляет модель."""
-    return db.model_delete(model_id)
+    ok = db.model_delete(model_id)
+    invalidate_models()
+    return ok
@@ -1,6 +1,7 @@
 """
 Диалог настройки моделей нейросетей.
 """
+import json
 from typing import Optional
 
 import requests
@@ -19,13 +20,35 @@ from PyQt5.QtWidgets import (
     QLineEdit,
     QCheckBox,
     QLabel,
+    QSpinBox,
+    QDoubleSpinBox,
+    QPlainTextEdit,
+    QGroupBox,
+    QComboBox,
+    QListWidget,
+    QListWidgetItem,
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QDesktopServices
 from PyQt5.QtCore import QUrl
 
 import db
-from models import get_all_models, add_model, update_model, delete_model, get_model, get_api_key
+import health
+import latency
+import network
+import tokens
+from models import (
+    get_all_models,
+    add_model,
+    update_model,
+    delete_model,
+    get_model,
+    get_api_key,
+    parse_extra_params,
+)
+
+# Минимум спинбокса температуры означает «по умолчанию провайдера»
+_TEMPERATURE_DEFAULT = -0.1
 
 
 def _is_free_model(pricing: dict) -> bool:
@@ -50,6 +73,22 @@ def _is_free_model(pricing: dict) -> bool:
     return _zero(prompt) and _zero(completion)
 
 
+class ProbeModelsThread(QThread):
+    """Поток параллельной проверки доступности моделей."""
+    finished = pyqtSignal(dict)  # {model_id: health.ProbeResult}
+    error = pyqtSignal(str)
+
+    def __init__(self, models: list, parent=None):
+        super().__init__(parent)
+        self.models = models
+
+    def run(self):
+        try:
+            self.finished.emit(health.probe_all(self.models))
+        except Exception as e:
+            self.error.emit(str(e))
+
+
 class OpenRouterFetchThread(QThread):
     """Поток загрузки списка моделей OpenRouter."""
     finished = pyqtSignal(list)  # [(id, name, context_length), ...]
@@ -61,14 +100,16 @@ class OpenRouterFetchThread(QThread):
             headers = {}
             if api_key and str(api_key).strip():
                 headers["Authorization"] = f"Bearer {api_key.strip()}"
-            resp = requests.get(
-                "https://openrouter.ai/api/v1/models",
-                headers=headers or None,
-                timeout=15,
-            )
+            url = "https://openrouter.ai/api/v1/models"
+            with network.scheduler.slot(network.host_of(url), network.PRIORITY_BACKGROUND, 15):
+                resp = requests.get(url, headers=headers or None, timeout=15)
             resp.raise_for_status()
             data = resp.json()
             models = data.get("data", [])
+            # Контексты всех моделей каталога — для предварительной проверки длины промта
+            tokens.save_openrouter_catalog({
+                (m.get("id") or ""): int(m.get("context_length") or 0) for m in models
+            })
             free = []
             for m in models:
                 if not _is_free_model(m.get("pricing") or {}):
@@ -91,9 +132,15 @@ class OpenRouterFetchThread(QThread):
 class OpenRouterModelsDialog(QDialog):
     """Диалог со списком бесплатных моделей OpenRouter в табличном виде."""
 
-    def __init__(self, parent=None, model_edit: Optional[QLineEdit] = None):
+    def __init__(
+        self,
+        parent=None,
+        model_edit: Optional[QLineEdit] = None,
+        context_spin: Optional[QSpinBox] = None,
+    ):
         super().__init__(parent)
         self._model_edit = model_edit
+        self._context_spin = context_spin
         self._models_data: list[tuple[str, str, str]] = []
         self.setWindowTitle("Бесплатные модели OpenRouter")
         self.setMinimumSize(650, 450)
@@ -152,7 +199,9 @@ class OpenRouterModelsDialog(QDialog):
         row = self.table.currentRow()
         if row < 0 or row >= len(self._models_data):
             return
-        mid = self._models_data[row][0]
+        mid, _, ctx = self._models_data[row]
+        if self._context_spin is not None and ctx.isdigit():
+            self._context_spin.setValue(int(ctx))
         if self._model_edit is not None:
             self._model_edit.setText(mid)
             self.accept()
@@ -195,12 +244,81 @@ class ModelEditDialog(QDialog):
         openrouter_btn.clicked.connect(self._on_openrouter_models)
         form.addRow("", openrouter_btn)
 
+        self.context_spin = QSpinBox()
+        self.context_spin.setRange(0, 10_000_000)
+        self.context_spin.setSingleStep(1024)
+        self.context_spin.setSpecialValueText("авто (каталог OpenRouter)")
+        self.context_spin.setToolTip("Длина контекста в токенах для проверки размера промта перед отправкой")
+        form.addRow("Контекст (токены):", self.context_spin)
+
+        self.timeout_spin = QDoubleSpinBox()
+        self.timeout_spin.setRange(0, 3600)
+        self.timeout_spin.setDecimals(0)
+        self.timeout_spin.setSuffix(" с")
+        self.timeout_spin.setSpecialValueText("авто (по задержкам)")
+        self.timeout_spin.setToolTip(
+            "Таймаут запроса к модели. «Авто» — вычисляется из истории задержек её ответов"
+        )
+        form.addRow("Таймаут:", self.timeout_spin)
+        self.latency_label = QLabel()
+        self.latency_label.setStyleSheet("color: gray;")
+        form.addRow("", self.latency_label)
+
         self.is_active_check = QCheckBox("Активна")
         self.is_active_check.setChecked(True)
         form.addRow("", self.is_active_check)
 
         layout.addLayout(form)
 
+        # Параметры генерации: ограничивают длину ответа и время генерации
+        g_gen = QGroupBox("Параметры генерации")
+        gen_form = QFormLayout(g_gen)
+        self.max_tokens_spin = QSpinBox()
+        self.max_tokens_spin.setRange(0, 1_000_000)
+        self.max_tokens_spin.setSingleStep(256)
+        self.max_tokens_spin.setSpecialValueText("по умолчанию")
+        gen_form.addRow("max_tokens:", self.max_tokens_spin)
+        self.temperature_spin = QDoubleSpinBox()
+        self.temperature_spin.setRange(_TEMPERATURE_DEFAULT, 2.0)
+        self.temperature_spin.setSingleStep(0.1)
+        self.temperature_spin.setDecimals(2)
+        self.temperature_spin.setSpecialValueText("по умолчанию")
+        self.temperature_spin.setValue(_TEMPERATURE_DEFAULT)
+        gen_form.addRow("temperature:", self.temperature_spin)
+        self.stop_edit = QPlainTextEdit()
+        self.stop_edit.setPlaceholderText("по одной stop-последовательности на строку")
+        self.stop_edit.setMaximumHeight(60)
+        gen_form.addRow("stop:", self.stop_edit)
+        self.extra_edit = QPlainTextEdit()
+        self.extra_edit.setPlaceholderText('{"top_p": 0.9}')
+        self.extra_edit.setMaximumHeight(60)
+        self.extra_edit.setToolTip("JSON-объект с дополнительными полями запроса для этого провайдера")
+        gen_form.addRow("Доп. параметры (JSON):", self.extra_edit)
+        layout.addWidget(g_gen)
+
+        # Цепочка резервных моделей: опрашиваются по порядку, если эта модель не ответила
+        g_fb = QGroupBox("Резервные модели")
+        fb_layout = QVBoxLayout(g_fb)
+        self.fallback_list = QListWidget()
+        self.fallback_list.setMaximumHeight(90)
+        self.fallback_list.setDragDropMode(QAbstractItemView.InternalMove)
+        self.fallback_list.setToolTip("Порядок попыток; перетащите строку, чтобы изменить порядок")
+        fb_layout.addWidget(self.fallback_list)
+        fb_row = QHBoxLayout()
+        self.fallback_combo = QComboBox()
+        for m in get_all_models():
+            if m.id != self.model_id:
+                self.fallback_combo.addItem(f"{m.name} ({m.model})", m.id)
+        fb_row.addWidget(self.fallback_combo, 1)
+        fb_add_btn = QPushButton("Добавить")
+        fb_add_btn.clicked.connect(lambda: self._add_fallback(self.fallback_combo.currentData()))
+        fb_row.addWidget(fb_add_btn)
+        fb_del_btn = QPushButton("Убрать")
+        fb_del_btn.clicked.connect(lambda: self.fallback_list.takeItem(self.fallback_list.currentRow()))
+        fb_row.addWidget(fb_del_btn)
+        fb_layout.addLayout(fb_row)
+        layout.addWidget(g_fb)
+
         btn_layout = QHBoxLayout()
         btn_layout.addStretch()
         ok_btn = QPushButton("OK")
@@ -211,8 +329,34 @@ class ModelEditDialog(QDialog):
         btn_layout.addWidget(cancel_btn)
         layout.addLayout(btn_layout)
 
+    def _generation_params(self) -> dict:
+        """Параметры генерации из формы. При неверном JSON выбрасывает ValueError."""
+        temperature = self.temperature_spin.value()
+        return {
+            "max_tokens": self.max_tokens_spin.value(),
+            "temperature": None if temperature <= _TEMPERATURE_DEFAULT else round(temperature, 2),
+            "stop": [line for line in self.stop_edit.toPlainText().splitlines() if line],
+            "extra_params": parse_extra_params(self.extra_edit.toPlainText()),
+            "timeout": self.timeout_spin.value(),
+            "fallbacks": self._fallback_ids(),
+        }
+
+    def _add_fallback(self, mid: Optional[int]):
+        if mid is None or mid in self._fallback_ids():
+            return
+        idx = self.fallback_combo.findData(mid)
+        label = self.fallback_combo.itemText(idx) if idx >= 0 else f"id {mid} (удалена)"
+        item = QListWidgetItem(label)
+        item.setData(Qt.UserRole, mid)
+        self.fallback_list.addItem(item)
+
+    def _fallback_ids(self) -> list[int]:
+        return [
+            self.fallback_list.item(i).data(Qt.UserRole) for i in range(self.fallback_list.count())
+        ]
+
     def _on_openrouter_models(self):
-        d = OpenRouterModelsDialog(self, self.model_edit)
+        d = OpenRouterModelsDialog(self, self.model_edit, self.context_spin)
         d.exec_()
 
     def _load_model(self):
@@ -222,7 +366,32 @@ class ModelEditDialog(QDialog):
             self.api_url_edit.setText(m.api_url)
             self.api_id_edit.setText(m.api_id)
             self.model_edit.setText(m.model)
+            self.context_spin.setValue(m.context_length or 0)
+            self.timeout_spin.setValue(m.timeout or 0)
+            self._show_latency(m)
+            self.max_tokens_spin.setValue(m.max_tokens or 0)
+            self.temperature_spin.setValue(
+                _TEMPERATURE_DEFAULT if m.temperature is None else m.temperature
+            )
+            self.stop_edit.setPlainText("\n".join(m.stop))
+            if m.extra_params:
+                self.extra_edit.setPlainText(json.dumps(m.extra_params, ensure_ascii=False, indent=2))
             self.is_active_check.setChecked(m.is_active == 1)
+            for fid in m.fallbacks:
+                self._add_fallback(fid)
+
+    def _show_latency(self, m):
+        """Подпись с 95-м перцентилем задержек и вычисленным таймаутом модели."""
+        p = latency.percentile(m.id)
+        if p is None:
+            self.latency_label.setText(
+                f"Ответов в истории: {latency.sample_count(m.id)}, "
+                f"таймаут по умолчанию {latency.DEFAULT_TIMEOUT:.0f} с"
+            )
+            return
+        self.latency_label.setText(
+            f"p95 задержки {p:.1f} с, авто-таймаут {latency.auto_timeout(m.id):.0f} с"
+        )
 
     def _on_ok(self):
         name = self.name_edit.text().strip()
@@ -230,6 +399,7 @@ class ModelEditDialog(QDialog):
         api_id = self.api_id_edit.text().strip()
         model = self.model_edit.text().strip() or "gpt-3.5-turbo"
         is_active = 1 if self.is_active_check.isChecked() else 0
+        context_length = self.context_spin.value()
 
         if not name:
             QMessageBox.warning(self, "Ошибка", "Введите название модели.")
@@ -252,11 +422,17 @@ class ModelEditDialog(QDialog):
             )
             return
 
+        try:
+            gen = self._generation_params()
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", f"Параметры генерации: {e}")
+            return
+
         try:
             if self.model_id:
-                update_model(self.model_id, name, api_url, api_id, model, is_active)
+                update_model(self.model_id, name, api_url, api_id, model, is_active, context_length, **gen)
             else:
-                add_model(name, api_url, api_id, model, is_active)
+                add_model(name, api_url, api_id, model, is_active, context_length, **gen)
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить: {e}")
@@ -268,6 +444,7 @@ class ModelEditDialog(QDialog):
             "api_id": self.api_id_edit.text().strip(),
             "model": self.model_edit.text().strip() or "gpt-3.5-turbo",
             "is_active": 1 if self.is_active_check.isChecked() else 0,
+            "context_length": self.context_spin.value(),
         }
 
 
@@ -284,8 +461,8 @@ class ModelsSettingsDialog(QDialog):
     def _setup_ui(self):
         layout = QVBoxLayout(self)
 
-        self.table = QTableWidget(0, 5)
-        self.table.setHorizontalHeaderLabels(["ID", "Название", "API URL", "Модель API", "Активна"])
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(["ID", "Название", "API URL", "Модель API", "Активна", "Состояние"])
         self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.SingleSelection)
@@ -301,6 +478,10 @@ class ModelsSettingsDialog(QDialog):
         btn_layout.addWidget(add_btn)
         btn_layout.addWidget(edit_btn)
         btn_layout.addWidget(del_btn)
+        self.probe_btn = QPushButton("Проверить все")
+        self.probe_btn.setToolTip("Параллельно проверить доступность всех моделей из списка")
+        self.probe_btn.clicked.connect(self._on_probe_all)
+        btn_layout.addWidget(self.probe_btn)
         btn_layout.addStretch()
         close_btn = QPushButton("Закрыть")
         close_btn.clicked.connect(self.accept)
@@ -316,6 +497,37 @@ class ModelsSettingsDialog(QDialog):
             self.table.setItem(i, 2, QTableWidgetItem(m.api_url))
             self.table.setItem(i, 3, QTableWidgetItem(m.model))
             self.table.setItem(i, 4, QTableWidgetItem("Да" if m.is_active else "Нет"))
+            self._set_probe_cell(i, health.last_result(m.id))
+
+    def _set_probe_cell(self, row: int, result: Optional[health.ProbeResult]):
+        item = QTableWidgetItem(result.status_text() if result else "")
+        if result and not result.ok:
+            item.setToolTip(result.error)
+        self.table.setItem(row, 5, item)
+
+    def _on_probe_all(self):
+        models = get_all_models()
+        if not models:
+            return
+        self.probe_btn.setEnabled(False)
+        self.probe_btn.setText("Проверка…")
+        self._probe_thread = ProbeModelsThread(models, self)
+        self._probe_thread.finished.connect(self._on_probed)
+        self._probe_thread.error.connect(self._on_probe_error)
+        self._probe_thread.start()
+
+    def _on_probed(self, results: dict):
+        self.probe_btn.setEnabled(True)
+        self.probe_btn.setText("Проверить все")
+        for row in range(self.table.rowCount()):
+            item = self.table.item(row, 0)
+            if item:
+                self._set_probe_cell(row, results.get(int(item.text())))
+
+    def _on_probe_error(self, msg: str):
+        self.probe_btn.setEnabled(True)
+        self.probe_btn.setText("Проверить все")
+        QMessageBox.warning(self, "Ошибка", f"Не удалось проверить модели: {msg}")
 
     def _selected_id(self) -> int | None:
         row = self.table.currentRow()
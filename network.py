@@ -1,15 +1,33 @@
 """
 Модуль отправки HTTP-запросов к API нейросетей.
-Использует requests (стабильнее httpx на Windows).
+Запросы идут через transport.py: requests (HTTP/1.1, по умолчанию — стабильнее
+httpx на Windows) или httpx с HTTP/2.
 """
 import json
-from typing import Optional
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Optional
+from urllib.parse import urlsplit
 
-import requests
+import latency
+import tokens
+import transport
+from models import Model, api_headers, get_api_key, get_model
 
-from models import Model, get_api_key
-
-DEFAULT_TIMEOUT = 60.0
+# Таймаут по умолчанию; при timeout=None он вычисляется для модели (latency.timeout_for)
+DEFAULT_TIMEOUT = latency.DEFAULT_TIMEOUT
+# Параллельных одиночных запросов, когда провайдер не поддерживает n
+MAX_SAMPLE_WORKERS = 4
+# Моделей, опрашиваемых одновременно при отправке во все модели; лимит на хост
+# провайдера задаёт scheduler
+MAX_SEND_WORKERS = 8
+# Секунд на резервные модели сверх таймаута основной (срок всей цепочки send_with_fallback)
+DEFAULT_FALLBACK_BUDGET = 30.0
+_fallback_budget = DEFAULT_FALLBACK_BUDGET
 
 
 class NetworkError(Exception):
@@ -22,19 +40,291 @@ class ApiKeyError(NetworkError):
     pass
 
 
-def send_prompt_to_model(
-    model: Model,
-    prompt: str,
-    timeout: float = DEFAULT_TIMEOUT,
-    system: str | None = None,
-) -> tuple[int, str]:
+class CircuitOpenError(NetworkError):
+    """Провайдер временно отключён автоматом защиты — запрос не отправлялся."""
+    pass
+
+
+# --- Автомат защиты (circuit breaker) на эндпоинт провайдера ---
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+DEFAULT_CIRCUIT_FAILURES = 3  # подряд неудачных запросов до отключения
+DEFAULT_CIRCUIT_OPEN_SECONDS = 30.0  # время отключения до пробного запроса
+
+
+class CircuitBreaker:
+    """
+    Автомат защиты одного эндпоинта (api_url + переменная ключа).
+    closed — запросы идут; после failure_threshold сбоев подряд — open: запросы
+    сразу отклоняются; через open_seconds — half_open: пропускается один пробный
+    запрос, его успех закрывает автомат, сбой снова открывает.
     """
-    Отправляет промт к одной модели.
 
-    Возвращает (model_id, response_text).
-    При ошибке выбрасывает NetworkError или ApiKeyError.
-    system — опциональный системный промт.
+    def __init__(self, failure_threshold: int = DEFAULT_CIRCUIT_FAILURES,
+                 open_seconds: float = DEFAULT_CIRCUIT_OPEN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = CIRCUIT_CLOSED
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == CIRCUIT_OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self._state = CIRCUIT_HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def retry_in(self) -> float:
+        """Секунд до пробного запроса (0, если автомат не открыт)."""
+        with self._lock:
+            if self._current_state() != CIRCUIT_OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос сейчас."""
+        with self._lock:
+            state = self._current_state()
+            if state == CIRCUIT_CLOSED:
+                return True
+            if state == CIRCUIT_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._state = CIRCUIT_CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._state == CIRCUIT_HALF_OPEN or self.failures >= self.failure_threshold:
+                self._state = CIRCUIT_OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+_breakers: dict[tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_circuit_failures = DEFAULT_CIRCUIT_FAILURES
+_circuit_open_seconds = DEFAULT_CIRCUIT_OPEN_SECONDS
+
+
+def configure_circuit_breakers(failure_threshold: int, open_seconds: float) -> None:
+    """Задаёт пороги автоматов защиты (применяются и к уже созданным)."""
+    global _circuit_failures, _circuit_open_seconds
+    with _breakers_lock:
+        _circuit_failures = max(1, int(failure_threshold))
+        _circuit_open_seconds = max(0.0, float(open_seconds))
+        for b in _breakers.values():
+            b.failure_threshold = _circuit_failures
+            b.open_seconds = _circuit_open_seconds
+
+
+def get_breaker(model: Model) -> CircuitBreaker:
+    """Автомат защиты эндпоинта модели (общий для моделей с тем же api_url и ключом)."""
+    key = (model.api_url, model.api_id)
+    with _breakers_lock:
+        b = _breakers.get(key)
+        if b is None:
+            b = _breakers[key] = CircuitBreaker(_circuit_failures, _circuit_open_seconds)
+        return b
+
+
+def circuit_status(model: Model) -> str:
+    """Состояние автомата защиты эндпоинта модели для отображения."""
+    b = get_breaker(model)
+    state = b.state
+    if state == CIRCUIT_OPEN:
+        return f"отключён (ещё {b.retry_in():.0f} с)"
+    if state == CIRCUIT_HALF_OPEN:
+        return "проверка"
+    return "норма"
+
+
+# --- Планировщик запросов: приоритеты и лимит одновременных запросов к провайдеру ---
+
+PRIORITY_INTERACTIVE = 0  # отправка из главного окна — всегда первой
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2  # пакетные прогоны, пробы, обновление каталогов
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_BACKGROUND: "background",
+}
+DEFAULT_PROVIDER_CONCURRENCY = 4  # одновременных запросов к одному хосту
+WAIT_HISTORY = 200  # последних ожиданий на приоритет для статистики
+
+
+class _Ticket:
+    """Запрос, ожидающий слот хоста."""
+    __slots__ = ("enqueued", "granted")
+
+    def __init__(self):
+        self.enqueued = time.monotonic()
+        self.granted = False
+
+
+class RequestScheduler:
+    """
+    Очередь запросов к провайдерам. Запрос получает слот хоста, когда
+    у хоста есть свободный слот и нет ожидающих запросов более высокого
+    приоритета. Один слот хоста резервируется под интерактивные запросы,
+    поэтому фоновая нагрузка не может занять хост целиком. Внутри приоритета
+    хосты обслуживаются по кругу, запросы одного хоста — в порядке поступления.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_PROVIDER_CONCURRENCY):
+        self.concurrency = max(1, int(concurrency))
+        self._cond = threading.Condition()
+        self._waiting: dict[int, dict[str, deque]] = {p: {} for p in PRIORITY_NAMES}
+        self._active: dict[str, int] = {}
+        self._rr: dict[int, int] = {p: 0 for p in PRIORITY_NAMES}  # позиция круга по хостам
+        self._waits: dict[int, deque] = {p: deque(maxlen=WAIT_HISTORY) for p in PRIORITY_NAMES}
+
+    def _limit(self, priority: int) -> int:
+        if priority == PRIORITY_INTERACTIVE or self.concurrency == 1:
+            return self.concurrency
+        return self.concurrency - 1
+
+    def _dispatch(self) -> None:
+        """Выдаёт свободные слоты ожидающим запросам (вызывается под self._cond)."""
+        granted = False
+        for p in sorted(self._waiting):
+            hosts = [h for h, q in self._waiting[p].items() if q]
+            if not hosts:
+                continue
+            start = self._rr[p] % len(hosts)
+            for h in hosts[start:] + hosts[:start]:
+                q = self._waiting[p][h]
+                # Хост занят запросами более высокого приоритета — их очередь первая
+                if any(self._waiting[hp].get(h) for hp in self._waiting if hp < p):
+                    continue
+                while q and self._active.get(h, 0) < self._limit(p):
+                    t = q.popleft()
+                    t.granted = True
+                    self._active[h] = self._active.get(h, 0) + 1
+                    self._waits[p].append(time.monotonic() - t.enqueued)
+                    granted = True
+                    self._rr[p] += 1
+            for h in hosts:
+                if not self._waiting[p][h]:
+                    del self._waiting[p][h]
+        if granted:
+            self._cond.notify_all()
+
+    def acquire(self, host: str, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None) -> None:
+        """Ждёт слот хоста. Если за timeout секунд слот не выдан — NetworkError."""
+        priority = priority if priority in PRIORITY_NAMES else PRIORITY_NORMAL
+        with self._cond:
+            t = _Ticket()
+            self._waiting[priority].setdefault(host, deque()).append(t)
+            self._dispatch()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not t.granted:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    q = self._waiting[priority].get(host)
+                    if q and t in q:
+                        q.remove(t)
+                    raise NetworkError(
+                        f"Таймаут ожидания в очереди запросов к {host} ({timeout:g} с)"
+                    )
+                self._cond.wait(left)
+
+    def release(self, host: str) -> None:
+        with self._cond:
+            n = self._active.get(host, 0) - 1
+            if n > 0:
+                self._active[host] = n
+            else:
+                self._active.pop(host, None)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, host: str, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None):
+        """Контекст: запрос выполняется, удерживая слот хоста."""
+        self.acquire(host, priority, timeout)
+        try:
+            yield
+        finally:
+            self.release(host)
+
+    def stats(self) -> dict:
+        """
+        Состояние очереди для мониторинга: по приоритетам — число ожидающих
+        запросов и время ожидания слота (среднее и максимум по последним),
+        по хостам — число выполняющихся запросов.
+        """
+        with self._cond:
+            out: dict = {"active": dict(self._active), "queues": {}}
+            for p, name in PRIORITY_NAMES.items():
+                waits = list(self._waits[p])
+                out["queues"][name] = {
+                    "depth": sum(len(q) for q in self._waiting[p].values()),
+                    "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+                    "wait_max": max(waits) if waits else 0.0,
+                }
+            return out
+
+
+scheduler = RequestScheduler()
+
+
+def configure_scheduler(concurrency: int) -> None:
+    """Задаёт число одновременных запросов к одному провайдеру."""
+    with scheduler._cond:
+        scheduler.concurrency = max(1, int(concurrency))
+        scheduler._dispatch()
+
+
+def host_of(url: str) -> str:
+    """Хост провайдера для планировщика."""
+    return urlsplit(url).netloc.lower() or url
+
+
+# Поля тела запроса, которые не могут быть переопределены extra_params модели
+_RESERVED_PAYLOAD_KEYS = ("model", "messages")
+
+
+def build_payload(model: Model, messages: list[dict], max_tokens: Optional[int] = None) -> dict:
     """
+    Тело запроса chat/completions с параметрами генерации модели.
+    max_tokens — переопределение для одной отправки (None — из настроек модели).
+    """
+    payload: dict = {}
+    extra = getattr(model, "extra_params", None) or {}
+    payload.update({k: v for k, v in extra.items() if k not in _RESERVED_PAYLOAD_KEYS})
+    payload["model"] = getattr(model, "model", None) or "gpt-3.5-turbo"
+    payload["messages"] = messages
+    limit = max_tokens if max_tokens else getattr(model, "max_tokens", 0)
+    if limit:
+        payload["max_tokens"] = int(limit)
+    temperature = getattr(model, "temperature", None)
+    if temperature is not None:
+        payload["temperature"] = float(temperature)
+    stop = getattr(model, "stop", None)
+    if stop:
+        payload["stop"] = list(stop)
+    return payload
+
+
+def _headers(model: Model) -> dict:
+    """Заголовки запроса с API-ключом модели. Без ключа — ApiKeyError."""
+    if model.headers is not None:
+        return model.headers  # собраны реестром моделей
     api_key = get_api_key(model.api_id)
     if not api_key or not str(api_key).strip():
         raise ApiKeyError(
@@ -42,80 +332,296 @@ def send_prompt_to_model(
             f"Добавьте {model.api_id}=ваш_ключ в .env или .env.local"
         )
 
-    api_key = str(api_key).strip()
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
-    model_id = getattr(model, "model", None) or "gpt-3.5-turbo"
+    return api_headers(str(api_key).strip())
+
+
+def _messages(prompt: str, system: str | None) -> list[dict]:
     messages = []
     if system:
         messages.append({"role": "system", "content": system})
     messages.append({"role": "user", "content": prompt})
-    payload = {
-        "model": model_id,
-        "messages": messages,
-    }
+    return messages
+
 
+def _post_chat(
+    model: Model, payload: dict, timeout: Optional[float], priority: int = PRIORITY_NORMAL
+) -> list[str]:
+    """
+    POST chat/completions. Возвращает тексты всех choices (не пустой список).
+    Запрос сначала ждёт слот провайдера в scheduler с приоритетом priority;
+    ожидание в очереди входит в timeout. timeout=None — адаптивный таймаут модели.
+    """
+    if timeout is None:
+        timeout = latency.timeout_for(model)
+    deadline = time.monotonic() + timeout
+    with scheduler.slot(host_of(model.api_url), priority, timeout):
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise NetworkError(f"Таймаут при запросе к {model.name}: срок истёк в очереди запросов")
+        return _post_chat_now(model, payload, left)
+
+
+def _post_chat_now(model: Model, payload: dict, timeout: float) -> list[str]:
+    """
+    Выполняет запрос _post_chat.
+    Таймауты, сетевые сбои, HTTP 429 и 5xx учитываются автоматом защиты эндпоинта;
+    пока он открыт, запрос не отправляется (CircuitOpenError). Задержка успешного
+    ответа добавляется в историю модели (latency.record).
+    """
+    headers = _headers(model)
+    breaker = get_breaker(model)
+    if not breaker.allow():
+        raise CircuitOpenError(
+            f"Ошибка: провайдер {model.api_url} временно отключён после сбоев "
+            f"(повтор через {breaker.retry_in():.0f} с)"
+        )
+    started = time.perf_counter()
     try:
-        resp = requests.post(
-            model.api_url, json=payload, headers=headers, timeout=timeout
+        resp = transport.get_transport().request(
+            "POST", model.api_url, headers=headers, timeout=timeout, json=payload
         )
-        resp.raise_for_status()
-        text = resp.text
-        if not text or not text.strip():
-            raise NetworkError(f"Пустой ответ от {model.name}")
-        try:
-            data = json.loads(text)
-        except json.JSONDecodeError as e:
-            preview = text[:200] + "…" if len(text) > 200 else text
-            raise NetworkError(
-                f"Неверный JSON от {model.name}: {e}. Тело: {preview}"
-            ) from e
-    except requests.Timeout as e:
+    except transport.TransportTimeout as e:
+        breaker.record_failure()
         raise NetworkError(f"Таймаут при запросе к {model.name}: {e}") from e
-    except requests.HTTPError as e:
-        r = e.response
-        code = r.status_code if r else 0
-        err_text = r.text if r else str(e)
-        raise NetworkError(f"HTTP {code} от {model.name}: {err_text}") from e
-    except requests.RequestException as e:
+    except transport.TransportError as e:
+        breaker.record_failure()
         raise NetworkError(f"Ошибка запроса к {model.name}: {e}") from e
+    if resp.status_code == 429 or resp.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    if resp.status_code >= 400:
+        raise NetworkError(f"HTTP {resp.status_code} от {model.name}: {resp.text}")
+    latency.record(model.id, time.perf_counter() - started)
+    text = resp.text
+    if not text or not text.strip():
+        raise NetworkError(f"Пустой ответ от {model.name}")
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        preview = text[:200] + "…" if len(text) > 200 else text
+        raise NetworkError(
+            f"Неверный JSON от {model.name}: {e}. Тело: {preview}"
+        ) from e
 
     choices = data.get("choices", [])
     if not choices:
         raise NetworkError(f"Пустой ответ от {model.name}")
 
-    content = choices[0].get("message", {}).get("content", "")
-    return model.id, content
+    return [(c.get("message") or {}).get("content", "") or "" for c in choices]
+
+
+def send_prompt_to_model(
+    model: Model,
+    prompt: str,
+    timeout: Optional[float] = None,
+    system: str | None = None,
+    max_tokens: Optional[int] = None,
+    priority: int = PRIORITY_NORMAL,
+) -> tuple[int, str]:
+    """
+    Отправляет промт к одной модели.
+
+    Возвращает (model_id, response_text).
+    При ошибке выбрасывает NetworkError или ApiKeyError.
+    system — опциональный системный промт.
+    max_tokens — ограничение длины ответа для этой отправки (иначе из настроек модели).
+    priority — класс запроса в планировщике (PRIORITY_*).
+    """
+    payload = build_payload(model, _messages(prompt, system), max_tokens)
+    return model.id, _post_chat(model, payload, timeout, priority)[0]
+
+
+# Модели (api_url, model.model), которые не вернули n вариантов в одном ответе
+_n_unsupported: set[tuple[str, str]] = set()
+_n_lock = threading.Lock()
+# Ошибка HTTP 400/422 относится к параметру n: «'n'», «n must be 1», «argument: n» и т.п.
+_N_PARAM_ERROR = re.compile(
+    r"""['"`]n['"`]|\bn\s*(?:must|should|is|parameter|=|>|<)|(?:argument|parameter|field)s?[^.\n]{0,40}?\bn\b""",
+    re.IGNORECASE,
+)
+
+
+def _rejects_n(model: Model, error: NetworkError) -> bool:
+    """Отклонил ли провайдер параметр n (а не промт, stop, extra_params и т.п.)."""
+    msg = str(error)
+    if not msg.startswith(("HTTP 400", "HTTP 422")):
+        return False
+    body = msg.split(f"от {model.name}: ", 1)[-1]
+    return bool(_N_PARAM_ERROR.search(body))
+
+
+def send_prompt_samples(
+    model: Model,
+    prompt: str,
+    samples: int,
+    timeout: Optional[float] = None,
+    system: str | None = None,
+    max_tokens: Optional[int] = None,
+    priority: int = PRIORITY_NORMAL,
+) -> list[str]:
+    """
+    Получает samples ответов модели на один промт.
+
+    Сначала пробует один запрос с параметром n. Если провайдер вернул меньше
+    вариантов или отклонил именно n, недостающие ответы запрашиваются параллельными
+    одиночными вызовами, а модель запоминается, чтобы дальше сразу идти этим путём.
+    Другие ошибки (напр. HTTP 400 из-за длины промта) не повторяются.
+    При ошибке выбрасывает NetworkError или ApiKeyError.
+    """
+    samples = max(1, int(samples))
+    messages = _messages(prompt, system)
+    texts: list[str] = []
+    # Повторные одиночные запросы укладываются в тот же timeout, что и первый
+    deadline = None if timeout is None else time.monotonic() + timeout
+    key = (model.api_url, model.model)
+    with _n_lock:
+        try_n = samples > 1 and key not in _n_unsupported
+    if samples == 1 or try_n:
+        payload = build_payload(model, messages, max_tokens)
+        if samples > 1:
+            payload["n"] = samples
+        try:
+            texts = _post_chat(model, payload, timeout, priority)[:samples]
+        except NetworkError as e:
+            # Провайдер отклонил n — повторим без него; остальные ошибки не повторяются
+            if samples == 1 or not _rejects_n(model, e):
+                raise
+        if len(texts) < samples:
+            with _n_lock:
+                _n_unsupported.add(key)
+    missing = samples - len(texts)
+    if missing <= 0:
+        return texts
+    if deadline is not None:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            if texts:
+                return texts
+            raise NetworkError(f"Таймаут при запросе к {model.name}: срок ответа истёк")
+
+    payload = build_payload(model, messages, max_tokens)
+    with ThreadPoolExecutor(max_workers=min(missing, MAX_SAMPLE_WORKERS)) as pool:
+        futures = [pool.submit(_post_chat, model, payload, timeout, priority) for _ in range(missing)]
+        errors = []
+        for f in futures:
+            try:
+                texts.append(f.result()[0])
+            except NetworkError as e:
+                errors.append(e)
+    if not texts:
+        raise errors[0]
+    return texts
+
+
+def configure_fallback_budget(seconds: float) -> None:
+    """Задаёт время на резервные модели сверх таймаута основной, секунды (0 — только остаток)."""
+    global _fallback_budget
+    _fallback_budget = max(0.0, float(seconds))
+
+
+def send_with_fallback(
+    model: Model,
+    prompt: str,
+    samples: int = 1,
+    timeout: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    priority: int = PRIORITY_NORMAL,
+) -> tuple[Model, list[str]]:
+    """
+    Получает ответы модели, а при ошибке — первой ответившей модели из её цепочки
+    резервных (model.fallbacks). Основная модель получает свой таймаут целиком
+    (или timeout). Вся цепочка укладывается в срок: этот таймаут плюс бюджет
+    резервных моделей (configure_fallback_budget); резервная модель получает свой
+    таймаут, но не больше остатка срока.
+    Резервные модели, в контекст которых промт не помещается, пропускаются.
+    Возвращает (ответившая модель, тексты). Если не ответил никто, выбрасывает
+    NetworkError с ошибками всех попыток.
+    """
+    deadline = time.monotonic() + (timeout or latency.timeout_for(model)) + _fallback_budget
+    errors: list[NetworkError] = []
+    chain: list[Model] = [model]
+    for fid in model.fallbacks:
+        fb = get_model(fid) if fid != model.id else None
+        if fb is not None and all(fb.id != c.id for c in chain):
+            chain.append(fb)
+
+    for i, target in enumerate(chain):
+        attempt = timeout or latency.timeout_for(target)
+        if i > 0:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                errors.append(NetworkError(f"резерв {target.name}: срок ответа истёк"))
+                break
+            _, overflow = tokens.preflight([target], prompt, max_tokens=max_tokens)
+            if overflow:
+                errors.append(NetworkError(f"резерв {target.name}: промт не помещается в контекст"))
+                continue
+            attempt = min(attempt, remaining)
+        try:
+            return target, send_prompt_samples(
+                target, prompt, samples, attempt, max_tokens=max_tokens, priority=priority
+            )
+        except NetworkError as e:
+            errors.append(e if i == 0 else NetworkError(f"резерв {target.name}: {e}"))
+    if len(errors) == 1:
+        raise errors[0]
+    raise NetworkError("; ".join(str(e) for e in errors))
 
 
 def send_prompt_to_all_models(
     models: list[Model],
     prompt: str,
-    timeout: float = DEFAULT_TIMEOUT,
+    timeout: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    samples: int = 1,
+    priority: int = PRIORITY_NORMAL,
+    on_result: Optional[Callable[[int, str, Optional[str], bool], None]] = None,
 ) -> list[tuple[int, str, Optional[str]]]:
     """
     Отправляет промт во все модели конкурентно.
 
     Возвращает список кортежей: (model_id, model_name, response_or_error).
     response_or_error — текст ответа или строка с текстом ошибки.
+    max_tokens — общее ограничение длины ответа для этой отправки (None — по моделям).
+    samples — ответов на модель; при samples > 1 каждый вариант — отдельный кортеж
+    с именем вида «Модель #2».
+    Если модель не ответила, опрашивается её цепочка резервных (send_with_fallback);
+    ответ резервной модели приходит с её id и именем вида «Основная → Резервная».
+    priority — класс запросов в планировщике; отправка из главного окна —
+    PRIORITY_INTERACTIVE, пакетная работа — PRIORITY_BACKGROUND.
+    on_result(model_id, model_name, response_or_error, is_error) вызывается для
+    каждого ответа сразу по получении (напр. для журнала ответов journal.py)
+    из рабочего потока — он не должен обращаться к Qt.
+    Модели опрашиваются параллельно (до MAX_SEND_WORKERS); результаты
+    возвращаются в порядке models.
     """
     results: list[tuple[int, str, Optional[str]]] = []
-    name_by_id = {m.id: m.name for m in models}
+    samples = max(1, int(samples))
 
-    def task(m: Model):
+    def task(m: Model) -> tuple[list[tuple[int, str, Optional[str]]], bool]:
         try:
-            mid, response = send_prompt_to_model(m, prompt, timeout)
-            return mid, m.name, response
+            target, texts = send_with_fallback(m, prompt, samples, timeout, max_tokens, priority)
         except (NetworkError, ApiKeyError) as e:
-            return m.id, m.name, str(e)
+            return [(m.id, m.name, str(e))], True
         except Exception as e:
-            return m.id, m.name, f"Ошибка: {e}"
+            return [(m.id, m.name, f"Ошибка: {e}")], True
+        name = m.name if target.id == m.id else f"{m.name} → {target.name}"
+        if samples == 1:
+            return [(target.id, name, texts[0])], False
+        return [(target.id, f"{name} #{i}", t) for i, t in enumerate(texts, 1)], False
 
-    # Последовательное выполнение (избегаем крашей при многопоточности на Windows)
-    for m in models:
-        mid, mname, resp = task(m)
-        results.append((mid, mname, resp))
+    def run(m: Model) -> list[tuple[int, str, Optional[str]]]:
+        rows, is_error = task(m)
+        if on_result:
+            for row in rows:
+                on_result(*row, is_error)
+        return rows
 
+    if not models:
+        return results
+    # Рабочие потоки не трогают Qt: интерфейс обновляет вызывающий по готовому списку
+    with ThreadPoolExecutor(max_workers=min(len(models), MAX_SEND_WORKERS)) as pool:
+        for rows in pool.map(run, models):
+            results.extend(rows)
     return results
@@ -1,10 +1,27 @@
 """
 AI-ассистент для улучшения промтов.
 Отправляет промт в модель с инструкцией вернуть улучшенную версию.
+Может опрашивать несколько моделей параллельно и объединять их варианты.
 """
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 from models import Model
 from network import send_prompt_to_model, NetworkError, ApiKeyError
 
+# Параллельных запросов при улучшении несколькими моделями
+IMPROVE_MAX_WORKERS = 4
+# Сколько ответов хранить в кэше улучшений (на время работы программы)
+IMPROVE_CACHE_SIZE = 256
+# Вес варианта по позиции в ответе: улучшенный, вариант 2, вариант 3
+_VARIANT_WEIGHTS = (3.0, 2.0, 1.0)
+
+# Кэш ответов: (api_url, model, sha256 текста) -> ответ модели
+_improve_cache: "OrderedDict[tuple[str, str, str], str]" = OrderedDict()
+_improve_cache_lock = threading.Lock()
+
 SYSTEM_PROMPT = """Ты помощник по улучшению промтов для нейросетей.
 Пользователь пришлёт исходный промт. Верни в следующем формате:
 
@@ -20,18 +37,108 @@ SYSTEM_PROMPT = """Ты помощник по улучшению промтов
 Отвечай только текстом в этом формате, без лишних пояснений."""
 
 
-def improve_prompt(prompt_text: str, model: Model) -> str:
+def _cache_key(prompt_text: str, model: Model) -> tuple[str, str, str]:
+    digest = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+    return model.api_url, model.model, digest
+
+
+def cached_improvement(prompt_text: str, model: Model) -> str | None:
+    """Ответ модели из кэша улучшений или None."""
+    key = _cache_key(prompt_text, model)
+    with _improve_cache_lock:
+        if key in _improve_cache:
+            _improve_cache.move_to_end(key)
+            return _improve_cache[key]
+    return None
+
+
+def clear_improve_cache() -> None:
+    """Очищает кэш улучшений."""
+    with _improve_cache_lock:
+        _improve_cache.clear()
+
+
+def improve_prompt(prompt_text: str, model: Model, use_cache: bool = True) -> str:
     """
     Отправляет промт в модель для улучшения.
     Возвращает ответ модели (улучшенный промт и варианты) или строку с ошибкой.
+    Успешные ответы кэшируются по (модель, хеш текста); ошибки не кэшируются.
     """
+    if use_cache:
+        cached = cached_improvement(prompt_text, model)
+        if cached is not None:
+            return cached
     try:
         _, response = send_prompt_to_model(model, prompt_text, system=SYSTEM_PROMPT)
-        return response or "(Пустой ответ)"
     except (NetworkError, ApiKeyError) as e:
         return str(e)
     except Exception as e:
         return f"Ошибка: {e}"
+    if not response:
+        return "(Пустой ответ)"
+    with _improve_cache_lock:
+        _improve_cache[_cache_key(prompt_text, model)] = response
+        while len(_improve_cache) > IMPROVE_CACHE_SIZE:
+            _improve_cache.popitem(last=False)
+    return response
+
+
+def is_error_response(text: str) -> bool:
+    """True, если improve_prompt вернул текст ошибки, а не ответ модели."""
+    return text.startswith(("Ошибка", "HTTP", "Переменная", "Таймаут", "Неверный", "Пустой ответ", "(Пустой ответ)"))
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def merge_variants(parsed_by_model: list[tuple[str, dict]]) -> list[dict]:
+    """
+    Объединяет результаты parse_improved_response нескольких моделей в один список.
+    Одинаковые (без учёта регистра и пробелов) варианты склеиваются, их вес суммируется.
+    Возвращает [{"text", "models": [имена], "score"}], отсортированный по убыванию score.
+    """
+    merged: dict[str, dict] = {}
+    order: list[str] = []
+    for model_name, parsed in parsed_by_model:
+        variants = [parsed.get("improved", "")] + list(parsed.get("alternatives", []))
+        for pos, text in enumerate(variants):
+            text = (text or "").strip()
+            if not text:
+                continue
+            weight = _VARIANT_WEIGHTS[pos] if pos < len(_VARIANT_WEIGHTS) else _VARIANT_WEIGHTS[-1]
+            key = _normalize(text)
+            item = merged.get(key)
+            if item is None:
+                item = merged[key] = {"text": text, "models": [], "score": 0.0}
+                order.append(key)
+            if model_name not in item["models"]:
+                item["models"].append(model_name)
+            item["score"] += weight
+    # Стабильная сортировка: при равном весе — порядок появления
+    return sorted((merged[k] for k in order), key=lambda v: -v["score"])
+
+
+def improve_prompt_multi(
+    prompt_text: str,
+    models: list[Model],
+    max_workers: int = IMPROVE_MAX_WORKERS,
+) -> tuple[list[dict], list[str]]:
+    """
+    Улучшает промт сразу несколькими моделями через ограниченный пул потоков.
+    Возвращает (ранжированные варианты merge_variants, ошибки «Модель: текст»).
+    """
+    if not models:
+        return [], []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(models)))) as pool:
+        responses = list(pool.map(lambda m: improve_prompt(prompt_text, m), models))
+    parsed, errors = [], []
+    for m, text in zip(models, responses):
+        if is_error_response(text):
+            errors.append(f"{m.name}: {text}")
+        else:
+            parsed.append((m.name, parse_improved_response(text)))
+    return merge_variants(parsed), errors
 
 
 def parse_improved_response(text: str) -> dict:
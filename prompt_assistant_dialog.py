@@ -17,7 +17,16 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 from models import get_active_models, Model
-from prompt_assistant import improve_prompt, parse_improved_response
+from prompt_assistant import (
+    cached_improvement,
+    improve_prompt,
+    improve_prompt_multi,
+    is_error_response,
+    parse_improved_response,
+)
+
+# Значение пункта «Все активные модели» в списке моделей
+ALL_MODELS = "__all__"
 
 
 class ImprovePromptThread(QThread):
@@ -32,12 +41,26 @@ class ImprovePromptThread(QThread):
 
     def run(self):
         result = improve_prompt(self.prompt_text, self.model)
-        if result.startswith(("Ошибка", "HTTP", "Переменная", "Таймаут")):
+        if is_error_response(result):
             self.error.emit(result)
         else:
             self.finished.emit(result)
 
 
+class ImprovePromptMultiThread(QThread):
+    """Поток улучшения промта несколькими моделями параллельно."""
+    finished = pyqtSignal(list, list)  # (ранжированные варианты, ошибки)
+
+    def __init__(self, prompt_text: str, models: list[Model], parent=None):
+        super().__init__(parent)
+        self.prompt_text = prompt_text
+        self.models = models
+
+    def run(self):
+        variants, errors = improve_prompt_multi(self.prompt_text, self.models)
+        self.finished.emit(variants, errors)
+
+
 class PromptImproveDialog(QDialog):
     """Диалог улучшения промта."""
 
@@ -51,6 +74,7 @@ class PromptImproveDialog(QDialog):
         self.setMinimumSize(550, 450)
         self.resize(650, 550)
         self._setup_ui()
+        self._show_cached()
 
     def _setup_ui(self):
         layout = QVBoxLayout(self)
@@ -62,6 +86,8 @@ class PromptImproveDialog(QDialog):
         self._models = get_active_models()
         for m in self._models:
             self.model_combo.addItem(m.name, m)
+        if len(self._models) > 1:
+            self.model_combo.addItem(f"Все активные модели ({len(self._models)})", ALL_MODELS)
         self.model_combo.setMinimumWidth(200)
         model_row.addWidget(self.model_combo, 0)
         improve_btn = QPushButton("Улучшить")
@@ -117,6 +143,15 @@ class PromptImproveDialog(QDialog):
         btn_layout.addWidget(close_btn)
         layout.addLayout(btn_layout)
 
+    def _show_cached(self):
+        """Сразу показывает улучшение из кэша для выбранной модели, если оно есть."""
+        model = self.model_combo.currentData()
+        if isinstance(model, Model) and self.original_text.strip():
+            cached = cached_improvement(self.original_text, model)
+            if cached is not None:
+                self._on_finished(cached)
+                self.status_label.setText("Готово (из кэша)")
+
     def _on_improve_clicked(self):
         if not self.original_text.strip():
             return
@@ -124,20 +159,51 @@ class PromptImproveDialog(QDialog):
         if not model:
             QMessageBox.warning(self, "Ошибка", "Нет активных моделей. Добавьте модели в Настройки → Модели.")
             return
-        self.status_label.setText(f"Запрос к {model.name}…")
         self.progress.setVisible(True)
         self.model_combo.setEnabled(False)
-        self._thread = ImprovePromptThread(self.original_text, model, self)
-        self._thread.finished.connect(self._on_finished)
-        self._thread.error.connect(self._on_error)
+        if model == ALL_MODELS:
+            self.status_label.setText(f"Запрос к моделям: {len(self._models)}…")
+            self._thread = ImprovePromptMultiThread(self.original_text, self._models, self)
+            self._thread.finished.connect(self._on_multi_finished)
+        else:
+            self.status_label.setText(f"Запрос к {model.name}…")
+            self._thread = ImprovePromptThread(self.original_text, model, self)
+            self._thread.finished.connect(self._on_finished)
+            self._thread.error.connect(self._on_error)
         self._thread.start()
 
     def _on_finished(self, text: str):
         self.progress.setVisible(False)
         self.model_combo.setEnabled(True)
         self.parsed = parse_improved_response(text)
-        self.improved_edit.setPlainText(self.parsed.get("improved", text))
         self.status_label.setText("Готово")
+        alternatives = [(f"Вариант {i}:", alt) for i, alt in enumerate(self.parsed.get("alternatives", [])[:3], 1)]
+        self._show_variants(self.parsed.get("improved", text), alternatives)
+
+    def _on_multi_finished(self, variants: list, errors: list):
+        self.progress.setVisible(False)
+        self.model_combo.setEnabled(True)
+        if not variants:
+            self._on_error("\n\n".join(errors) or "Модели не вернули вариантов.")
+            return
+        self.parsed = {
+            "improved": variants[0]["text"],
+            "alternatives": [v["text"] for v in variants[1:]],
+        }
+        status = f"Готово. Вариантов: {len(variants)}"
+        if errors:
+            status += f", ошибок: {len(errors)}"
+        self.status_label.setToolTip("\n".join(errors))
+        self.status_label.setText(status)
+        alternatives = [
+            (f"{i}. {', '.join(v['models'])}:", v["text"])
+            for i, v in enumerate(variants[1:6], 2)
+        ]
+        self._show_variants(variants[0]["text"], alternatives)
+
+    def _show_variants(self, improved: str, alternatives: list[tuple[str, str]]):
+        """Показывает улучшенный промт и альтернативы [(подпись, текст)]."""
+        self.improved_edit.setPlainText(improved)
 
         # Альтернативы — очистить старые
         while self.alternatives_layout.count():
@@ -146,10 +212,11 @@ class PromptImproveDialog(QDialog):
                 self._clear_layout(item.layout())
             if item.widget():
                 item.widget().deleteLater()
-        for i, alt in enumerate(self.parsed.get("alternatives", [])[:3], 1):
+        for i, (label, alt) in enumerate(alternatives, 1):
             row = QHBoxLayout()
-            lbl = QLabel(f"Вариант {i}:")
+            lbl = QLabel(label)
             lbl.setMinimumWidth(70)
+            lbl.setWordWrap(True)
             row.addWidget(lbl)
             te = QTextEdit()
             te.setPlainText(alt)
@@ -1,6 +1,6 @@
 """
 Диалог управления «Промты» с CRUD.
-Таблица и кнопки Добавить / Изменить / Удалить.
+Таблица и кнопки Добавить / Изменить / Удалить, слева — фильтр по тегам.
 """
 from PyQt5.QtWidgets import (
     QDialog,
@@ -15,8 +15,11 @@ from PyQt5.QtWidgets import (
     QTableWidgetItem,
     QHeaderView,
     QAbstractItemView,
+    QListWidget,
+    QListWidgetItem,
+    QSplitter,
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 
 import db
 
@@ -72,6 +75,9 @@ class PromptEditDialog(QDialog):
 class PromptsDialog(QDialog):
     """Диалог «Промты» с таблицей и кнопками CRUD."""
 
+    # Промт добавлен через очередь записи БД: (id, ошибка)
+    added = pyqtSignal(int, str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Промты")
@@ -79,6 +85,7 @@ class PromptsDialog(QDialog):
         self.resize(700, 500)
         self.prompts: list[dict] = []
         self._setup_ui()
+        self.added.connect(self._on_added)
         self._refresh_display()
 
     def _setup_ui(self):
@@ -98,21 +105,55 @@ class PromptsDialog(QDialog):
         crud_layout.addStretch()
         layout.addLayout(crud_layout)
 
+        splitter = QSplitter(Qt.Horizontal)
+
+        # Теги с числом промтов; выбор тега фильтрует таблицу
+        self.tags_list = QListWidget()
+        self.tags_list.currentItemChanged.connect(lambda *_: self._refresh_display(reload_tags=False))
+        splitter.addWidget(self.tags_list)
+
         # Таблица промтов
-        self.table = QTableWidget()
+        self.table = QTableWidget(0, 4)
         self.table.setHorizontalHeaderLabels(["ID", "Создан", "Текст", "Теги"])
         self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.SingleSelection)
-        layout.addWidget(self.table)
+        splitter.addWidget(self.table)
+        splitter.setStretchFactor(1, 1)
+        splitter.setSizes([160, 540])
+        layout.addWidget(splitter)
 
         close_btn = QPushButton("Закрыть")
         close_btn.clicked.connect(self.accept)
         layout.addWidget(close_btn)
 
-    def _refresh_display(self):
+    def _current_tag(self) -> str:
+        item = self.tags_list.currentItem()
+        return (item.data(Qt.UserRole) or "") if item else ""
+
+    def _reload_tags(self):
+        """Перечитывает список тегов, сохраняя выбранный тег, если он остался."""
+        current = self._current_tag()
+        self.tags_list.blockSignals(True)
+        self.tags_list.clear()
+        all_item = QListWidgetItem("Все промты")
+        all_item.setData(Qt.UserRole, "")
+        self.tags_list.addItem(all_item)
+        selected = all_item
+        for t in db.tag_counts():
+            item = QListWidgetItem(f"{t['name']} ({t['count']})")
+            item.setData(Qt.UserRole, t["name"])
+            self.tags_list.addItem(item)
+            if current and t["name"] == current:
+                selected = item
+        self.tags_list.setCurrentItem(selected)
+        self.tags_list.blockSignals(False)
+
+    def _refresh_display(self, reload_tags: bool = True):
         try:
-            self.prompts = db.prompt_list()
+            if reload_tags:
+                self._reload_tags()
+            self.prompts = db.prompt_list(tag=self._current_tag())
         except Exception as e:
             self.prompts = []
             QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить промты: {e}")
@@ -143,9 +184,26 @@ class PromptsDialog(QDialog):
         d = PromptEditDialog(self)
         if d.exec_() == QDialog.Accepted:
             data = d.get_data()
-            db.prompt_create(data["text"], data["tags"])
-            self._refresh_display()
-            QMessageBox.information(self, "Готово", "Промт добавлен.")
+            fut = db.prompt_create_async(data["text"], data["tags"])
+
+            def done(f):
+                err = f.exception()
+                try:
+                    self.added.emit(0 if err else f.result(), str(err) if err else "")
+                except RuntimeError:
+                    pass  # диалог уже закрыт
+            fut.add_done_callback(done)
+
+    def _on_added(self, pid: int, error: str):
+        if error:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось добавить промт: {error}")
+            return
+        self._refresh_display()
+        QMessageBox.information(self, "Готово", "Промт добавлен.")
+
+    def done(self, r):
+        db.flush_writes()  # вызывающее окно перечитывает промты после закрытия
+        super().done(r)
 
     def _on_edit(self):
         pid = self._selected_id()
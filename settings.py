@@ -0,0 +1,120 @@
+"""
+Кэш настроек программы (таблица settings) в памяти.
+Таблица читается один раз, дальше чтение идёт из памяти; запись (set_value,
+set_many) обновляет кэш и ставится в очередь записи БД (db.submit_write),
+после чего подписчики получают изменённые ключи. Подписчики вызываются
+в потоке, который записал настройку. Если запись в БД не удалась, ошибка
+выводится в stderr, а кэш сбрасывается и при следующем чтении перечитывается из БД.
+"""
+import sys
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import db
+
+# callback(changed) — {ключ: новое значение} для изменившихся настроек
+ChangeCallback = Callable[[dict[str, str]], None]
+
+_values: Optional[dict[str, str]] = None
+_loaded_from: Optional[Path] = None  # db.DB_PATH, из которой загружен кэш
+_lock = threading.Lock()
+_listeners: list[tuple[Optional[frozenset], ChangeCallback]] = []
+
+
+def _cache() -> dict[str, str]:
+    """Кэш настроек; загружается при первом обращении и при смене файла БД."""
+    global _values, _loaded_from
+    with _lock:
+        if _values is not None and _loaded_from == db.DB_PATH:
+            return _values
+    db.flush_writes()  # записи из очереди должны попасть в загружаемый кэш
+    loaded = db.setting_all()
+    with _lock:
+        if _values is None or _loaded_from != db.DB_PATH:
+            _values, _loaded_from = loaded, db.DB_PATH
+        return _values
+
+
+def reload() -> None:
+    """Сбрасывает кэш: следующее чтение заново загрузит таблицу settings."""
+    global _values
+    with _lock:
+        _values = None
+
+
+def get(key: str, default: Optional[str] = None) -> Optional[str]:
+    """Значение настройки или default."""
+    return _cache().get(key, default)
+
+
+def get_str(key: str, default: str, choices: Optional[Iterable[str]] = None) -> str:
+    """Строковая настройка; значение не из choices заменяется на default."""
+    v = get(key)
+    if v is None or (choices is not None and v not in choices):
+        return default
+    return v
+
+
+def get_int(key: str, default: int, lo: int, hi: int) -> int:
+    """Целая настройка, ограниченная [lo, hi]; нечисловое значение — default."""
+    try:
+        return max(lo, min(hi, int(get(key))))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_float(key: str, default: float, lo: float, hi: float) -> float:
+    """Дробная настройка, ограниченная [lo, hi]; нечисловое значение — default."""
+    try:
+        return max(lo, min(hi, float(get(key))))
+    except (TypeError, ValueError):
+        return default
+
+
+def set_value(key: str, value) -> bool:
+    """Сохраняет настройку. Возвращает True, если значение изменилось."""
+    return bool(set_many({key: value}))
+
+
+def set_many(values: dict) -> dict[str, str]:
+    """
+    Сохраняет несколько настроек одной транзакцией; неизменившиеся не пишутся.
+    Подписчики получают одно уведомление на все изменения. Возвращает изменённые.
+    """
+    current = _cache()
+    with _lock:
+        changed = {k: str(v) for k, v in values.items() if current.get(k) != str(v)}
+    if not changed:
+        return changed
+    db.setting_set_many_async(changed).add_done_callback(_on_written)
+    with _lock:
+        if _values is current:
+            current.update(changed)
+        listeners = list(_listeners)
+    for keys, callback in listeners:
+        relevant = changed if keys is None else {k: v for k, v in changed.items() if k in keys}
+        if relevant:
+            callback(relevant)
+    return changed
+
+
+def _on_written(fut: Future) -> None:
+    """Итог записи из очереди (в потоке записи БД): при ошибке кэш сбрасывается."""
+    err = fut.exception()
+    if err is None:
+        return
+    print(f"[settings] настройки не сохранены в БД: {err}", file=sys.stderr)
+    reload()
+
+
+def subscribe(callback: ChangeCallback, keys: Optional[Iterable[str]] = None) -> None:
+    """Подписывает callback на изменения настроек keys (None — всех)."""
+    with _lock:
+        _listeners.append((frozenset(keys) if keys is not None else None, callback))
+
+
+def unsubscribe(callback: ChangeCallback) -> None:
+    with _lock:
+        _listeners[:] = [(k, c) for k, c in _listeners if c is not callback]
@@ -1,6 +1,8 @@
 """
 Диалог настроек программы.
-Тема (светлая/тёмная), размер шрифта. Сохраняет в таблицу settings.
+Тема (светлая/тёмная), размер шрифта, параметры сети, обслуживания БД и резервных копий.
+Сохраняет в таблицу settings через кэш settings.py; настройки фоновых подсистем
+применяются сразу по уведомлению об изменении.
 """
 from PyQt5.QtWidgets import (
     QDialog,
@@ -12,32 +14,113 @@ from PyQt5.QtWidgets import (
     QPushButton,
     QFormLayout,
     QGroupBox,
+    QDoubleSpinBox,
 )
 from PyQt5.QtCore import Qt
 
-import db
+import backup
+import health
+import latency
+import maintenance
+import network
+import settings
+import transport
 
 THEME_LIGHT = "light"
 THEME_DARK = "dark"
 SETTING_THEME = "theme"
 SETTING_FONT_SIZE = "font_size"
 DEFAULT_FONT_SIZE = 10
+SETTING_CIRCUIT_FAILURES = "circuit_failures"
+SETTING_CIRCUIT_OPEN_SECONDS = "circuit_open_seconds"
+SETTING_TIMEOUT_MIN = "timeout_min"
+SETTING_TIMEOUT_MAX = "timeout_max"
+SETTING_FALLBACK_BUDGET = "fallback_budget"
+SETTING_PROBE_INTERVAL = "probe_interval"
+SETTING_PROVIDER_CONCURRENCY = "provider_concurrency"
+SETTING_HTTP_TRANSPORT = "http_transport"
 
 
 def get_theme() -> str:
     """Возвращает сохранённую тему: light или dark."""
-    v = db.setting_get(SETTING_THEME)
-    return v if v in (THEME_LIGHT, THEME_DARK) else THEME_LIGHT
+    return settings.get_str(SETTING_THEME, THEME_LIGHT, (THEME_LIGHT, THEME_DARK))
 
 
 def get_font_size() -> int:
     """Возвращает сохранённый размер шрифта."""
-    v = db.setting_get(SETTING_FONT_SIZE)
-    try:
-        n = int(v)
-        return max(8, min(24, n))
-    except (TypeError, ValueError):
-        return DEFAULT_FONT_SIZE
+    return settings.get_int(SETTING_FONT_SIZE, DEFAULT_FONT_SIZE, 8, 24)
+
+
+def get_circuit_failures() -> int:
+    """Сбоев подряд, после которых провайдер временно отключается."""
+    return settings.get_int(SETTING_CIRCUIT_FAILURES, network.DEFAULT_CIRCUIT_FAILURES, 1, 100)
+
+
+def get_circuit_open_seconds() -> float:
+    """Время отключения провайдера до пробного запроса, секунды."""
+    return settings.get_float(SETTING_CIRCUIT_OPEN_SECONDS, network.DEFAULT_CIRCUIT_OPEN_SECONDS, 1.0, 3600.0)
+
+
+def get_timeout_bounds() -> tuple[float, float]:
+    """Нижняя и верхняя граница адаптивного таймаута, секунды."""
+    lo = settings.get_float(SETTING_TIMEOUT_MIN, latency.DEFAULT_TIMEOUT_MIN, 1.0, 3600.0)
+    return lo, max(lo, settings.get_float(SETTING_TIMEOUT_MAX, latency.DEFAULT_TIMEOUT_MAX, 1.0, 3600.0))
+
+
+def get_fallback_budget() -> float:
+    """Время на резервные модели сверх таймаута основной, секунды."""
+    return settings.get_float(SETTING_FALLBACK_BUDGET, network.DEFAULT_FALLBACK_BUDGET, 0.0, 3600.0)
+
+
+def get_probe_interval() -> int:
+    """Интервал фоновой проверки активных моделей, минуты; 0 — выключена."""
+    return settings.get_int(SETTING_PROBE_INTERVAL, health.DEFAULT_PROBE_INTERVAL, 0, 1440)
+
+
+def get_provider_concurrency() -> int:
+    """Одновременных запросов к одному провайдеру (хосту)."""
+    return settings.get_int(SETTING_PROVIDER_CONCURRENCY, network.DEFAULT_PROVIDER_CONCURRENCY, 1, 64)
+
+
+def get_http_transport() -> str:
+    """Сохранённый транспорт: http1 (requests) или http2 (httpx)."""
+    return settings.get_str(SETTING_HTTP_TRANSPORT, transport.TRANSPORT_HTTP1, transport.TRANSPORTS)
+
+
+# Какие подсистемы перенастраивать при изменении настроек
+_BACKGROUND_APPLIERS = (
+    ((SETTING_CIRCUIT_FAILURES, SETTING_CIRCUIT_OPEN_SECONDS),
+     lambda: network.configure_circuit_breakers(get_circuit_failures(), get_circuit_open_seconds())),
+    ((SETTING_PROVIDER_CONCURRENCY,), lambda: network.configure_scheduler(get_provider_concurrency())),
+    ((SETTING_HTTP_TRANSPORT,), lambda: transport.configure_transport(get_http_transport())),
+    ((SETTING_TIMEOUT_MIN, SETTING_TIMEOUT_MAX), lambda: latency.configure_bounds(*get_timeout_bounds())),
+    ((SETTING_FALLBACK_BUDGET,), lambda: network.configure_fallback_budget(get_fallback_budget())),
+    ((SETTING_PROBE_INTERVAL,), lambda: health.configure_prober(get_probe_interval() * 60)),
+    ((maintenance.SETTING_INTERVAL,), lambda: maintenance.configure_maintenance(maintenance.get_interval())),
+    ((backup.SETTING_INTERVAL,), lambda: backup.configure_backups(backup.get_interval())),
+)
+BACKGROUND_SETTINGS = tuple(k for keys, _ in _BACKGROUND_APPLIERS for k in keys)
+_watching = False
+
+
+def _on_background_settings_changed(changed: dict[str, str]) -> None:
+    for keys, apply in _BACKGROUND_APPLIERS:
+        if any(k in changed for k in keys):
+            apply()
+
+
+def apply_background_settings() -> None:
+    """
+    Передаёт сохранённые настройки фоновых подсистем: сетевые — в network.py, transport.py,
+    latency.py и health.py, интервалы обслуживания и резервных копий БД — в maintenance.py
+    и backup.py. Подписывается на их изменения: дальше изменённые настройки применяются сразу.
+    """
+    global _watching
+    for _, apply in _BACKGROUND_APPLIERS:
+        apply()
+    if not _watching:
+        _watching = True
+        settings.subscribe(_on_background_settings_changed, BACKGROUND_SETTINGS)
 
 
 # Стили для тёмной темы
@@ -126,6 +209,113 @@ class SettingsDialog(QDialog):
 
         layout.addWidget(g)
 
+        g_net = QGroupBox("Сеть: провайдеры")
+        net_form = QFormLayout(g_net)
+        self.circuit_failures_spin = QSpinBox()
+        self.circuit_failures_spin.setRange(1, 100)
+        self.circuit_failures_spin.setToolTip(
+            "Сколько сбоев подряд (таймаут, ошибка сети, HTTP 429/5xx) отключают провайдера"
+        )
+        net_form.addRow("Сбоев до отключения:", self.circuit_failures_spin)
+        self.circuit_open_spin = QDoubleSpinBox()
+        self.circuit_open_spin.setRange(1, 3600)
+        self.circuit_open_spin.setDecimals(0)
+        self.circuit_open_spin.setSuffix(" с")
+        self.circuit_open_spin.setToolTip("Запросы к отключённому провайдеру сразу завершаются ошибкой")
+        net_form.addRow("Пауза до повторной проверки:", self.circuit_open_spin)
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, 64)
+        self.concurrency_spin.setToolTip(
+            "Лимит одновременных запросов к одному хосту; один слот всегда остаётся "
+            "за отправкой из главного окна"
+        )
+        net_form.addRow("Запросов к провайдеру одновременно:", self.concurrency_spin)
+        self.transport_combo = QComboBox()
+        self.transport_combo.addItem("HTTP/1.1 (requests)", transport.TRANSPORT_HTTP1)
+        self.transport_combo.addItem("HTTP/2 (httpx)", transport.TRANSPORT_HTTP2)
+        if transport.http2_available():
+            self.transport_combo.setToolTip(
+                "HTTP/2 передаёт одновременные запросы к одному хосту в одном соединении"
+            )
+        else:
+            self.transport_combo.model().item(1).setEnabled(False)
+            self.transport_combo.setToolTip('Для HTTP/2 установите пакеты: pip install "httpx[http2]"')
+        net_form.addRow("Протокол:", self.transport_combo)
+        layout.addWidget(g_net)
+
+        g_timeout = QGroupBox("Сеть: таймауты и проверка моделей")
+        timeout_form = QFormLayout(g_timeout)
+        self.timeout_min_spin = QDoubleSpinBox()
+        self.timeout_max_spin = QDoubleSpinBox()
+        for spin in (self.timeout_min_spin, self.timeout_max_spin):
+            spin.setRange(1, 3600)
+            spin.setDecimals(0)
+            spin.setSuffix(" с")
+        self.timeout_min_spin.setToolTip(
+            "Таймаут модели вычисляется по 95-му перцентилю задержек её ответов с запасом"
+        )
+        timeout_form.addRow("Не меньше:", self.timeout_min_spin)
+        timeout_form.addRow("Не больше:", self.timeout_max_spin)
+        self.fallback_budget_spin = QDoubleSpinBox()
+        self.fallback_budget_spin.setRange(0, 3600)
+        self.fallback_budget_spin.setDecimals(0)
+        self.fallback_budget_spin.setSuffix(" с")
+        self.fallback_budget_spin.setToolTip(
+            "Основная модель ждёт свой таймаут целиком; резервным моделям достаётся остаток "
+            "её таймаута и это время"
+        )
+        timeout_form.addRow("Время на резервные модели:", self.fallback_budget_spin)
+        self.probe_interval_spin = QSpinBox()
+        self.probe_interval_spin.setRange(0, 1440)
+        self.probe_interval_spin.setSuffix(" мин")
+        self.probe_interval_spin.setSpecialValueText("выключена")
+        self.probe_interval_spin.setToolTip(
+            "Периодический дешёвый запрос к каждой активной модели: держит соединения "
+            "с провайдерами открытыми и проверяет их доступность"
+        )
+        timeout_form.addRow("Фоновая проверка моделей:", self.probe_interval_spin)
+        layout.addWidget(g_timeout)
+
+        g_db = QGroupBox("База данных: хранение и обслуживание")
+        db_form = QFormLayout(g_db)
+        self.maintenance_interval_spin = QSpinBox()
+        self.maintenance_interval_spin.setRange(0, 24 * 30)
+        self.maintenance_interval_spin.setSuffix(" ч")
+        self.maintenance_interval_spin.setSpecialValueText("выключено")
+        self.maintenance_interval_spin.setToolTip(
+            "Фоновая очистка по срокам хранения, освобождение места и обновление "
+            "статистики запросов; итог записывается в maintenance.log"
+        )
+        db_form.addRow("Обслуживание БД раз в:", self.maintenance_interval_spin)
+        self.results_days_spin = QSpinBox()
+        self.results_days_spin.setRange(0, 36500)
+        self.results_days_spin.setSuffix(" дн")
+        self.results_days_spin.setToolTip("Более старые результаты удаляются, в том числе из архивов")
+        self.results_rows_spin = QSpinBox()
+        self.results_rows_spin.setRange(0, 10 ** 9)
+        self.results_rows_spin.setSingleStep(1000)
+        self.results_rows_spin.setToolTip("Хранить в БД только столько последних результатов")
+        self.latency_days_spin = QSpinBox()
+        self.latency_days_spin.setRange(0, 36500)
+        self.latency_days_spin.setSuffix(" дн")
+        for spin in (self.results_days_spin, self.results_rows_spin, self.latency_days_spin):
+            spin.setSpecialValueText("без ограничения")
+        db_form.addRow("Хранить результаты:", self.results_days_spin)
+        db_form.addRow("Не больше результатов:", self.results_rows_spin)
+        db_form.addRow("Хранить задержки моделей:", self.latency_days_spin)
+        self.backup_interval_spin = QSpinBox()
+        self.backup_interval_spin.setRange(0, 24 * 30)
+        self.backup_interval_spin.setSuffix(" ч")
+        self.backup_interval_spin.setSpecialValueText("выключено")
+        self.backup_interval_spin.setToolTip(
+            "Сжатая копия БД в папке chatlist_backups; копируется порциями, не мешая работе"
+        )
+        db_form.addRow("Резервная копия раз в:", self.backup_interval_spin)
+        self.backup_keep_spin = QSpinBox()
+        self.backup_keep_spin.setRange(1, 1000)
+        db_form.addRow("Хранить копий:", self.backup_keep_spin)
+        layout.addWidget(g_db)
+
         btn_layout = QHBoxLayout()
         btn_layout.addStretch()
         ok_btn = QPushButton("OK")
@@ -142,10 +332,43 @@ class SettingsDialog(QDialog):
         if idx >= 0:
             self.theme_combo.setCurrentIndex(idx)
         self.font_size_spin.setValue(get_font_size())
+        self.circuit_failures_spin.setValue(get_circuit_failures())
+        self.circuit_open_spin.setValue(get_circuit_open_seconds())
+        self.concurrency_spin.setValue(get_provider_concurrency())
+        idx = self.transport_combo.findData(get_http_transport())
+        if idx >= 0:
+            self.transport_combo.setCurrentIndex(idx)
+        lo, hi = get_timeout_bounds()
+        self.timeout_min_spin.setValue(lo)
+        self.timeout_max_spin.setValue(hi)
+        self.fallback_budget_spin.setValue(get_fallback_budget())
+        self.probe_interval_spin.setValue(get_probe_interval())
+        self.maintenance_interval_spin.setValue(maintenance.get_interval())
+        policies = {p.table: p for p in maintenance.retention_policies()}
+        self.results_days_spin.setValue(policies["results"].max_age_days)
+        self.results_rows_spin.setValue(policies["results"].max_rows)
+        self.latency_days_spin.setValue(policies["model_latency"].max_age_days)
+        self.backup_interval_spin.setValue(backup.get_interval())
+        self.backup_keep_spin.setValue(backup.get_keep())
 
     def _on_ok(self):
-        theme = self.theme_combo.currentData()
-        font_size = self.font_size_spin.value()
-        db.setting_set(SETTING_THEME, theme)
-        db.setting_set(SETTING_FONT_SIZE, str(font_size))
+        lo = self.timeout_min_spin.value()
+        settings.set_many({
+            SETTING_THEME: self.theme_combo.currentData(),
+            SETTING_FONT_SIZE: self.font_size_spin.value(),
+            SETTING_CIRCUIT_FAILURES: self.circuit_failures_spin.value(),
+            SETTING_CIRCUIT_OPEN_SECONDS: self.circuit_open_spin.value(),
+            SETTING_PROVIDER_CONCURRENCY: self.concurrency_spin.value(),
+            SETTING_HTTP_TRANSPORT: self.transport_combo.currentData(),
+            SETTING_TIMEOUT_MIN: lo,
+            SETTING_TIMEOUT_MAX: max(lo, self.timeout_max_spin.value()),
+            SETTING_FALLBACK_BUDGET: self.fallback_budget_spin.value(),
+            SETTING_PROBE_INTERVAL: self.probe_interval_spin.value(),
+            maintenance.SETTING_INTERVAL: self.maintenance_interval_spin.value(),
+            maintenance.RETENTION_SETTINGS["results"][0]: self.results_days_spin.value(),
+            maintenance.RETENTION_SETTINGS["results"][1]: self.results_rows_spin.value(),
+            maintenance.RETENTION_SETTINGS["model_latency"][0]: self.latency_days_spin.value(),
+            backup.SETTING_INTERVAL: self.backup_interval_spin.value(),
+            backup.SETTING_KEEP: self.backup_keep_spin.value(),
+        })
         self.accept()
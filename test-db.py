@@ -1,9 +1,16 @@
 """
 Тестовая программа для просмотра и редактирования SQLite-базы.
 Список таблиц → кнопка «Открыть» → таблица с пагинацией и CRUD.
+Режимы «только чтение» и «неизменяемый файл» открывают БД без записи
+(URI mode=ro / immutable=1, query_only) с отображением файла в память (mmap) —
+для безопасного просмотра больших копий и архивов:
+    python test-db.py archive.db --ro
 """
+import argparse
 import sys
+import time
 from pathlib import Path
+from typing import Callable
 
 from PyQt5.QtWidgets import (
     QApplication,
@@ -26,19 +33,44 @@ from PyQt5.QtWidgets import (
     QHeaderView,
     QAbstractItemView,
     QSplitter,
+    QComboBox,
+    QCheckBox,
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 import sqlite3
 
+MODE_READ_WRITE = "rw"
+MODE_READ_ONLY = "ro"
+MODE_IMMUTABLE = "immutable"  # файл не меняется никем: без блокировок и проверок изменений
+OPEN_MODES = (
+    (MODE_READ_WRITE, "Чтение и запись"),
+    (MODE_READ_ONLY, "Только чтение"),
+    (MODE_IMMUTABLE, "Неизменяемый файл"),
+)
+# Сколько байт файла отображать в память в режимах только для чтения
+READ_ONLY_MMAP_SIZE = 1024 * 1024 * 1024
+
+
+def open_db(path: Path, mode: str = MODE_READ_WRITE) -> sqlite3.Connection:
+    """Открывает БД в заданном режиме (MODE_*)."""
+    if mode == MODE_READ_WRITE:
+        return sqlite3.connect(path)
+    query = "immutable=1" if mode == MODE_IMMUTABLE else "mode=ro"
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?{query}", uri=True)
+    conn.execute(f"PRAGMA mmap_size = {READ_ONLY_MMAP_SIZE}")
+    conn.execute("PRAGMA query_only = 1")
+    return conn
+
 
 class SqliteViewer(QMainWindow):
     """Главное окно: выбор файла, список таблиц, кнопка «Открыть»."""
 
-    def __init__(self):
+    def __init__(self, mode: str = MODE_READ_WRITE):
         super().__init__()
         self.db_path: Path | None = None
         self.conn: sqlite3.Connection | None = None
+        self.mode = mode
         self._setup_ui()
 
     def _setup_ui(self):
@@ -54,6 +86,16 @@ class SqliteViewer(QMainWindow):
         self.file_label = QLabel("Файл не выбран")
         self.file_label.setStyleSheet("color: #666;")
         file_row.addWidget(self.file_label, 1)
+        self.mode_combo = QComboBox()
+        for mode, title in OPEN_MODES:
+            self.mode_combo.addItem(title, mode)
+        self.mode_combo.setCurrentIndex(self.mode_combo.findData(self.mode))
+        self.mode_combo.setToolTip(
+            "Только чтение: БД открывается без записи (mode=ro, query_only) с mmap.\n"
+            "Неизменяемый файл: то же без блокировок — только если файл никто не меняет."
+        )
+        self.mode_combo.currentIndexChanged.connect(self._on_mode_changed)
+        file_row.addWidget(self.mode_combo)
         browse_btn = QPushButton("Обзор...")
         browse_btn.clicked.connect(self._on_browse)
         file_row.addWidget(browse_btn)
@@ -80,11 +122,17 @@ class SqliteViewer(QMainWindow):
         if path:
             self._load_db(Path(path))
 
+    def _on_mode_changed(self):
+        self.mode = self.mode_combo.currentData()
+        if self.db_path:
+            self._load_db(self.db_path)
+
     def _load_db(self, path: Path):
         if self.conn:
             self.conn.close()
+            self.conn = None
         try:
-            self.conn = sqlite3.connect(path)
+            self.conn = open_db(path, self.mode)
             self.db_path = path
             self.file_label.setText(str(path))
             self.file_label.setStyleSheet("")
@@ -106,27 +154,113 @@ class SqliteViewer(QMainWindow):
         if not item or not self.conn:
             return
         table_name = item.text()
-        d = TableViewDialog(self, self.conn, table_name)
+        d = TableViewDialog(self, self.conn, table_name, self._connect,
+                            read_only=self.mode != MODE_READ_WRITE)
         d.exec_()
 
+    def _connect(self) -> sqlite3.Connection:
+        """Отдельное соединение с открытой БД (для запросов в фоновых потоках)."""
+        return open_db(self.db_path, self.mode)
+
+
+class TableSchema:
+    """
+    Схема таблицы, прочитанная один раз: колонки, первичный ключ, ключ для
+    постраничного чтения (keyset) и колонки, по которым есть индекс.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table_name: str):
+        cur = conn.cursor()
+        cur.execute(f"PRAGMA table_info([{table_name}])")
+        info = cur.fetchall()
+        self.columns: list[str] = [r[1] for r in info]
+        pk = sorted((r[5], r[1], (r[2] or "").upper()) for r in info if r[5])
+        self.pk_columns: list[str] = [name for _, name, _ in pk]
+        cur.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+        row = cur.fetchone()
+        without_rowid = bool(row and row[0] and "WITHOUT ROWID" in row[0].upper())
+        if len(pk) == 1 and pk[0][2] == "INTEGER":
+            self.key = [pk[0][1]]  # псевдоним rowid
+        elif not without_rowid:
+            self.key = ["rowid"]
+        else:
+            self.key = list(self.pk_columns)
+        # Колонки, с которых начинается какой-либо индекс: по ним сортировка и фильтр идут по индексу
+        indexed = {self.key[0]} - {"rowid"}
+        cur.execute(f"PRAGMA index_list([{table_name}])")
+        for idx in cur.fetchall():
+            cur.execute(f"PRAGMA index_info([{idx[1]}])")
+            first = [r[2] for r in cur.fetchall() if r[0] == 0]
+            if first and first[0]:
+                indexed.add(first[0])
+        self.indexed_columns: list[str] = [c for c in self.columns if c in indexed]
+        # Колонки для INSERT (без автоинкрементного INTEGER PK)
+        self.insert_columns: list[str] = [
+            r[1] for r in info if not (r[5] and "INT" in (r[2] or "").upper())
+        ] or list(self.columns)
+
+
+class QueryThread(QThread):
+    """Выполняет SELECT в отдельном соединении, чтобы не блокировать окно."""
+    finished = pyqtSignal(int, list, float)  # (номер запроса, строки, секунды)
+    error = pyqtSignal(int, str)
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], seq: int, sql: str, params: list, parent=None):
+        super().__init__(parent)
+        self.connect = connect
+        self.seq = seq
+        self.sql = sql
+        self.params = params
+
+    def run(self):
+        try:
+            conn = self.connect()
+            try:
+                start = time.perf_counter()
+                rows = conn.execute(self.sql, self.params).fetchall()
+                elapsed = time.perf_counter() - start
+            finally:
+                conn.close()
+            self.finished.emit(self.seq, rows, elapsed)
+        except Exception as e:
+            self.error.emit(self.seq, str(e))
+
 
 class TableViewDialog(QDialog):
-    """Диалог просмотра таблицы с пагинацией и CRUD."""
+    """
+    Диалог просмотра таблицы с постраничным чтением и CRUD.
+    Страницы читаются по ключу (rowid / первичный ключ): «WHERE ключ > последний
+    на странице», без OFFSET, поэтому глубокие страницы открываются так же быстро,
+    как первая. Сортировка и фильтр — по колонкам с индексом. Чтение и подсчёт
+    строк выполняются в фоновых потоках.
+    """
 
     PAGE_SIZE = 20
 
-    def __init__(self, parent, conn: sqlite3.Connection, table_name: str):
+    def __init__(self, parent, conn: sqlite3.Connection, table_name: str,
+                 connect: Callable[[], sqlite3.Connection], read_only: bool = False):
         super().__init__(parent)
         self.conn = conn
+        self.connect = connect  # новое соединение для фоновых запросов
         self.table_name = table_name
-        self.current_page = 0
-        self.columns: list[str] = []
+        self.read_only = read_only
+        self.schema = TableSchema(conn, table_name)
+        self.columns: list[str] = self.schema.columns
+        # Курсоры начала страниц: (значения ключа сортировки, включительно); [None] — первая страница
+        self._page_starts: list = [None]
+        self._row_keys: list[tuple] = []  # ключи строк текущей страницы
+        self._has_next = False
+        self._total: int | None = None
+        self._seq = 0
+        self._latest: dict[str, int] = {}
+        self._timings: dict[str, float] = {}  # длительность последних запросов, с
+        self._row_cursors: list[tuple] = []
+        self._threads: list[QThread] = []
         self._setup_ui()
-        self._load_schema()
-        self._refresh_data()
+        self._reset()
 
     def _setup_ui(self):
-        self.setWindowTitle(f"Таблица: {self.table_name}")
+        self.setWindowTitle(f"Таблица: {self.table_name}" + (" (только чтение)" if self.read_only else ""))
         self.setMinimumSize(700, 450)
         self.resize(900, 550)
         layout = QVBoxLayout(self)
@@ -142,14 +276,61 @@ class TableViewDialog(QDialog):
         crud_layout.addWidget(add_btn)
         crud_layout.addWidget(edit_btn)
         crud_layout.addWidget(del_btn)
+        for btn in (add_btn, edit_btn, del_btn):
+            btn.setEnabled(not self.read_only)
         crud_layout.addStretch()
+        self.timing_label = QLabel()
+        self.timing_label.setStyleSheet("color: #666;")
+        crud_layout.addWidget(self.timing_label)
         layout.addLayout(crud_layout)
 
+        # Сортировка, фильтр и переход — только по индексированным колонкам
+        query_layout = QHBoxLayout()
+        query_layout.addWidget(QLabel("Сортировка:"))
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItem(f"по ключу ({', '.join(self.schema.key)})", None)
+        for c in self.schema.indexed_columns:
+            if c not in self.schema.key:
+                self.sort_combo.addItem(c, c)
+        self.sort_combo.currentIndexChanged.connect(lambda _: self._reset())
+        query_layout.addWidget(self.sort_combo)
+        self.desc_check = QCheckBox("по убыванию")
+        self.desc_check.toggled.connect(lambda _: self._reset())
+        query_layout.addWidget(self.desc_check)
+        query_layout.addSpacing(12)
+        query_layout.addWidget(QLabel("Фильтр:"))
+        self.filter_col_combo = QComboBox()
+        self.filter_col_combo.addItem("—", None)
+        for c in self.schema.indexed_columns:
+            self.filter_col_combo.addItem(c, c)
+        query_layout.addWidget(self.filter_col_combo)
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("= значение")
+        self.filter_edit.returnPressed.connect(self._reset)
+        query_layout.addWidget(self.filter_edit, 1)
+        apply_btn = QPushButton("Применить")
+        apply_btn.clicked.connect(self._reset)
+        query_layout.addWidget(apply_btn)
+        if len(self.schema.key) == 1:
+            query_layout.addSpacing(12)
+            self.jump_edit = QLineEdit()
+            self.jump_edit.setPlaceholderText(self.schema.key[0])
+            self.jump_edit.setMaximumWidth(100)
+            self.jump_edit.returnPressed.connect(self._on_jump)
+            query_layout.addWidget(self.jump_edit)
+            jump_btn = QPushButton("Перейти")
+            jump_btn.setToolTip("Открыть страницу, начиная с записи с этим ключом")
+            jump_btn.clicked.connect(self._on_jump)
+            query_layout.addWidget(jump_btn)
+        layout.addLayout(query_layout)
+
         # Таблица
         self.table = QTableWidget()
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.setColumnCount(len(self.columns))
+        self.table.setHorizontalHeaderLabels(self.columns)
         layout.addWidget(self.table)
 
         # Пагинация
@@ -168,76 +349,175 @@ class TableViewDialog(QDialog):
         close_btn.clicked.connect(self.accept)
         layout.addWidget(close_btn)
 
-    def _load_schema(self):
-        cur = self.conn.cursor()
-        cur.execute(f"PRAGMA table_info({self.table_name})")
-        self.schema = cur.fetchall()
-        self.columns = [row[1] for row in self.schema]
-
-    def _get_total_count(self) -> int:
-        cur = self.conn.cursor()
-        cur.execute(f"SELECT COUNT(*) FROM [{self.table_name}]")
-        return cur.fetchone()[0]
+    # --- Построение запросов ---
+
+    def _sort_column(self) -> str | None:
+        return self.sort_combo.currentData()
+
+    def _filter(self) -> tuple[str, list]:
+        """Условие фильтра (col = ?) или пустое."""
+        col = self.filter_col_combo.currentData()
+        value = self.filter_edit.text()
+        if not col or value == "":
+            return "", []
+        return f"[{col}] = ?", [value]
+
+    def _key_sql(self) -> str:
+        return ", ".join("rowid" if k == "rowid" else f"[{k}]" for k in self.schema.key)
+
+    def _after(self, start, desc: bool) -> tuple[str, list]:
+        """Условие «строки после курсора start» для порядка (сортировка, ключ)."""
+        if start is None:
+            return "", []
+        values, inclusive = start
+        keys = f"({self._key_sql()})"
+        marks = "(" + ", ".join("?" for _ in self.schema.key) + ")"
+        op = ("<=" if inclusive else "<") if desc else (">=" if inclusive else ">")
+        sort = self._sort_column()
+        if sort is None:
+            return f"{keys} {op} {marks}", list(values)
+        s, key_values = values[0], list(values[1:])
+        col = f"[{sort}]"
+        cmp = "<" if desc else ">"
+        # NULL в SQLite меньше любых значений: первые при возрастании, последние при убывании
+        if s is None:
+            if desc:
+                return f"({col} IS NULL AND {keys} {op} {marks})", key_values
+            return f"(({col} IS NULL AND {keys} {op} {marks}) OR {col} IS NOT NULL)", key_values
+        sql = f"({col} {cmp} ? OR ({col} = ? AND {keys} {op} {marks})"
+        sql += f" OR {col} IS NULL)" if desc else ")"
+        return sql, [s, s] + key_values
+
+    def _page_sql(self, start) -> tuple[str, list]:
+        desc = self.desc_check.isChecked()
+        sort = self._sort_column()
+        where, params = [], []
+        f_sql, f_params = self._filter()
+        if f_sql:
+            where.append(f_sql)
+            params += f_params
+        a_sql, a_params = self._after(start, desc)
+        if a_sql:
+            where.append(a_sql)
+            params += a_params
+        dir_ = " DESC" if desc else ""
+        order = [f"[{sort}]{dir_}"] if sort else []
+        order += [("rowid" if k == "rowid" else f"[{k}]") + dir_ for k in self.schema.key]
+        sort_sel = f"[{sort}], " if sort else ""
+        sql = f"SELECT {sort_sel}{self._key_sql()}, * FROM [{self.table_name}]"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # На строку больше страницы — чтобы знать, есть ли следующая
+        sql += f" ORDER BY {', '.join(order)} LIMIT {self.PAGE_SIZE + 1}"
+        return sql, params
+
+    # --- Фоновые запросы ---
+
+    def _run(self, kind: str, sql: str, params: list, on_rows) -> None:
+        """Запускает запрос в фоне; устаревшие ответы (есть более новый запрос того же вида) отбрасываются."""
+        self._seq += 1
+        self._latest[kind] = self._seq
+        t = QueryThread(self.connect, self._seq, sql, params, self)
+        t.finished.connect(lambda n, rows, sec: self._on_result(kind, n, rows, sec, on_rows))
+        t.error.connect(lambda n, msg: self.page_label.setText(f"Ошибка запроса: {msg}"))
+        t.finished.connect(lambda *_: self._forget(t))
+        t.error.connect(lambda *_: self._forget(t))
+        self._threads.append(t)
+        t.start()
+
+    def _on_result(self, kind: str, n: int, rows: list, seconds: float, on_rows) -> None:
+        if n != self._latest.get(kind):
+            return
+        self._timings[kind] = seconds
+        on_rows(rows)
+        self._update_timing()
+
+    def _update_timing(self):
+        names = {"page": "страница", "count": "подсчёт"}
+        self.timing_label.setText("  ·  ".join(
+            f"{names[k]}: {v * 1000:.1f} мс" for k, v in self._timings.items()
+        ))
+
+    def _forget(self, t: QThread) -> None:
+        if t in self._threads:
+            self._threads.remove(t)
+
+    def _reset(self):
+        """Новый запрос (сортировка/фильтр): первая страница."""
+        self._page_starts = [None]
+        self._reload()
+
+    def _reload(self):
+        """Пересчёт строк и перечитывание текущей страницы."""
+        self._total = None
+        f_sql, f_params = self._filter()
+        sql = f"SELECT COUNT(*) FROM [{self.table_name}]" + (f" WHERE {f_sql}" if f_sql else "")
+        self._run("count", sql, f_params, self._on_count)
+        self._refresh_data()
 
     def _refresh_data(self):
-        total = self._get_total_count()
-        total_pages = max(1, (total + self.PAGE_SIZE - 1) // self.PAGE_SIZE)
-        self.current_page = min(self.current_page, total_pages - 1)
-        self.current_page = max(0, self.current_page)
-
-        offset = self.current_page * self.PAGE_SIZE
-        cur = self.conn.cursor()
-        cur.execute(
-            f"SELECT * FROM [{self.table_name}] LIMIT ? OFFSET ?",
-            (self.PAGE_SIZE, offset),
-        )
-        rows = cur.fetchall()
-
-        self.table.setColumnCount(len(self.columns))
-        self.table.setHorizontalHeaderLabels(self.columns)
+        sql, params = self._page_sql(self._page_starts[-1])
+        self.prev_btn.setEnabled(False)
+        self.next_btn.setEnabled(False)
+        self._run("page", sql, params, self._on_page)
+
+    def _on_count(self, rows: list):
+        self._total = rows[0][0] if rows else 0
+        self._update_label()
+
+    def _on_page(self, rows: list):
+        self._has_next = len(rows) > self.PAGE_SIZE
+        rows = rows[: self.PAGE_SIZE]
+        lead = (1 if self._sort_column() else 0) + len(self.schema.key)
+        self._row_cursors = [tuple(r[:lead]) for r in rows]
+        self._row_keys = [tuple(r[lead - len(self.schema.key):lead]) for r in rows]
         self.table.setRowCount(len(rows))
         for i, row in enumerate(rows):
-            for j, val in enumerate(row):
+            for j, val in enumerate(row[lead:]):
                 self.table.setItem(i, j, QTableWidgetItem(str(val) if val is not None else ""))
+        self.prev_btn.setEnabled(len(self._page_starts) > 1)
+        self.next_btn.setEnabled(self._has_next)
+        self._update_label()
 
-        # Обновить пагинацию
-        self.page_label.setText(
-            f"Страница {self.current_page + 1} из {total_pages} (всего записей: {total})"
-        )
-        self.prev_btn.setEnabled(self.current_page > 0)
-        self.next_btn.setEnabled(self.current_page < total_pages - 1 and total > self.PAGE_SIZE)
+    def _update_label(self):
+        total = "…" if self._total is None else str(self._total)
+        self.page_label.setText(f"Страница {len(self._page_starts)} (всего записей: {total})")
 
     def _prev_page(self):
-        self.current_page -= 1
-        self._refresh_data()
+        if len(self._page_starts) > 1:
+            self._page_starts.pop()
+            self._refresh_data()
 
     def _next_page(self):
-        self.current_page += 1
+        if self._has_next and self._row_cursors:
+            self._page_starts.append((self._row_cursors[-1], False))
+            self._refresh_data()
+
+    def _on_jump(self):
+        text = self.jump_edit.text().strip()
+        if not text:
+            return
+        value = int(text) if text.lstrip("-").isdigit() else text
+        # Переход по ключу: сортировка по ключу, первая строка — с ключом >= value (<= при убывании)
+        self.sort_combo.blockSignals(True)
+        self.sort_combo.setCurrentIndex(0)
+        self.sort_combo.blockSignals(False)
+        self._page_starts = [None, ((value,), True)]
         self._refresh_data()
 
-    def _get_pk_column(self) -> str | None:
-        """Возвращает имя первичного ключа или первую колонку."""
-        cur = self.conn.cursor()
-        cur.execute(f"PRAGMA table_info({self.table_name})")
-        for row in cur.fetchall():
-            if row[5]:  # pk
-                return row[1]
-        return self.columns[0] if self.columns else None
-
-    def _get_insert_columns(self) -> list[str]:
-        """Колонки для INSERT (исключая autoincrement PK)."""
-        cur = self.conn.cursor()
-        cur.execute(f"PRAGMA table_info({self.table_name})")
-        result = []
-        for row in cur.fetchall():
-            name, type_, notnull, default, pk = row[1], row[2], row[3], row[4], row[5]
-            if pk and "INT" in (type_ or "").upper():
-                continue
-            result.append(name)
-        return result or self.columns
+    def done(self, r):
+        # Дождаться фоновых запросов: QThread нельзя уничтожать во время работы
+        for t in list(self._threads):
+            t.wait()
+        super().done(r)
+
+    def _key_where(self, row: int) -> tuple[str, list]:
+        """Условие WHERE для строки таблицы по её ключу."""
+        keys = self.schema.key
+        return " AND ".join(("rowid" if k == "rowid" else f"[{k}]") + " = ?" for k in keys), list(self._row_keys[row])
 
     def _on_add(self):
-        insert_cols = self._get_insert_columns()
+        insert_cols = self.schema.insert_columns
         d = RowEditDialog(self, insert_cols, {}, is_new=True)
         if d.exec_() != QDialog.Accepted:
             return
@@ -253,7 +533,7 @@ class TableViewDialog(QDialog):
                 list(data.values()),
             )
             self.conn.commit()
-            self._refresh_data()
+            self._reload()
             QMessageBox.information(self, "Готово", "Запись добавлена.")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
@@ -264,7 +544,6 @@ class TableViewDialog(QDialog):
             QMessageBox.information(self, "Выбор", "Выберите строку для редактирования.")
             return
         data = {}
-        pk_col = self._get_pk_column()
         for j in range(self.table.columnCount()):
             item = self.table.item(row, j)
             col = self.columns[j]
@@ -273,16 +552,20 @@ class TableViewDialog(QDialog):
         if d.exec_() != QDialog.Accepted:
             return
         new_data = d.get_data()
-        if not new_data or not pk_col:
+        if not new_data:
+            return
+        # Ключевые колонки не меняются: строка ищется по ключу
+        fixed = set(self.schema.pk_columns) | set(self.schema.key)
+        changed = {k: v for k, v in new_data.items() if k not in fixed}
+        if not changed:
             return
         try:
             cur = self.conn.cursor()
-            sets = ", ".join(f"[{k}] = ?" for k in new_data.keys() if k != pk_col)
-            values = [v for k, v in new_data.items() if k != pk_col]
-            values.append(data[pk_col])
+            sets = ", ".join(f"[{k}] = ?" for k in changed)
+            where, key_values = self._key_where(row)
             cur.execute(
-                f"UPDATE [{self.table_name}] SET {sets} WHERE [{pk_col}] = ?",
-                values,
+                f"UPDATE [{self.table_name}] SET {sets} WHERE {where}",
+                list(changed.values()) + key_values,
             )
             self.conn.commit()
             self._refresh_data()
@@ -300,16 +583,12 @@ class TableViewDialog(QDialog):
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
         ) != QMessageBox.Yes:
             return
-        pk_col = self._get_pk_column()
-        if not pk_col:
-            return
-        item = self.table.item(row, self.columns.index(pk_col))
-        pk_value = item.text() if item else ""
+        where, key_values = self._key_where(row)
         try:
             cur = self.conn.cursor()
-            cur.execute(f"DELETE FROM [{self.table_name}] WHERE [{pk_col}] = ?", (pk_value,))
+            cur.execute(f"DELETE FROM [{self.table_name}] WHERE {where}", key_values)
             self.conn.commit()
-            self._refresh_data()
+            self._reload()
             QMessageBox.information(self, "Готово", "Запись удалена.")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
@@ -351,21 +630,28 @@ class RowEditDialog(QDialog):
 
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Просмотр SQLite")
+    parser.add_argument("path", nargs="?", help="файл БД")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--ro", action="store_true", help="только чтение (mode=ro, query_only, mmap)")
+    group.add_argument("--immutable", action="store_true", help="неизменяемый файл (immutable=1, без блокировок)")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setApplicationName("SQLite Viewer")
-    win = SqliteViewer()
-    if len(sys.argv) > 1:
-        path = Path(sys.argv[1])
+    mode = MODE_IMMUTABLE if args.immutable else MODE_READ_ONLY if args.ro else MODE_READ_WRITE
+    win = SqliteViewer(mode)
+    if args.path:
+        path = Path(args.path)
         if not path.is_absolute():
             path = Path.cwd() / path
-        if not path.exists() and not path.is_absolute():
+        if not path.exists() and not Path(args.path).is_absolute():
             script_dir = Path(__file__).parent
-            path = script_dir / sys.argv[1]
+            path = script_dir / args.path
         if path.exists():
             win._load_db(path)
     win.show()
     sys.exit(app.exec_())
 
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,175 @@
+"""
+Локальная оценка числа токенов и предварительная проверка длины контекста.
+Токены считаются эвристически по семейству модели (без сети и сторонних
+библиотек): латиница и остальные алфавиты токенизируются с разной плотностью.
+Контекст модели берётся из её настройки (models.context_length) или из
+сохранённого каталога OpenRouter.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import settings
+from models import Model
+
+SETTING_OPENROUTER_CONTEXT = "openrouter_context_lengths"
+# Запас под ответ модели, если для неё не задан max_tokens
+DEFAULT_OUTPUT_RESERVE = 256
+# Служебные токены на сообщение (роль, разделители) в формате chat
+MESSAGE_OVERHEAD = 4
+TOKEN_CACHE_SIZE = 1024
+
+# Семейство -> (символов на токен для ASCII, символов на токен для прочих алфавитов).
+# Значения подобраны по токенизаторам семейств на смешанном русско-английском тексте.
+FAMILY_RATIOS = {
+    "openai": (4.0, 2.4),
+    "anthropic": (3.5, 2.0),
+    "google": (4.0, 2.6),
+    "llama": (3.8, 2.0),
+    "mistral": (3.6, 1.8),
+    "qwen": (3.8, 2.2),
+    "deepseek": (3.8, 2.0),
+    "default": (3.5, 1.8),
+}
+
+# Подстрока в ID модели -> семейство (проверяются по порядку)
+_FAMILY_MARKERS = (
+    ("claude", "anthropic"),
+    ("anthropic", "anthropic"),
+    ("gemini", "google"),
+    ("gemma", "google"),
+    ("google", "google"),
+    ("llama", "llama"),
+    ("meta-", "llama"),
+    ("mistral", "mistral"),
+    ("mixtral", "mistral"),
+    ("qwen", "qwen"),
+    ("deepseek", "deepseek"),
+    ("gpt", "openai"),
+    ("openai", "openai"),
+    ("o1", "openai"),
+    ("o3", "openai"),
+)
+
+_token_cache: "OrderedDict[tuple[str, str], int]" = OrderedDict()
+_catalog: Optional[dict[str, int]] = None
+_lock = threading.Lock()
+
+
+@dataclass
+class PreflightIssue:
+    """Модель, для которой промт не помещается в контекст."""
+    model: Model
+    tokens: int  # оценка токенов запроса вместе с запасом под ответ
+    limit: int  # контекст модели
+
+    def message(self) -> str:
+        return (
+            f"Промт (~{self.tokens} токенов с учётом ответа) превышает контекст "
+            f"модели {self.model.name} ({self.limit} токенов). Запрос не отправлялся."
+        )
+
+
+def family_for(model_id: str) -> str:
+    """Семейство токенизатора по ID модели в API."""
+    mid = (model_id or "").lower()
+    for marker, family in _FAMILY_MARKERS:
+        if marker in mid:
+            return family
+    return "default"
+
+
+def _count(text: str, family: str) -> int:
+    ascii_ratio, other_ratio = FAMILY_RATIOS.get(family, FAMILY_RATIOS["default"])
+    n = len(text)
+    # Символы вне ASCII занимают в UTF-8 2+ байта: избыток байтов — быстрая оценка их числа
+    other = min(n, len(text.encode("utf-8", "surrogatepass")) - n)
+    return int((n - other) / ascii_ratio + other / other_ratio + 0.999)
+
+
+def estimate_tokens(text: str, model_id: str = "") -> int:
+    """Оценка числа токенов текста для модели; результат кэшируется по хешу текста."""
+    if not text:
+        return 0
+    family = family_for(model_id)
+    key = (family, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest())
+    with _lock:
+        if key in _token_cache:
+            _token_cache.move_to_end(key)
+            return _token_cache[key]
+    n = _count(text, family)
+    with _lock:
+        _token_cache[key] = n
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return n
+
+
+def estimate_request_tokens(prompt: str, model_id: str = "", system: str | None = None) -> int:
+    """Оценка токенов запроса chat/completions (system + user)."""
+    total = estimate_tokens(prompt, model_id) + MESSAGE_OVERHEAD
+    if system:
+        total += estimate_tokens(system, model_id) + MESSAGE_OVERHEAD
+    return total
+
+
+def save_openrouter_catalog(context_lengths: dict[str, int]) -> None:
+    """Сохраняет контексты моделей из каталога OpenRouter {id: токены} в settings."""
+    global _catalog
+    clean = {k: int(v) for k, v in context_lengths.items() if k and v}
+    settings.set_value(SETTING_OPENROUTER_CONTEXT, json.dumps(clean))
+    with _lock:
+        _catalog = clean
+
+
+def _load_catalog() -> dict[str, int]:
+    global _catalog
+    with _lock:
+        if _catalog is not None:
+            return _catalog
+    try:
+        data = json.loads(settings.get(SETTING_OPENROUTER_CONTEXT) or "{}")
+    except (TypeError, ValueError):
+        data = {}
+    with _lock:
+        _catalog = data if isinstance(data, dict) else {}
+        return _catalog
+
+
+def context_length_for(model: Model) -> int:
+    """Контекст модели в токенах: из её настройки или каталога OpenRouter; 0 — неизвестен."""
+    if getattr(model, "context_length", 0):
+        return int(model.context_length)
+    return int(_load_catalog().get(model.model, 0) or 0)
+
+
+def preflight(
+    models: list[Model],
+    prompt: str,
+    system: str | None = None,
+    reserve: int = DEFAULT_OUTPUT_RESERVE,
+    max_tokens: Optional[int] = None,
+) -> tuple[list[Model], list[PreflightIssue]]:
+    """
+    Проверяет, помещается ли запрос в контекст каждой модели.
+    Запас под ответ — max_tokens отправки, иначе max_tokens модели, иначе reserve.
+    Возвращает (модели для отправки, модели с превышением). Модели с неизвестным
+    контекстом считаются подходящими.
+    """
+    ok: list[Model] = []
+    issues: list[PreflightIssue] = []
+    for m in models:
+        limit = context_length_for(m)
+        if not limit:
+            ok.append(m)
+            continue
+        out = max_tokens or getattr(m, "max_tokens", 0) or reserve
+        tokens = estimate_request_tokens(prompt, m.model, system) + out
+        if tokens > limit:
+            issues.append(PreflightIssue(m, tokens, limit))
+        else:
+            ok.append(m)
+    return ok, issues
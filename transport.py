@@ -0,0 +1,147 @@
+"""
+HTTP-транспорт запросов к API нейросетей.
+- http1 — requests с общей сессией и пулом keep-alive соединений (по умолчанию,
+  стабильнее на Windows);
+- http2 — httpx с HTTP/2: одновременные запросы к одному хосту (напр. нескольких
+  моделей OpenRouter) мультиплексируются в одном соединении. Нужны пакеты
+  httpx и h2 (pip install "httpx[http2]"); без них используется http1.
+"""
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    import h2  # noqa: F401 — httpx включает HTTP/2 только при установленном h2
+except ImportError:
+    httpx = None
+
+TRANSPORT_HTTP1 = "http1"
+TRANSPORT_HTTP2 = "http2"
+TRANSPORTS = (TRANSPORT_HTTP1, TRANSPORT_HTTP2)
+# Соединений в пуле на хост: keep-alive соединения переиспользуются между отправками
+POOL_MAXSIZE = 16
+
+
+class TransportError(Exception):
+    """Сетевая ошибка транспорта (соединение, протокол)."""
+    pass
+
+
+class TransportTimeout(TransportError):
+    """Таймаут соединения или ответа."""
+    pass
+
+
+class Response:
+    """Ответ сервера, одинаковый для всех транспортов."""
+    __slots__ = ("status_code", "text", "http_version")
+
+    def __init__(self, status_code: int, text: str, http_version: str):
+        self.status_code = status_code
+        self.text = text
+        self.http_version = http_version
+
+
+class RequestsTransport:
+    """HTTP/1.1 через requests: по соединению на одновременный запрос к хосту."""
+    name = TRANSPORT_HTTP1
+
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, url: str, headers: dict, timeout: float,
+                json: Optional[dict] = None) -> Response:
+        try:
+            r = self.session.request(method, url, json=json, headers=headers, timeout=timeout)
+        except requests.Timeout as e:
+            raise TransportTimeout(str(e)) from e
+        except requests.RequestException as e:
+            raise TransportError(str(e)) from e
+        return Response(r.status_code, r.text, "HTTP/1.1")
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class Http2Transport:
+    """
+    HTTP/2 через httpx: одно соединение на хост, запросы из разных потоков
+    идут в нём параллельными потоками (streams). prior_knowledge — HTTP/2 без TLS
+    (h2c) для http:// адресов, напр. локального mock-сервера.
+    """
+    name = TRANSPORT_HTTP2
+
+    def __init__(self, prior_knowledge: bool = False):
+        if httpx is None:
+            raise TransportError("HTTP/2 недоступен: установите пакеты httpx и h2")
+        self.client = httpx.Client(
+            http1=not prior_knowledge,
+            http2=True,
+            limits=httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_MAXSIZE),
+        )
+
+    def request(self, method: str, url: str, headers: dict, timeout: float,
+                json: Optional[dict] = None) -> Response:
+        try:
+            r = self.client.request(method, url, json=json, headers=headers, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise TransportTimeout(str(e)) from e
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+        return Response(r.status_code, r.text, r.http_version)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def http2_available() -> bool:
+    """Установлены ли httpx и h2."""
+    return httpx is not None
+
+
+_transport = None
+_lock = threading.Lock()
+
+
+def configure_transport(name: str) -> str:
+    """
+    Выбирает транспорт: http1 или http2. Если HTTP/2 недоступен, остаётся http1.
+    Возвращает имя выбранного транспорта.
+    """
+    global _transport
+    if name == TRANSPORT_HTTP2 and not http2_available():
+        name = TRANSPORT_HTTP1
+    with _lock:
+        if _transport is not None and _transport.name == name:
+            return name
+        old = _transport
+        _transport = Http2Transport() if name == TRANSPORT_HTTP2 else RequestsTransport()
+    if old is not None:
+        old.close()
+    return name
+
+
+def get_transport():
+    """Текущий транспорт (по умолчанию http1)."""
+    with _lock:
+        if _transport is not None:
+            return _transport
+    configure_transport(TRANSPORT_HTTP1)
+    return _transport
+
+
+def set_transport(t):
+    """
+    Подменяет транспорт объектом (напр. Http2Transport(prior_knowledge=True)
+    в бенчмарках). Возвращает прежний транспорт (не закрывая его).
+    """
+    global _transport
+    with _lock:
+        old, _transport = _transport, t
+    return old